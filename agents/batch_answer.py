@@ -0,0 +1,204 @@
+"""
+batch_answer.py
+---------------
+Bulk question answering for care-team follow-ups: many (patient_id, question) pairs in, one
+answer per pair out, grounded in the patient's discharge record and the nephrology reference.
+Instead of running each pair through the ReAct loop, the shared work is done once per batch:
+1. every patient record is fetched in one `$in` query (cached records are served from memory),
+2. the distinct questions are embedded in one `embed_documents` call (the same vectors as
+   `embed_query` for the BGE model) and searched in one Qdrant batch request,
+3. the LLM answers each pair with bounded concurrency, and results are yielded as they finish.
+Used by `POST /chat/batch` (NDJSON stream) and from the command line.
+
+Usage:
+    python -m agents.batch_answer --input followups.jsonl > answers.jsonl
+    (one {"patient_id": ..., "question": ...} object per line)
+"""
+
+import argparse  # CLI arguments
+import asyncio  # Bounded LLM concurrency
+import json  # NDJSON input / output
+import os  # For environment variable access
+import sys  # CLI input / output
+import time  # Batch timing
+from typing import AsyncIterator, List
+
+from langchain_core.documents import Document
+from langchain_core.prompts import PromptTemplate  # Batch answer prompt
+
+from agents.clinical_agent.rag.context_builder import build_context  # Token-budgeted, cited context
+from agents.llm_model import get_llm  # The main language model
+from agents.prompt_context import patient_context  # Compact record summary
+from backend import resources  # Shared models, Qdrant client and search params
+from backend.concurrency import run_blocking  # Blocking retrieval off the event loop
+from backend.logger import logger  # Custom logger
+from backend.metrics import metrics_handler, stage_timer  # LLM callback / batch stage latencies
+from backend.patient_cache import RECORDS_UNAVAILABLE, patient_cache  # One `$in` query per batch
+from backend.resilience import DependencyUnavailable, rag  # Deadline, retries and circuit breaker
+
+# ---------------------- Batch Configuration --------------------------- #
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))  # Pairs accepted per request
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))  # LLM calls in flight per batch
+
+batch_prompt = PromptTemplate.from_template(
+    """Answer a post-discharge follow-up question for the patient below, for their care team.
+       Use the patient's discharge record and the nephrology reference. Cite the reference passages
+       you use by their [source, p. N] labels. If neither covers the question, say so and advise
+       contacting the nephrology team.
+
+    Patient record:
+    {patient}
+
+    Reference:
+    {context}
+
+    Question:
+    {question}
+
+    Answer:"""
+)
+
+# ---------------------- Batched Retrieval ----------------------------- #
+def search_batch(questions: List[str], vectors: List[List[float]] | None = None) -> List[List[Document]]:
+    """
+    Embed `questions` in one call and run all their vector searches in one Qdrant request.
+    Hybrid mode uses the same dense + sparse prefetch and RRF fusion as the hybrid retriever,
+    without cross-encoder reranking. The local backend searches its memory-mapped index instead.
+    Args:
+        questions (List[str]): Distinct questions.
+        vectors (List[List[float]], optional): Their dense embeddings, if already computed.
+    Returns:
+        List[List[Document]]: Retrieved chunks per question, best first.
+    """
+    from qdrant_client import models
+    from agents.clinical_agent.rag.hybrid_retriever import (
+        DENSE_VECTOR_NAME, PREFETCH_K, RETRIEVAL_K, SPARSE_VECTOR_NAME, to_sparse_vector,
+    )
+    dense = vectors if vectors is not None else resources.get_embeddings().embed_documents(questions)
+    if resources.VECTOR_BACKEND == "local":  # Dense-only; one matrix product for every question
+        index = resources.get_local_index_client().get_index(resources.COLLECTION_NAME)
+        return [[Document(page_content=record["payload"].get("page_content", ""),
+                          metadata=record["payload"].get("metadata") or {}) for _, record in hits]
+                for hits in index.search_batch(dense, RETRIEVAL_K)]
+    if resources.RETRIEVAL_MODE == "hybrid":
+        collection = resources.HYBRID_COLLECTION_NAME
+        with stage_timer("embed_documents", "sparse"):
+            sparse = list(resources.get_sparse_embeddings().query_embed(questions))
+        requests = [
+            models.QueryRequest(
+                prefetch=[
+                    models.Prefetch(query=vector, using=DENSE_VECTOR_NAME, limit=PREFETCH_K,
+                                    params=resources.search_params()),
+                    models.Prefetch(query=to_sparse_vector(sparse_vector), using=SPARSE_VECTOR_NAME, limit=PREFETCH_K),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF), limit=RETRIEVAL_K, with_payload=True,
+            )
+            for vector, sparse_vector in zip(dense, sparse)
+        ]
+    else:
+        collection = resources.COLLECTION_NAME
+        requests = [models.QueryRequest(query=vector, limit=RETRIEVAL_K, params=resources.search_params(),
+                                        with_payload=True) for vector in dense]
+    with stage_timer("qdrant", "query_batch"):
+        responses = resources.get_qdrant_client().query_batch_points(collection, requests=requests)
+    return [
+        [Document(page_content=point.payload.get("page_content", ""), metadata=point.payload.get("metadata") or {})
+         for point in response.points]
+        for response in responses
+    ]
+
+
+def prepare_batch(items: List[dict]) -> List[dict]:
+    """
+    Blocking part of a batch: fetch the records and build the reference context per question.
+    Args:
+        items (List[dict]): {'patient_id', 'question'} pairs.
+    Returns:
+        List[dict]: Per pair, in input order: index, patient_id, question and either
+            `patient` + `context` (ready for the LLM) or `error`.
+    """
+    patient_ids = [item["patient_id"].strip().upper() for item in items]
+    try:
+        patients = patient_cache.get_many(patient_ids)
+    except DependencyUnavailable:
+        patients = None
+    questions = list(dict.fromkeys(item["question"].strip() for item in items))  # Same check sent to many patients
+    docs = rag.call(search_batch, questions, fallback=lambda error: None)
+    contexts = {} if docs is None else {q: build_context(q, found) for q, found in zip(questions, docs)}
+    logger.info("[Batch] %s pairs | %s patients | %s distinct questions", len(items), len(set(patient_ids)),
+                len(questions))
+
+    prepared = []
+    for index, (item, patient_id) in enumerate(zip(items, patient_ids)):
+        question = item["question"].strip()
+        entry = {"index": index, "patient_id": patient_id, "question": question}
+        patient = None if patients is None else patients.get(patient_id)
+        if patients is None:
+            entry["error"] = RECORDS_UNAVAILABLE
+        elif patient is None:
+            entry["error"] = f"No patient found with ID: {patient_id}"
+        elif docs is None:
+            entry["error"] = "The nephrology reference is currently unavailable. Please try again later."
+        else:
+            entry["patient"] = patient_context({"patient": patient, "patient_id": patient_id,
+                                                "patient_name": patient.get("patient_name")})
+            entry["context"] = contexts[question]
+        prepared.append(entry)
+    return prepared
+
+# ---------------------- Batch Answering ------------------------------- #
+async def answer_batch(items: List[dict], concurrency: int = BATCH_LLM_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Answer (patient_id, question) pairs, yielding each result as soon as it is ready.
+    Args:
+        items (List[dict]): {'patient_id', 'question'} pairs.
+        concurrency (int): LLM calls in flight at once.
+    Yields:
+        dict: index (position in `items`), patient_id, question and `answer` or `error`.
+    """
+    start = time.perf_counter()
+    with stage_timer("batch", "prepare"):
+        prepared = await run_blocking(prepare_batch, items)
+    semaphore = asyncio.Semaphore(concurrency)
+    llm = get_llm()
+
+    async def answer(entry: dict) -> dict:
+        result = {key: entry[key] for key in ("index", "patient_id", "question")}
+        if "error" in entry:
+            return {**result, "error": entry["error"]}
+        prompt = batch_prompt.format(patient=entry["patient"], context=entry["context"], question=entry["question"])
+        async with semaphore:
+            try:
+                message = await llm.ainvoke(prompt, {"callbacks": [metrics_handler]})
+            except Exception as e:
+                logger.error("[Batch] Answer %s failed: %s", entry["index"], e)
+                return {**result, "error": "The answer could not be generated. Please try again later."}
+        return {**result, "answer": message.content}
+
+    tasks = [asyncio.create_task(answer(entry)) for entry in prepared]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:  # Client went away: stop the remaining LLM calls
+            task.cancel()
+    logger.info("[Batch] Answered %s pairs in %.1fs", len(items), time.perf_counter() - start)
+
+
+async def _run_cli(items: List[dict], concurrency: int):
+    from backend.concurrency import install_default_executor
+    install_default_executor()
+    async for result in answer_batch(items, concurrency):
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer many (patient_id, question) pairs; writes NDJSON to stdout.")
+    parser.add_argument("--input", default="-", help="NDJSON file of {patient_id, question} objects ('-' for stdin)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_LLM_CONCURRENCY, help="LLM calls in flight")
+    args = parser.parse_args()
+
+    with (sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")) as f:
+        batch = [json.loads(line) for line in f if line.strip()]
+    asyncio.run(_run_cli(batch, args.concurrency))
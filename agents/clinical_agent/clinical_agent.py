@@ -10,29 +10,26 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), ".")))
 
 from langgraph.prebuilt import create_react_agent  # For agent creation
-from langgraph.graph import START, END, StateGraph  # For workflow graphs (not used directly here)
-from langchain_google_genai import ChatGoogleGenerativeAI  # (Optional) Google GenAI LLM
-from dotenv import load_dotenv  # For environment variable management
 from agents.clinical_agent.tools.rag_tool import rag_tool_function  # RAG tool for internal reference
 from agents.clinical_agent.tools.web_search_tool import web_search_tool  # Web search tool
 from langgraph_swarm import create_handoff_tool  # For agent handoff
-from agents.llm_model import llm  # Main language model
-from typing import TypedDict
+from agents.llm_model import get_llm  # Main language model (created on first use)
+from typing_extensions import NotRequired  # Optional state keys
+from langgraph.prebuilt.chat_agent_executor import AgentState  # Base ReAct agent state
+from agents.prompt_context import make_prompt  # Trimmed history + verified patient context
 
 # ---------------------- State Schema ---------------------------------- #
-class ClinicalState(TypedDict):
+class ClinicalState(AgentState):
     """
-    State schema for the clinical agent workflow.
+    State schema for the clinical agent (shared with the swarm graph and checkpointed).
     Attributes:
-        query (str): The user's question.
-        patient_report (str | None): Optional patient report.
-        name (str): Patient name.
-        output (str): LLM generation/output.
+        patient_id (str): Verified patient's ID.
+        patient_name (str): Verified patient's full name.
+        patient (dict | None): Verified patient's discharge report, used as prompt context.
     """
-    query: str
-    patient_report: str | None
-    name: str
-    output: str
+    patient_id: NotRequired[str | None]
+    patient_name: NotRequired[str | None]
+    patient: NotRequired[dict | None]
 
 # ---------------------- Prompt Template ------------------------------- #
 prompt = """
@@ -73,13 +70,22 @@ You have access to:
 from langchain_core.prompts import PromptTemplate  # For prompt formatting (if needed)
 
 # ---------------------- Clinical Agent Creation ----------------------- #
-clinical_assistant = create_react_agent(
-    llm,
-    [rag_tool_function, web_search_tool, create_handoff_tool(
-        agent_name="receptionist_assistant",)],
-    name="clinical_assistant",
-    prompt=prompt,
-)
+def build_clinical_agent(llm=None):
+    """
+    Create the clinical agent (RAG first, web search as fallback, handoff back to the receptionist).
+    Args:
+        llm: Chat model (defaults to the shared Gemini model).
+    Returns:
+        CompiledStateGraph: The `clinical_assistant` agent.
+    """
+    return create_react_agent(
+        llm or get_llm(),
+        [rag_tool_function, web_search_tool, create_handoff_tool(
+            agent_name="receptionist_assistant",)],
+        name="clinical_assistant",
+        state_schema=ClinicalState,
+        prompt=make_prompt(prompt, agent_name="clinical_assistant"),
+    )
 
 
 
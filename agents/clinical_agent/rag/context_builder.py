@@ -0,0 +1,166 @@
+"""
+context_builder.py
+------------------
+Turns retrieved chunks into the context block of the RAG prompt.
+The reference is split into 2500-char chunks with 700-char overlap, so the top-k chunks often
+include neighbours from the same page that repeat each other's text. Before the prompt is filled:
+1. chunks from the same source page are stitched together where they overlap (or contain one another),
+2. passages that are near-duplicates of a higher-ranked one are dropped,
+3. passages are added in retrieval order until the token budget is reached; the passage that does
+   not fit is compressed to its sentences that share the most terms with the question,
+and every passage is labelled with its source and page so answers can cite it.
+"""
+
+import logging  # Level check before the size log
+import os  # For environment variable access
+import re  # Sentence / word splitting
+from typing import List
+
+from langchain_core.documents import Document
+
+from backend.logger import logger  # Custom logger
+
+# ---------------------- Context Configuration ------------------------- #
+CONTEXT_MAX_TOKENS = int(os.getenv("RAG_CONTEXT_MAX_TOKENS", "1500"))  # Context tokens per prompt
+DUPLICATE_THRESHOLD = float(os.getenv("RAG_DUPLICATE_THRESHOLD", "0.8"))  # Shingle Jaccard for near-duplicates
+MIN_OVERLAP_CHARS = 50  # Shorter suffix/prefix matches are coincidence, not chunk overlap
+MIN_PASSAGE_TOKENS = 40  # Budget left below this is not worth a compressed passage
+CHARS_PER_TOKEN = 4  # Same estimate as langchain_core's count_tokens_approximately
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (ceil of chars / CHARS_PER_TOKEN)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+# ---------------------- Merging --------------------------------------- #
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if under MIN_OVERLAP_CHARS)."""
+    probe = right[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = left.find(probe, max(0, len(left) - len(right)))
+    while start != -1:
+        if right.startswith(left[start:]):
+            return len(left) - start
+        start = left.find(probe, start + 1)
+    return 0
+
+
+def _stitch(left: str, right: str) -> str | None:
+    """Combine two chunks of one page if one contains the other or they overlap; None otherwise."""
+    if right in left:
+        return left
+    if left in right:
+        return right
+    overlap = _overlap(left, right)
+    if overlap:
+        return left + right[overlap:]
+    overlap = _overlap(right, left)
+    if overlap:
+        return right + left[overlap:]
+    return None
+
+
+def merge_overlapping(docs: List[Document]) -> List[Document]:
+    """
+    Stitch overlapping chunks of the same (source, page) into one passage.
+    A merged passage takes the rank of its best-ranked chunk; the output keeps retrieval order.
+    """
+    passages = []  # [text, metadata] in rank order; None once merged into another passage
+    by_page = {}  # (source, page) -> indices into passages
+    for doc in docs:
+        metadata = doc.metadata or {}
+        key = (metadata.get("source"), metadata.get("page"))
+        passages.append([doc.page_content.strip(), metadata])
+        if key[1] is None:
+            continue
+        same_page = by_page.setdefault(key, [])
+        same_page.append(len(passages) - 1)
+        # A new chunk can bridge two passages of the page, so merge until nothing changes
+        merged = True
+        while merged:
+            merged = False
+            for i in same_page:
+                for j in same_page:
+                    if i < j and passages[i] is not None and passages[j] is not None:
+                        stitched = _stitch(passages[i][0], passages[j][0])
+                        if stitched is not None:
+                            passages[i][0], passages[j] = stitched, None
+                            merged = True
+            same_page[:] = [i for i in same_page if passages[i] is not None]
+    return [Document(page_content=text, metadata=metadata) for text, metadata in filter(None, passages)]
+
+
+# ---------------------- Near-duplicates ------------------------------- #
+def _shingles(text: str, size: int = 3) -> set:
+    words = WORD.findall(text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def drop_near_duplicates(docs: List[Document], threshold: float = DUPLICATE_THRESHOLD) -> List[Document]:
+    """Drop passages whose word 3-shingles overlap a higher-ranked passage's by at least `threshold` (Jaccard)."""
+    kept, kept_shingles = [], []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & other) / (len(shingles | other) or 1) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+# ---------------------- Budgeting ------------------------------------- #
+def compress(text: str, query: str, max_tokens: int) -> str:
+    """Keep the sentences sharing the most words with the query that fit in `max_tokens`, in original order."""
+    sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+    query_words = {w for w in WORD.findall(query.lower()) if len(w) > 2}
+    ranked = sorted(range(len(sentences)),
+                    key=lambda i: len(query_words & set(WORD.findall(sentences[i].lower()))), reverse=True)
+    chosen, used = set(), 0
+    for i in ranked:
+        cost = estimate_tokens(sentences[i]) + 1
+        if used + cost <= max_tokens:
+            chosen.add(i)
+            used += cost
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def citation(metadata: dict) -> str:
+    """'[source, p. N]' with a 1-based page number (pages are stored 0-based)."""
+    source, page = metadata.get("source") or "reference", metadata.get("page")
+    return f"[{source}, p. {page + 1}]" if isinstance(page, int) else f"[{source}]"
+
+
+def build_context(query: str, docs: List[Document], max_tokens: int = CONTEXT_MAX_TOKENS) -> str:
+    """
+    Assemble the prompt context from retrieved chunks (merge, de-duplicate, fit the budget, cite).
+    Args:
+        query (str): The user's question (used to pick sentences when a passage must be compressed).
+        docs (List[Document]): Retrieved chunks, best first.
+        max_tokens (int): Approximate token budget for the whole context.
+    Returns:
+        str: Passages separated by blank lines, each starting with its citation.
+    """
+    passages = drop_near_duplicates(merge_overlapping(docs))
+    blocks, remaining = [], max_tokens
+    for doc in passages:
+        label = citation(doc.metadata)
+        cost = estimate_tokens(label) + estimate_tokens(doc.page_content) + 2
+        if cost <= remaining:
+            blocks.append(f"{label}\n{doc.page_content}")
+            remaining -= cost
+            continue
+        if remaining >= MIN_PASSAGE_TOKENS:
+            compressed = compress(doc.page_content, query, remaining - estimate_tokens(label) - 2)
+            if compressed:
+                blocks.append(f"{label}\n{compressed}")
+        break
+    context = "\n\n".join(blocks)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[Context] %s chunks -> %s passages | ~%s -> ~%s tokens", len(docs), len(blocks),
+                    sum(estimate_tokens(doc.page_content) for doc in docs), estimate_tokens(context))
+    return context
@@ -1,151 +1,393 @@
 """
-Ultra-Fast Vector Store Creation
--------------------------------
-Streamlined PDF processing and vector store creation with minimal overhead.
-Optimized for maximum speed with clean, simple code.
+Parallel, Incremental Vector Store Ingestion
+--------------------------------------------
+Builds and updates the Qdrant collection from every PDF in the data directory.
+Pages are extracted and chunked in a process pool, embedding overlaps upload through a bounded
+queue, and chunk IDs are content hashes: re-runs only embed and upsert chunks that changed and
+delete chunks that disappeared, instead of dropping and rebuilding the whole collection.
+With --hybrid, chunks are written to the hybrid collection with named dense and sparse (BM25/SPLADE)
+vectors for `hybrid_retriever.py`.
+With --chunker layout, PDFs are chunked by `layout_chunker.py` (headings, sections and tables from
+PyMuPDF's layout, no overlap) instead of per-page recursive splitting; chunks then carry a section
+path and chapter, and the chapter is indexed for filtered retrieval.
+Storage options for large collections apply when a collection is created: scalar (int8) or binary
+quantization of the dense vectors (quantized copy kept in RAM, rescored with the full vectors at
+query time), full vectors and payloads on disk, and HNSW `m` / `ef_construct`.
+With --backend local, the same pipeline writes the memory-mapped local index
+(`backend/local_index.py`) instead, for deployments without a Qdrant server.
 """
 
-import time
+import argparse
+import glob
+import hashlib
 import logging
+import os
+import queue
+import sys
+import threading
+import time
 import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
 from typing import List, Dict, Generator
 import fitz  # PyMuPDF - fastest PDF processing
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from qdrant_client import QdrantClient, models, http
+from qdrant_client import QdrantClient, models
 from qdrant_client.http.models import PointStruct
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from backend.semantic_cache import invalidate_namespace  # Cached answers go stale on re-ingest
+from backend.answer_packs import fingerprint, record_collection_version  # Answer pack staleness
+from backend import resources  # Shared embedding model / Qdrant client
+from agents.clinical_agent.rag.hybrid_retriever import (
+    CHAPTER_FIELD, DENSE_VECTOR_NAME, SPARSE_VECTOR_NAME, to_sparse_vector,
+)
+from agents.clinical_agent.rag import layout_chunker  # Section/table-aware chunking
+from backend.local_index import LOCAL_INDEX_DTYPE, LocalIndexClient  # Server-less memory-mapped backend
+
 # Minimal logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class Config:
     """Configuration settings."""
-    PDF_PATH = r"data\clinical_nephrology.pdf"
-    COLLECTION_NAME = "nephrology_lc_fastembed"
-    MODEL_NAME = "BAAI/bge-base-en-v1.5"
+    DATA_DIR = "data"
+    PDF_GLOB = "*.pdf"
+    COLLECTION_NAME = resources.COLLECTION_NAME
+    HYBRID_COLLECTION_NAME = resources.HYBRID_COLLECTION_NAME
+    MODEL_NAME = resources.EMBEDDING_MODEL_NAME
+    CHUNKER = os.getenv("CHUNKER", "recursive")  # 'recursive' (per page, overlapping) or 'layout'
     CHUNK_SIZE = 2500
     CHUNK_OVERLAP = 700
     BATCH_SIZE = 64  # Optimized batch size
-
-# --- Setup LangChain FastEmbedEmbeddings ---
-logger.info(f"Initializing LangChain FastEmbedEmbeddings with model: {Config.MODEL_NAME}")
-embeddings = FastEmbedEmbeddings(model_name=Config.MODEL_NAME)
-logger.info("✅ LangChain FastEmbedEmbeddings model initialized.")
+    EXTRACT_WORKERS = os.cpu_count() or 1  # Processes extracting/chunking pages
+    PAGES_PER_TASK = 16  # Pages handed to a worker at a time
+    UPLOAD_QUEUE_SIZE = 4  # Embedded batches buffered ahead of the uploader
+    SCROLL_PAGE_SIZE = 1000  # Point IDs fetched per scroll request
+    # Collection storage (see benchmarks/bench_quantization.py for the memory / recall trade-off)
+    QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")  # 'none', 'scalar' (int8) or 'binary'
+    ON_DISK_VECTORS = os.getenv("QDRANT_ON_DISK_VECTORS", "false").lower() == "true"  # Full vectors memory-mapped
+    ON_DISK_PAYLOAD = os.getenv("QDRANT_ON_DISK_PAYLOAD", "false").lower() == "true"  # Chunk text on disk
+    HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))  # Graph links per node (memory vs recall)
+    HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))  # Build-time candidate list
 
 
-def extract_and_chunk_pdf(file_path: str) -> List[Dict]:
-    """
-    Efficiently extract text from PDF and create chunks.
-    Single-pass processing for maximum speed.
-    """
-    logger.info("Starting PDF processing...")
-    start_time = time.time()
-    
-    # Initialize text splitter
+# ---------------------- Extraction & Chunking ------------------------- #
+def _chunk_page_range(file_path: str, source: str, start: int, end: int) -> List[Dict]:
+    """Extract and split pages [start, end) of one PDF (runs inside a worker process)."""
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=Config.CHUNK_SIZE, 
+        chunk_size=Config.CHUNK_SIZE,
         chunk_overlap=Config.CHUNK_OVERLAP
     )
-    
     chunks = []
-    
-    # Process PDF in a single pass
     with fitz.open(file_path) as doc:
-        logger.info(f"Processing {len(doc)} pages...")
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text = page.get_text("text")
-            
+        for page_num in range(start, end):
+            text = doc.load_page(page_num).get_text("text")
             if text.strip():  # Only process pages with content
-                metadata = {"source": file_path, "page": page_num}
-                page_chunks = splitter.create_documents([text], metadatas=[metadata])
-                
-                for chunk in page_chunks:
-                    chunks.append({
-                        "text": chunk.page_content,
-                        "metadata": chunk.metadata
-                    })
-    
-    processing_time = time.time() - start_time
-    logger.info(f"✅ PDF processing complete: {len(chunks)} chunks in {processing_time:.2f}s")
+                metadata = {"source": source, "page": page_num}
+                for chunk in splitter.create_documents([text], metadatas=[metadata]):
+                    chunks.append({"text": chunk.page_content, "metadata": chunk.metadata})
     return chunks
 
 
-def create_embeddings_batch(chunks: List[Dict]) -> List[PointStruct]:
-    """Create embeddings for a batch of chunks."""
+def submit_pdf(file_path: str, executor: ProcessPoolExecutor, source: str | None = None,
+               chunker: str = Config.CHUNKER) -> List[Future]:
+    """
+    Queue the extraction and chunking of one PDF on a process pool.
+    The recursive chunker fans page ranges out as separate tasks; the layout chunker follows
+    sections across pages, so it gets the whole PDF as one task.
+    Returns:
+        List[Future]: Tasks whose results, concatenated in order, are the PDF's chunks in page order.
+    """
+    source = source or os.path.basename(file_path)
+    with fitz.open(file_path) as doc:
+        page_count = len(doc)
+    logger.info(f"Processing {source}: {page_count} pages ({chunker} chunker)...")
+    if chunker == "layout":
+        return [executor.submit(layout_chunker.chunk_pdf, file_path, source, Config.CHUNK_SIZE)]
+    if chunker != "recursive":
+        raise ValueError(f"Unknown chunker: {chunker!r} (expected recursive or layout)")
+    return [
+        executor.submit(_chunk_page_range, file_path, source, start, min(start + Config.PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, Config.PAGES_PER_TASK)
+    ]
+
+
+def extract_and_chunk_pdf(file_path: str, executor: ProcessPoolExecutor, source: str | None = None,
+                          chunker: str = Config.CHUNKER) -> List[Dict]:
+    """
+    Extract text from a PDF and create chunks on a process pool.
+    Chunks are returned in page order.
+    """
+    return [chunk for future in submit_pdf(file_path, executor, source, chunker) for chunk in future.result()]
+
+
+def discover_pdfs(data_dir: str) -> List[str]:
+    """Return every PDF under the data directory (recursively), sorted for stable ordering."""
+    return sorted(glob.glob(os.path.join(data_dir, "**", Config.PDF_GLOB), recursive=True))
+
+
+def chunk_id(chunk: Dict) -> str:
+    """Deterministic point ID: a UUID built from the SHA-256 of the chunk's source, page and text."""
+    metadata = chunk["metadata"]
+    digest = hashlib.sha256(f"{metadata['source']}|{metadata['page']}|{chunk['text']}".encode("utf-8"))
+    return str(uuid.UUID(hex=digest.hexdigest()[:32]))
+
+
+# ---------------------- Embedding & Upload ---------------------------- #
+def create_embeddings_batch(chunks: List[Dict], embeddings, sparse_embeddings=None) -> List[PointStruct]:
+    """Create embeddings for a batch of chunks (named dense + sparse vectors when `sparse_embeddings` is given)."""
     texts = [chunk["text"] for chunk in chunks]
-    # Add the text itself to the metadata for each chunk
-    metadatas = [{**chunk["metadata"], "page_content": chunk["text"]} for chunk in chunks]
-    
-    # Generate embeddings
     vectors = embeddings.embed_documents(texts)
-    
-    # Create Qdrant points with UUIDs
-    points = []
-    for vector, metadata in zip(vectors, metadatas):
-        points.append(PointStruct(
-            id=str(uuid.uuid4()),
-            vector=vector,
-            payload=metadata
-        ))
-    
-    return points
-
-
-def process_in_batches(chunks: List[Dict], batch_size: int) -> Generator[List[PointStruct], None, None]:
+    if sparse_embeddings is not None:
+        sparse = sparse_embeddings.embed(texts, batch_size=len(texts))
+        vectors = [{DENSE_VECTOR_NAME: dense, SPARSE_VECTOR_NAME: to_sparse_vector(sv)}
+                   for dense, sv in zip(vectors, sparse)]
+    # Payload layout expected by the LangChain Qdrant vectorstore
+    return [
+        PointStruct(id=chunk["id"], vector=vector,
+                    payload={"page_content": chunk["text"], "metadata": chunk["metadata"]})
+        for chunk, vector in zip(chunks, vectors)
+    ]
+
+
+def quantization_config(quantization: str):
+    """Qdrant quantization settings for 'scalar' (int8, 4x smaller) or 'binary' (32x smaller); None for 'none'."""
+    if quantization == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+    if quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    if quantization != "none":
+        raise ValueError(f"Unknown quantization: {quantization!r} (expected none, scalar or binary)")
+    return None
+
+
+def create_collection(client: QdrantClient, collection_name: str, vector_size: int, hybrid: bool,
+                      quantization: str = Config.QUANTIZATION, on_disk: bool = Config.ON_DISK_VECTORS,
+                      on_disk_payload: bool = Config.ON_DISK_PAYLOAD, hnsw_m: int = Config.HNSW_M,
+                      hnsw_ef_construct: int = Config.HNSW_EF_CONSTRUCT):
+    """
+    Create the collection: one unnamed dense vector, or named dense + sparse vectors for hybrid search.
+    Args:
+        quantization (str): 'none', 'scalar' or 'binary' quantization of the dense vectors.
+        on_disk (bool): Keep the full dense vectors memory-mapped on disk instead of in RAM.
+        on_disk_payload (bool): Keep payloads (chunk text and metadata) on disk.
+        hnsw_m (int): HNSW links per node.
+        hnsw_ef_construct (int): HNSW build-time candidate list size.
+    """
+    dense = models.VectorParams(size=vector_size, distance=models.Distance.COSINE, on_disk=on_disk)
+    storage = {
+        "quantization_config": quantization_config(quantization),
+        "hnsw_config": models.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+        "on_disk_payload": on_disk_payload,
+    }
+    logger.info(f"Creating '{collection_name}': quantization={quantization}, on_disk={on_disk}, "
+                f"on_disk_payload={on_disk_payload}, hnsw m={hnsw_m} ef_construct={hnsw_ef_construct}")
+    if not hybrid:
+        client.create_collection(collection_name=collection_name, vectors_config=dense, **storage)
+    else:
+        # BM25 vectors carry term frequencies only; Qdrant applies IDF at query time
+        modifier = models.Modifier.IDF if "bm25" in resources.SPARSE_MODEL_NAME.lower() else None
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config={DENSE_VECTOR_NAME: dense},
+            sparse_vectors_config={SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=modifier)},
+            **storage,
+        )
+    # Chapter filters (layout-chunked collections) stay fast; chunks without a chapter are not indexed
+    client.create_payload_index(collection_name, CHAPTER_FIELD, models.PayloadSchemaType.KEYWORD)
+
+
+def process_in_batches(chunks: List[Dict], batch_size: int, embeddings,
+                       sparse_embeddings=None) -> Generator[List[PointStruct], None, None]:
     """Process chunks in batches for efficient embedding and upload."""
     total_batches = (len(chunks) + batch_size - 1) // batch_size
-    
+
     for i in range(0, len(chunks), batch_size):
         batch_num = (i // batch_size) + 1
         batch = chunks[i:i + batch_size]
-        
-        logger.info(f"Processing batch {batch_num}/{total_batches} ({len(batch)} chunks)")
-        
-        # Create embeddings for this batch
-        points = create_embeddings_batch(batch)
-        yield points
 
-# --- Main Execution ---
-if __name__ == "__main__":
-    start_time = time.time()
-    logger.info("Starting optimized vectorstore ingestion...")
+        logger.info(f"Embedding batch {batch_num}/{total_batches} ({len(batch)} chunks)")
+        yield create_embeddings_batch(batch, embeddings, sparse_embeddings)
+
+
+def existing_point_ids(client: QdrantClient, collection_name: str) -> set:
+    """Scroll the collection and return the IDs of all stored points."""
+    ids, offset = set(), None
+    while True:
+        records, offset = client.scroll(collection_name, limit=Config.SCROLL_PAGE_SIZE, offset=offset,
+                                        with_payload=False, with_vectors=False)
+        ids.update(str(record.id) for record in records)
+        if offset is None:
+            return ids
 
-    # Setup Qdrant
-    client = QdrantClient(url="http://localhost:6333")
-    vector_size = len(embeddings.embed_query("test vector size"))
 
-    # Delete collection if exists
+def upload_pipelined(client: QdrantClient, collection_name: str, batches) -> int:
+    """
+    Upload embedded batches on a background thread while the next batch is being embedded.
+    The bounded queue applies back-pressure so embedding never runs far ahead of the upload.
+    """
+    pending = queue.Queue(maxsize=Config.UPLOAD_QUEUE_SIZE)
+    errors = []
+    uploaded = [0]
+
+    def uploader():
+        while (points := pending.get()) is not None:
+            if errors:
+                continue  # Drain the queue after a failure so the producer never blocks
+            try:
+                client.upsert(collection_name=collection_name, points=points, wait=True)
+                uploaded[0] += len(points)
+                logger.info(f"Uploaded {len(points)} points. Total: {uploaded[0]}")
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=uploader, name="qdrant-uploader", daemon=True)
+    thread.start()
     try:
-        client.delete_collection(collection_name=Config.COLLECTION_NAME)
+        for points in batches:
+            if errors:
+                break
+            pending.put(points)
+    finally:
+        pending.put(None)
+        thread.join()
+    if errors:
+        raise errors[0]
+    return uploaded[0]
+
+
+# ---------------------- Ingestion Pipeline ---------------------------- #
+def ingest(data_dir: str = Config.DATA_DIR, client: QdrantClient | None = None, embeddings=None,
+           collection_name: str | None = None, workers: int = Config.EXTRACT_WORKERS,
+           batch_size: int = Config.BATCH_SIZE, recreate: bool = False, hybrid: bool = False,
+           sparse_embeddings=None, chunker: str = Config.CHUNKER, **storage) -> Dict:
+    """
+    Incrementally sync the collection with the PDFs in `data_dir`.
+    Args:
+        data_dir (str): Directory searched (recursively) for PDFs.
+        client (QdrantClient, optional): Qdrant client or LocalIndexClient (defaults to the configured backend).
+        embeddings (Embeddings, optional): Embedding model (defaults to the shared FastEmbed model).
+        collection_name (str, optional): Target collection (defaults to the dense or hybrid collection).
+        workers (int): Extraction processes.
+        batch_size (int): Chunks per embedding/upload batch.
+        recreate (bool): Drop and rebuild the collection from scratch.
+        hybrid (bool): Also store sparse vectors (named-vector layout for hybrid retrieval).
+        sparse_embeddings (SparseTextEmbedding, optional): Sparse model (defaults to the shared one).
+        chunker (str): 'recursive' (per-page splitter with overlap) or 'layout' (layout_chunker.py).
+        **storage: Storage options for a new collection (quantization, on_disk, on_disk_payload,
+            hnsw_m, hnsw_ef_construct; see `create_collection`). An existing collection keeps its
+            settings; use `recreate` to change them.
+    Returns:
+        Dict: Chunk counts (total, embedded, deleted, unchanged), timings and chunks/second.
+    """
+    start_time = time.time()
+    client = client or resources.get_vector_client()
+    # Resolved here (not at import) so spawned extraction workers never load the model
+    embeddings = embeddings or resources.get_embeddings()
+    if hybrid:
+        sparse_embeddings = sparse_embeddings or resources.get_sparse_embeddings()
+        collection_name = collection_name or Config.HYBRID_COLLECTION_NAME
+    else:
+        sparse_embeddings = None
+        collection_name = collection_name or Config.COLLECTION_NAME
+
+    if recreate and client.collection_exists(collection_name):
+        client.delete_collection(collection_name=collection_name)
         logger.info("Deleted existing collection.")
-    except http.exceptions.UnexpectedResponse:
-        pass
+    if not client.collection_exists(collection_name):
+        create_collection(client, collection_name, len(embeddings.embed_query("test vector size")), hybrid, **storage)
+    elif storage:
+        logger.info("Collection exists; keeping its storage settings (use --recreate to change them).")
+    logger.info(f"Collection '{collection_name}' ready.")
 
-    client.create_collection(
-        collection_name=Config.COLLECTION_NAME,
-        vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
-    )
-    logger.info(f"Collection '{Config.COLLECTION_NAME}' ready.")
-
-    # Extract and chunk PDF
-    chunks = extract_and_chunk_pdf(Config.PDF_PATH)
-    logger.info(f"Total chunks created: {len(chunks)}")
-
-    # Process in batches and upload to Qdrant
-    total_uploaded = 0
-    for batch_points in process_in_batches(chunks, Config.BATCH_SIZE):
-        # Upload batch to Qdrant
-        client.upload_points(
-            collection_name=Config.COLLECTION_NAME,
-            points=batch_points,
-            wait=True
-        )
-        total_uploaded += len(batch_points)
-        logger.info(f"Uploaded {len(batch_points)} points. Total: {total_uploaded}")
+    # Extract and chunk every PDF in parallel
+    pdfs = discover_pdfs(data_dir)
+    chunks = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Every PDF is queued before any result is awaited, so PDFs are chunked in parallel too
+        futures = [future for path in pdfs
+                   for future in submit_pdf(path, executor, os.path.relpath(path, data_dir).replace(os.sep, "/"), chunker)]
+        for future in futures:
+            chunks.extend(future.result())
+    extract_time = time.time() - start_time
+    logger.info(f"✅ Extracted {len(chunks)} chunks from {len(pdfs)} PDFs in {extract_time:.2f}s")
+
+    # Diff against what is already stored
+    by_id = {}
+    for chunk in chunks:
+        chunk["id"] = chunk_id(chunk)
+        by_id[chunk["id"]] = chunk  # Identical chunks collapse to one point
+    stored = existing_point_ids(client, collection_name)
+    new_chunks = [chunk for cid, chunk in by_id.items() if cid not in stored]
+    removed = [pid for pid in stored if pid not in by_id]
+    logger.info(f"{len(new_chunks)} new/changed chunks, {len(removed)} removed, "
+                f"{len(by_id) - len(new_chunks)} unchanged")
+
+    batches = process_in_batches(new_chunks, batch_size, embeddings, sparse_embeddings)
+    uploaded = upload_pipelined(client, collection_name, batches)
+    for i in range(0, len(removed), Config.SCROLL_PAGE_SIZE):
+        client.delete(collection_name=collection_name,
+                      points_selector=models.PointIdsList(points=removed[i:i + Config.SCROLL_PAGE_SIZE]), wait=True)
+
+    if isinstance(client, LocalIndexClient):
+        client.persist(collection_name)  # Buffered writes become the new memory-mapped files
+
+    if uploaded or removed:
+        # Answers cached against the previous collection contents are no longer valid
+        invalidate_namespace(collection_name)
+    # Precomputed answer packs are served only while they match this version
+    record_collection_version(collection_name, fingerprint(by_id))
 
     total_time = time.time() - start_time
+    stats = {
+        "pdfs": len(pdfs),
+        "chunks": len(by_id),
+        "embedded": uploaded,
+        "deleted": len(removed),
+        "unchanged": len(by_id) - len(new_chunks),
+        "extract_seconds": round(extract_time, 2),
+        "total_seconds": round(total_time, 2),
+        "chunks_per_second": round(len(by_id) / total_time, 1) if total_time else 0.0,
+    }
     logger.info(f"✅ Ingestion complete in {total_time:.2f} seconds.")
-    logger.info(f"📊 Performance: {len(chunks)/total_time:.1f} chunks/second")
\ No newline at end of file
+    logger.info(f"📊 Performance: {stats}")
+    return stats
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the Qdrant collection with the PDFs in a directory.")
+    parser.add_argument("--data-dir", default=Config.DATA_DIR, help="Directory containing reference PDFs")
+    parser.add_argument("--collection", default=None,
+                        help="Qdrant collection name (default: the dense or hybrid collection)")
+    parser.add_argument("--workers", type=int, default=Config.EXTRACT_WORKERS, help="Extraction processes")
+    parser.add_argument("--batch-size", type=int, default=Config.BATCH_SIZE, help="Chunks per embedding batch")
+    parser.add_argument("--recreate", action="store_true", help="Drop the collection and rebuild from scratch")
+    parser.add_argument("--hybrid", action="store_true", help="Store dense + sparse vectors for hybrid retrieval")
+    parser.add_argument("--chunker", choices=["recursive", "layout"], default=Config.CHUNKER,
+                        help="Per-page recursive splitting, or layout-aware section/table chunks")
+    parser.add_argument("--quantization", choices=["none", "scalar", "binary"], default=Config.QUANTIZATION,
+                        help="Quantize dense vectors (kept in RAM, rescored with full vectors at query time)")
+    parser.add_argument("--on-disk", action="store_true", default=Config.ON_DISK_VECTORS,
+                        help="Keep full dense vectors on disk (memory-mapped)")
+    parser.add_argument("--on-disk-payload", action="store_true", default=Config.ON_DISK_PAYLOAD,
+                        help="Keep payloads on disk")
+    parser.add_argument("--hnsw-m", type=int, default=Config.HNSW_M, help="HNSW links per node")
+    parser.add_argument("--hnsw-ef-construct", type=int, default=Config.HNSW_EF_CONSTRUCT,
+                        help="HNSW build-time candidate list size")
+    parser.add_argument("--backend", choices=["qdrant", "local"], default=resources.VECTOR_BACKEND,
+                        help="Write to Qdrant, or to the memory-mapped local index (LOCAL_INDEX_DIR)")
+    parser.add_argument("--local-dtype", choices=["float16", "int8"], default=LOCAL_INDEX_DTYPE,
+                        help="Local index vector storage")
+    args = parser.parse_args()
+    if args.backend == "local":
+        # Qdrant storage options (quantization, on-disk, HNSW) do not apply to the local index
+        ingest(args.data_dir, LocalIndexClient(dtype=args.local_dtype), collection_name=args.collection,
+               workers=args.workers, batch_size=args.batch_size, recreate=args.recreate, hybrid=args.hybrid,
+               chunker=args.chunker)
+    else:
+        ingest(args.data_dir, collection_name=args.collection, workers=args.workers,
+               batch_size=args.batch_size, recreate=args.recreate, hybrid=args.hybrid, chunker=args.chunker,
+               quantization=args.quantization, on_disk=args.on_disk, on_disk_payload=args.on_disk_payload,
+               hnsw_m=args.hnsw_m, hnsw_ef_construct=args.hnsw_ef_construct)
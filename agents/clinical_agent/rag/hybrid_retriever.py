@@ -0,0 +1,152 @@
+"""
+hybrid_retriever.py
+-------------------
+Hybrid dense + sparse retrieval over the nephrology collection.
+Each chunk is stored with a dense `BAAI/bge-base-en-v1.5` vector and a sparse BM25/SPLADE vector
+(named vectors in one Qdrant collection, written by `create_vectorstore.py --hybrid`). A query
+prefetches candidates from both, fuses them with Reciprocal Rank Fusion inside Qdrant, and
+reranks the fused candidates with a small CPU cross-encoder while staying within a latency
+budget. Exact terms such as drug names and lab values (eGFR, creatinine) are matched by the
+sparse side, which the dense-only retriever often misses.
+"""
+
+import os  # For environment variable access
+import threading  # Guards the shared rerank cost estimate
+import time  # Latency budget
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+from qdrant_client import models
+
+from backend import resources  # Shared models / Qdrant client
+from backend.logger import logger  # Custom logger
+from backend.metrics import stage_timer  # Per-stage latency histogram
+
+# ---------------------- Retrieval Configuration ----------------------- #
+DENSE_VECTOR_NAME = "dense"
+SPARSE_VECTOR_NAME = "sparse"
+CHAPTER_FIELD = "metadata.chapter"  # Set by the layout chunker; indexed for filtered retrieval
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4"))  # Chunks handed to the LLM
+PREFETCH_K = int(os.getenv("HYBRID_PREFETCH_K", "20"))  # Candidates per vector type before fusion
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "12"))  # Fused candidates offered to the reranker
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+LATENCY_BUDGET_MS = float(os.getenv("RETRIEVAL_LATENCY_BUDGET_MS", "800"))  # Whole retrieval, incl. rerank
+
+
+def chapter_filter(chapter: str | None) -> models.Filter | None:
+    """Qdrant filter restricting a search to one chapter of the reference (None for no filter)."""
+    if not chapter:
+        return None
+    return models.Filter(must=[models.FieldCondition(key=CHAPTER_FIELD, match=models.MatchValue(value=chapter))])
+
+
+def to_sparse_vector(embedding) -> models.SparseVector:
+    """Convert a FastEmbed SparseEmbedding into a Qdrant SparseVector."""
+    return models.SparseVector(indices=embedding.indices.tolist(), values=embedding.values.tolist())
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    LangChain retriever doing dense + sparse prefetch, RRF fusion and budgeted cross-encoder reranking.
+    Reranking cost grows with the number of candidates, so the retriever keeps a running estimate
+    of milliseconds per candidate and only reranks as many as fit in what is left of the budget
+    (none if fusion alone used it up).
+    """
+
+    client: Any
+    collection_name: str
+    embeddings: Any
+    sparse_embeddings: Any
+    reranker: Any = None
+    k: int = RETRIEVAL_K
+    prefetch_k: int = PREFETCH_K
+    rerank_candidates: int = RERANK_CANDIDATES
+    latency_budget_ms: float = LATENCY_BUDGET_MS
+    query_filter: Any = None  # Optional payload filter (e.g. chapter_filter) applied to both prefetches
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _rerank_ms_per_doc: float | None = PrivateAttr(default=None)
+    _stats: dict = PrivateAttr(default_factory=lambda: {"queries": 0, "reranked": 0, "rerank_skipped": 0})
+
+    def fused_search(self, query: str, limit: int) -> List[Document]:
+        """Prefetch from the dense and sparse vectors and fuse them with RRF (no reranking)."""
+        dense = self.embeddings.embed_query(query)
+        with stage_timer("embed_query", "sparse"):
+            sparse = next(iter(self.sparse_embeddings.query_embed(query)))
+        with stage_timer("qdrant", "hybrid_query"):
+            response = self.client.query_points(
+                collection_name=self.collection_name,
+                prefetch=[
+                    models.Prefetch(query=dense, using=DENSE_VECTOR_NAME, limit=self.prefetch_k,
+                                    params=resources.search_params(), filter=self.query_filter),
+                    models.Prefetch(query=to_sparse_vector(sparse), using=SPARSE_VECTOR_NAME, limit=self.prefetch_k,
+                                    filter=self.query_filter),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                limit=limit,
+                with_payload=True,
+            )
+        return [
+            Document(page_content=point.payload.get("page_content", ""),
+                     metadata={**(point.payload.get("metadata") or {}), "fusion_score": point.score})
+            for point in response.points
+        ]
+
+    def rerank(self, query: str, docs: List[Document], remaining_ms: float) -> List[Document]:
+        """Rerank as many leading candidates as the remaining budget allows; the rest keep fused order."""
+        n = len(docs)
+        if self._rerank_ms_per_doc:
+            n = min(n, int(remaining_ms // self._rerank_ms_per_doc))
+        if n < 2:
+            self._stats["rerank_skipped"] += 1
+            logger.info("[Hybrid] Skipping rerank: %.0fms left of %.0fms budget", remaining_ms, self.latency_budget_ms)
+            return docs
+        start = time.perf_counter()
+        with stage_timer("rerank", "cross_encoder"):
+            scores = list(self.reranker.rerank(query, [doc.page_content for doc in docs[:n]]))
+        per_doc = (time.perf_counter() - start) * 1000 / n
+        with self._lock:  # Exponential moving average of the per-candidate cost
+            self._rerank_ms_per_doc = per_doc if self._rerank_ms_per_doc is None \
+                else 0.8 * self._rerank_ms_per_doc + 0.2 * per_doc
+        self._stats["reranked"] += 1
+        for doc, score in zip(docs, scores):
+            doc.metadata["rerank_score"] = float(score)
+        head = sorted(docs[:n], key=lambda doc: doc.metadata["rerank_score"], reverse=True)
+        return head + docs[n:]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        start = time.perf_counter()
+        self._stats["queries"] += 1
+        limit = max(self.k, self.rerank_candidates) if self.reranker is not None else self.k
+        docs = self.fused_search(query, limit)
+        if self.reranker is not None and len(docs) > 1:
+            remaining_ms = self.latency_budget_ms - (time.perf_counter() - start) * 1000
+            docs = self.rerank(query, docs, remaining_ms)
+        logger.info("[Hybrid] Retrieved %s chunks in %.0fms", min(len(docs), self.k), (time.perf_counter() - start) * 1000)
+        return docs[:self.k]
+
+    def stats(self) -> dict:
+        """Query, rerank and budget-skip counts plus the current per-candidate rerank cost."""
+        return {**self._stats, "rerank_ms_per_doc": round(self._rerank_ms_per_doc or 0.0, 2)}
+
+
+def load_hybrid_retriever(rerank: bool = RERANK_ENABLED, **kwargs) -> HybridRetriever:
+    """
+    Build a HybridRetriever over the hybrid collection using the shared models and client.
+    Args:
+        rerank (bool): Load the cross-encoder and rerank fused candidates.
+        **kwargs: Overrides for HybridRetriever fields (k, prefetch_k, latency_budget_ms, ...).
+    Returns:
+        HybridRetriever: Ready-to-use LangChain retriever.
+    """
+    return HybridRetriever(
+        client=resources.get_qdrant_client(),
+        collection_name=kwargs.pop("collection_name", resources.HYBRID_COLLECTION_NAME),
+        embeddings=resources.get_embeddings(),
+        sparse_embeddings=resources.get_sparse_embeddings(),
+        reranker=resources.get_reranker() if rerank else None,
+        **kwargs,
+    )
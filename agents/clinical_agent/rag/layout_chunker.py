@@ -0,0 +1,280 @@
+"""
+layout_chunker.py
+-----------------
+Layout-aware chunking of the reference PDFs for `create_vectorstore.py --chunker layout`.
+The recursive splitter cuts every page on its own into 2500-char windows with 700 chars of
+overlap, so chunks stop at page breaks, headings and tables are cut mid-way, and the overlap
+embeds much of the text twice. This chunker reads PyMuPDF's block and font information instead:
+- running headers/footers (text repeated in the page margins) are dropped,
+- headings are recognised by font size or bold weight and ranked into chapter / section /
+  subsection levels, keeping a section path while walking the whole document,
+- ruled tables found by `page.find_tables()` become their own chunks (as Markdown; split between rows
+  with the header repeated when large),
+- whole sections are packed into chunks up to `max_chars` without overlap, across page breaks
+  but never across chapters; only sections larger than that are split, between paragraphs.
+Each chunk's metadata carries the first page (`page`, used for citations and chunk IDs),
+`page_end`, `section_path`, `section` and `chapter`, so retrieval can be filtered by chapter.
+"""
+
+import re  # Sentence splitting / header normalization
+from collections import Counter  # Font size and margin text statistics
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+
+# ---------------------- Chunking Configuration ------------------------ #
+MAX_CHUNK_CHARS = 2500  # Same ceiling as the recursive splitter
+SECTION_LEVEL = 2  # Chapters and sections are kept whole; subsections stay with their section
+HEADING_SIZE_RATIO = 1.15  # Font size over the body size that marks a heading
+MAX_HEADING_CHARS = 120
+MARGIN_RATIO = 0.07  # Top/bottom share of the page checked for running headers and footers
+BOLD_FLAG = 16  # PyMuPDF span flag bit for bold text
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+CHAPTER_PATTERN = re.compile(r"^(chapter|part|section)\s+[\dIVXLC]+\b", re.IGNORECASE)
+
+
+# ---------------------- Layout Extraction ----------------------------- #
+def _block_text(block: dict) -> str:
+    """Join a text block's lines, undoing end-of-line hyphenation."""
+    text = ""
+    for line in block["lines"]:
+        line_text = "".join(span["text"] for span in line["spans"]).strip()
+        if not line_text:
+            continue
+        if text.endswith("-") and line_text[:1].islower():
+            text = text[:-1] + line_text
+        else:
+            text = f"{text} {line_text}" if text else line_text
+    return text
+
+
+def _block_font(block: dict) -> tuple[float, bool]:
+    """Largest span size in the block and whether all of its text is bold."""
+    spans = [span for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+    size = max(round(span["size"] * 2) / 2 for span in spans)
+    return size, all(span["flags"] & BOLD_FLAG for span in spans)
+
+
+def _inside(rect: fitz.Rect, box: fitz.Rect) -> bool:
+    """True if most of `rect` lies within `box`."""
+    overlap = rect & box
+    return not overlap.is_empty and overlap.get_area() > 0.5 * rect.get_area()
+
+
+def _margin_key(text: str) -> str:
+    """Running header/footer text with page numbers removed."""
+    return re.sub(r"\d+", "#", text.casefold()).strip()
+
+
+def extract_elements(doc: fitz.Document, tables: bool = True) -> List[Dict]:
+    """
+    Read the document as a sequence of headings, paragraphs and tables in reading order.
+    Args:
+        doc (fitz.Document): Open PDF.
+        tables (bool): Detect tables with `page.find_tables()`.
+    Returns:
+        List[Dict]: Elements with kind ('heading', 'text' or 'table'), text, page and, for
+            headings, level (1 = chapter, 2 = section, 3 = subsection).
+    """
+    pages = []  # Per page: (text blocks with position and font, table elements)
+    sizes, margins = Counter(), Counter()
+    for page_num, page in enumerate(doc):
+        height = page.rect.height
+        # Table detection follows ruling lines, so pages without vector drawings are skipped (it is slow)
+        found = page.find_tables().tables if tables and page.get_cdrawings() else []
+        table_boxes = [fitz.Rect(table.bbox) for table in found]
+        blocks = []
+        for block in page.get_text("dict", sort=True)["blocks"]:
+            if block["type"] != 0 or any(_inside(fitz.Rect(block["bbox"]), box) for box in table_boxes):
+                continue  # Table text comes from the table itself
+            text = _block_text(block)
+            if not text:
+                continue
+            size, bold = _block_font(block)
+            in_margin = block["bbox"][3] < height * MARGIN_RATIO or block["bbox"][1] > height * (1 - MARGIN_RATIO)
+            if in_margin:
+                margins[_margin_key(text)] += 1
+            sizes[size] += len(text)
+            blocks.append({"y": block["bbox"][1], "text": text, "size": size, "bold": bold, "margin": in_margin,
+                           "lines": len(block["lines"])})
+        table_elements = [{"y": table.bbox[1], "kind": "table", "text": table.to_markdown().strip(), "page": page_num}
+                          for table in found]
+        pages.append((blocks, table_elements))
+    if not sizes:
+        return []
+
+    body_size = sizes.most_common(1)[0][0]  # Size carrying the most characters
+    repeated = {key for key, count in margins.items() if count >= max(3, 0.3 * len(pages))}
+
+    def is_heading(block: dict) -> bool:
+        if len(block["text"]) > MAX_HEADING_CHARS or block["lines"] > 2 or block["text"].endswith((".", ",", ";")):
+            return False
+        return block["size"] >= body_size * HEADING_SIZE_RATIO or (block["bold"] and block["size"] >= body_size)
+
+    heading_sizes = sorted({b["size"] for blocks, _ in pages for b in blocks
+                            if is_heading(b) and b["size"] >= body_size * HEADING_SIZE_RATIO}, reverse=True)
+
+    def level(block: dict) -> int:
+        if CHAPTER_PATTERN.match(block["text"]):
+            return 1
+        if block["size"] in heading_sizes:
+            return min(heading_sizes.index(block["size"]) + 1, 3)
+        return min(len(heading_sizes) + 1, 3)  # Bold body-size heading: the lowest level
+
+    elements = []
+    for page_num, (blocks, table_elements) in enumerate(pages):
+        page_elements = []
+        for block in blocks:
+            if block["margin"] and _margin_key(block["text"]) in repeated:
+                continue
+            if block["margin"] and block["text"].strip().isdigit():
+                continue  # Page number
+            if is_heading(block):
+                page_elements.append({"y": block["y"], "kind": "heading", "text": block["text"], "page": page_num,
+                                      "level": level(block)})
+            else:
+                page_elements.append({"y": block["y"], "kind": "text", "text": block["text"], "page": page_num})
+        page_elements.extend(element for element in table_elements if element["text"])
+        page_elements.sort(key=lambda element: element["y"])
+        for element in page_elements:
+            del element["y"]
+        elements.extend(page_elements)
+    return elements
+
+
+# ---------------------- Chunk Assembly -------------------------------- #
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Split an oversized paragraph between sentences (hard-cut sentences longer than max_chars)."""
+    pieces, current = [], ""
+    for sentence in SENTENCE_SPLIT.split(text):
+        while len(sentence) > max_chars:
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_table(markdown: str, max_chars: int) -> List[str]:
+    """Split a Markdown table between rows, repeating the header (and separator) rows in each part."""
+    rows = markdown.splitlines()
+    header, body = rows[:2], rows[2:]
+    parts, current = [], list(header)
+    for row in body:
+        if len(current) > len(header) and sum(len(r) + 1 for r in current) + len(row) > max_chars:
+            parts.append("\n".join(current))
+            current = list(header)
+        current.append(row)
+    parts.append("\n".join(current))
+    return parts
+
+
+def group_sections(elements: List[Dict]) -> List[Dict]:
+    """
+    Group elements into sections: a chapter or section heading (level <= SECTION_LEVEL) and
+    everything up to the next one, subsection headings included. Each table is its own group.
+    Returns:
+        List[Dict]: Groups with kind ('text' or 'table'), path (enclosing heading titles),
+            chapter_start, opens_with_heading and items ([(text, page)]).
+    """
+    groups, path, current = [], [], None
+    for element in elements:
+        text, page = element["text"], element["page"]
+        if element["kind"] == "heading":
+            path = [(level, title) for level, title in path if level < element["level"]]
+            path.append((element["level"], text))
+            if element["level"] <= SECTION_LEVEL:
+                current = {"kind": "text", "path": [title for _, title in path], "items": [],
+                           "chapter_start": element["level"] == 1, "opens_with_heading": True}
+                groups.append(current)
+        elif element["kind"] == "table":
+            groups.append({"kind": "table", "path": [title for _, title in path], "items": [(text, page)]})
+            current = None
+            continue
+        if current is None:  # Text before the first heading or after a table
+            current = {"kind": "text", "path": [title for _, title in path], "items": [],
+                       "chapter_start": False, "opens_with_heading": element["kind"] == "heading"}
+            groups.append(current)
+        current["items"].append((text, page))
+    return groups
+
+
+def chunk_elements(elements: List[Dict], source: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Dict]:
+    """
+    Pack layout elements into section-aligned chunks.
+    Whole sections are packed together while they fit in `max_chars` (never across chapters);
+    a section larger than that gets chunks of its own, split between paragraphs, each after the
+    first starting with the section path.
+    Args:
+        elements (List[Dict]): Output of `extract_elements`.
+        source (str): Source file name stored in the metadata.
+        max_chars (int): Chunk size ceiling.
+    Returns:
+        List[Dict]: {'text', 'metadata'} chunks in document order.
+    """
+    chunks, parts, pages, chunk_path = [], [], [], []
+
+    def emit(text: str, first_page: int, last_page: int, titles: List[str], kind: str = "text"):
+        chunks.append({"text": text, "metadata": {
+            "source": source, "page": first_page, "page_end": last_page, "section_path": titles,
+            "section": " > ".join(titles), "chapter": titles[0] if titles else None, "kind": kind,
+        }})
+
+    def size() -> int:
+        return sum(len(part) + 2 for part in parts)
+
+    def flush():
+        if parts:
+            emit("\n\n".join(parts), pages[0], pages[-1], chunk_path)
+            parts.clear()
+            pages.clear()
+
+    for group in group_sections(elements):
+        if group["kind"] == "table":
+            flush()
+            text, page = group["items"][0]
+            for part in _split_table(text, max_chars):
+                emit(part, page, page, group["path"], kind="table")
+            continue
+        group_size = sum(len(text) + 2 for text, _ in group["items"])
+        if parts and (group["chapter_start"] or group["path"][:1] != chunk_path[:1]
+                      or size() + group_size > max_chars):
+            flush()
+        if not parts:
+            chunk_path = group["path"]
+            if chunk_path and not group["opens_with_heading"]:
+                parts.append(" > ".join(chunk_path))  # Chunk starts mid-section: keep its context
+                pages.append(group["items"][0][1])
+        for text, page in group["items"]:
+            for piece in (_split_long(text, max_chars) if len(text) > max_chars else [text]):
+                if parts and size() + len(piece) > max_chars:
+                    flush()
+                    chunk_path = group["path"]
+                    parts.append(" > ".join(chunk_path))
+                    pages.append(page)
+                parts.append(piece)
+                pages.append(page)
+    flush()
+    return chunks
+
+
+def chunk_pdf(file_path: str, source: str, max_chars: int = MAX_CHUNK_CHARS, tables: bool = True) -> List[Dict]:
+    """
+    Extract and chunk one PDF by its layout (runs inside an ingestion worker process).
+    Args:
+        file_path (str): PDF path.
+        source (str): Source name stored in the metadata.
+        max_chars (int): Chunk size ceiling.
+        tables (bool): Detect tables and chunk them separately.
+    Returns:
+        List[Dict]: {'text', 'metadata'} chunks in document order.
+    """
+    with fitz.open(file_path) as doc:
+        elements = extract_elements(doc, tables)
+    return chunk_elements(elements, source, max_chars)
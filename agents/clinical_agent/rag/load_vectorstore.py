@@ -1,35 +1,30 @@
 """
 load_vectorstore.py
 ------------------
-This module provides a function to load a Qdrant vectorstore using LangChain and HuggingFace embeddings.
-It connects to a local Qdrant instance and loads the 'nephrology' collection for semantic search/retrieval.
+This module provides a function to load a Qdrant vectorstore using LangChain and FastEmbed embeddings.
+It uses the shared embedding model and Qdrant client from `backend.resources`, so repeated calls
+never reload the ONNX model or open new connections. With VECTOR_BACKEND=local it returns a
+store over the memory-mapped local index instead (no Qdrant server).
 """
 
 # Import required modules for vectorstore and embeddings
-from langchain_qdrant import Qdrant  # LangChain Qdrant integration
-from langchain_huggingface import HuggingFaceEmbeddings  # For embedding model
-from qdrant_client import QdrantClient  # Qdrant Python client
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+from langchain_qdrant import QdrantVectorStore  # LangChain Qdrant integration (query_points API)
+from backend.resources import (  # Shared resources
+    COLLECTION_NAME, VECTOR_BACKEND, get_embeddings, get_local_index_client, get_qdrant_client,
+)
 
 def load_vectorstore():
     """
-    Loads the Qdrant vectorstore for the 'nephrology' collection using HuggingFace embeddings.
+    Loads the Qdrant vectorstore for the 'nephrology' collection using the shared FastEmbed model.
     Returns:
-        Qdrant: LangChain Qdrant vectorstore object ready for retrieval/QA tasks.
+        VectorStore: LangChain Qdrant vectorstore (or LocalVectorStore) ready for retrieval/QA tasks.
     """
-    # Initialize HuggingFace embedding model (CPU by default)
-    embeddings = FastEmbedEmbeddings(
-        model_name="BAAI/bge-base-en-v1.5",
-        model_kwargs={'device': 'cpu'}
+    if VECTOR_BACKEND == "local":
+        from backend.local_index import LocalVectorStore
+        return LocalVectorStore(get_local_index_client().get_index(COLLECTION_NAME), get_embeddings())
+    # Return LangChain Qdrant vectorstore object over the process-wide client and model
+    return QdrantVectorStore(
+        client=get_qdrant_client(),
+        collection_name=COLLECTION_NAME,
+        embedding=get_embeddings()
     )
-    # Connect to local Qdrant instance
-    client = QdrantClient(url="http://localhost:6333")
-    # Return LangChain Qdrant vectorstore object
-    # query_vector = embeddings.embed_query(query)
-    return Qdrant(
-        client=client,
-        collection_name="nephrology_lc_fastembed",
-        embeddings=embeddings
-    )
-
-
@@ -2,22 +2,29 @@
 rag_tool.py
 -----------
 This module provides a Retrieval-Augmented Generation (RAG) tool for answering medical questions using a nephrology reference book and, if needed, web search. It uses LangChain, HuggingFace, and Qdrant for retrieval, and a language model for answer generation.
+Retrieved chunks go through `context_builder.build_context` (overlap merging, de-duplication,
+token budget, page citations) before they are put in the prompt.
 """
 
-from langchain.tools import Tool  # For tool integration in LangChain
+import threading  # Guards lazy initialization
 
-from agents.clinical_agent.rag.load_vectorstore import load_vectorstore  # Loads the Qdrant vectorstore
-from langchain.chains import RetrievalQA  # For retrieval-augmented QA
+from langchain_core.output_parsers import StrOutputParser  # Answer text from the chat model
 from langchain_core.prompts import PromptTemplate  # For custom prompt templates
-from langchain_google_genai import ChatGoogleGenerativeAI  # (Optional) Google GenAI LLM
-from dotenv import load_dotenv  # For environment variable management
-from agents.llm_model import llm  # The main language model
-from backend.logger import logger  # Custom logger
+from langchain_core.runnables import RunnableLambda  # Retrieval + context assembly step
+from langgraph.constants import TAG_NOSTREAM  # Keeps the chain's LLM tokens out of the chat stream
+from agents.clinical_agent.rag.context_builder import build_context  # Token-budgeted, cited context
+from agents.llm_model import get_llm  # The main language model
+from backend.logger import logger, phi  # Custom logger
+from backend.semantic_cache import SemanticCache, CACHE_ENABLED  # Embedding-keyed answer cache
+from backend import resources  # Retrieval mode, collections and the shared embedding model
+from backend.metrics import stats_collector  # Cache stats as /metrics gauges
+from backend.resilience import rag  # Deadline, retries and circuit breaker
 
 # ---------------------- Prompt Template ------------------------------- #
 prompt_template = PromptTemplate.from_template(
     """Use the nephrology reference below to answer the question.
        if not enough information is available, use web search to find the answer.
+       Cite the reference passages you use by their [source, p. N] labels.
 
     Context:
     {context}
@@ -28,16 +35,83 @@ prompt_template = PromptTemplate.from_template(
     Answer:"""
 )
 
-# ---------------------- Retriever Setup ------------------------------- #
-retriever = load_vectorstore().as_retriever()  # Qdrant retriever for semantic search
+# Returned instead of an answer when retrieval/generation fails or its breaker is open
+REFERENCE_UNAVAILABLE = ("The nephrology reference is currently unavailable. Use web_search_tool instead, "
+                         "and say that the answer is not from the reference materials.")
 
-# ---------------------- RAG Chain Setup ------------------------------- #
-rag_chain = RetrievalQA.from_chain_type(
-    llm=llm,  # Language model (from agents.llm_model)
-    retriever=retriever,  # Qdrant retriever
-    chain_type="stuff",  # Stuff all retrieved docs into prompt
-    chain_type_kwargs={"prompt": prompt_template}  # Use custom prompt
-)
+# ---------------------- Lazy Setup ------------------------------------ #
+# The retriever, cache and chain connect to Qdrant / load models, so they are built on first use
+RETRIEVAL_MODE = resources.RETRIEVAL_MODE  # 'dense' or 'hybrid'
+if RETRIEVAL_MODE == "hybrid" and resources.VECTOR_BACKEND == "local":
+    logger.warning("[RAG] The local vector index is dense-only; using dense retrieval")
+    RETRIEVAL_MODE = "dense"
+retrieval_collection = resources.HYBRID_COLLECTION_NAME if RETRIEVAL_MODE == "hybrid" else resources.COLLECTION_NAME
+
+_lock = threading.Lock()
+_semantic_cache = None
+_rag_chain = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """
+    Return the RAG answer cache, opening it on first use.
+    Partitioned by collection so re-ingestion (create_vectorstore.py) can invalidate it.
+    """
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache(namespace=retrieval_collection)
+                stats_collector.register("semantic_cache", _semantic_cache.stats)
+    return _semantic_cache
+
+
+def get_retriever(chapter: str | None = None):
+    """
+    Build the configured retriever.
+    Args:
+        chapter (str, optional): Only search this chapter (collections built with the layout chunker).
+    Returns:
+        BaseRetriever: Hybrid (dense + BM25/SPLADE, RRF fusion and reranking) or dense semantic search.
+    """
+    from agents.clinical_agent.rag.hybrid_retriever import (  # Imports qdrant_client
+        RETRIEVAL_K, chapter_filter, load_hybrid_retriever,
+    )
+    from agents.clinical_agent.rag.load_vectorstore import load_vectorstore
+    if RETRIEVAL_MODE == "hybrid":
+        retriever = load_hybrid_retriever(query_filter=chapter_filter(chapter))
+    else:
+        retriever = load_vectorstore().as_retriever(search_kwargs={
+            "k": RETRIEVAL_K, "search_params": resources.search_params(), "filter": chapter_filter(chapter)})
+    logger.info("[RAG] Retrieval mode: %s | Collection: %s | Chapter: %s", RETRIEVAL_MODE, retrieval_collection,
+                chapter or "all")
+    return retriever
+
+
+def get_rag_chain():
+    """
+    Return the RAG chain, building it (retriever + LLM) on first use:
+    question -> retriever -> build_context -> prompt -> LLM -> answer text.
+    Returns:
+        Runnable: Takes the question string, returns the answer string.
+    """
+    global _rag_chain
+    if _rag_chain is None:
+        with _lock:
+            if _rag_chain is None:
+                retriever = get_retriever()  # Qdrant retriever
+
+                def retrieve_context(question: str, config) -> dict:
+                    docs = retriever.invoke(question, config)  # Same run tree / callbacks as the chain
+                    return {"question": question, "context": build_context(question, docs)}
+
+                _rag_chain = (
+                    RunnableLambda(retrieve_context, name="retrieve_context")
+                    | prompt_template  # Use custom prompt
+                    | get_llm().with_config(tags=[TAG_NOSTREAM])  # Tool-internal: not streamed to the user
+                    | StrOutputParser()
+                )
+    return _rag_chain
 
 # ---------------------- RAG Tool Function ----------------------------- #
 def rag_tool_function(query: str, agent_name: str = "ClinicalAgent") -> str:
@@ -51,9 +125,25 @@ def rag_tool_function(query: str, agent_name: str = "ClinicalAgent") -> str:
     Returns:
         str: The answer to the query based on the nephrology reference book (and web search if needed).
     """
-    logger.info(f"[RAG] Called by: {agent_name} | Query: {query}")
-    result = rag_chain.invoke(query)
-    logger.info(f"[RAG] Responded by: {agent_name} | Result: {str(result)[:200]}")
+    logger.info("[RAG] Called by: %s | Query: %s", agent_name, phi(query))
+    if CACHE_ENABLED:
+        semantic_cache = get_semantic_cache()
+        query_embedding = resources.get_embeddings().embed_query(query)
+        cached = semantic_cache.lookup(query_embedding)
+        if cached is not None:
+            logger.info("[RAG] Cache hit for: %s", agent_name)  # Hit ratios: GET /stats/cache
+            return {"query": query, "result": cached}
+    try:
+        answer = rag.call(lambda: get_rag_chain().invoke(query), fallback=lambda error: None)
+    except Exception as e:  # Not transient (e.g. an LLM 4xx): not retried, and the agent falls back to web search
+        logger.error("[RAG] Failed for: %s: %s", agent_name, e, exc_info=True)
+        answer = None
+    if answer is None:
+        return {"query": query, "result": REFERENCE_UNAVAILABLE}
+    result = {"query": query, "result": answer}
+    if CACHE_ENABLED:
+        semantic_cache.store(query, query_embedding, result["result"])
+    logger.info("[RAG] Responded by: %s | Answer: %s chars", agent_name, len(answer))  # The result holds the query
     return result
 
 # if __name__ == "__main__":
@@ -1,35 +1,229 @@
 """
 web_search_tool.py
 -----------------
-This module provides a function to perform web search using DuckDuckGo via LangChain's DuckDuckGoSearchRun tool.
+This module provides a function to perform web search using DuckDuckGo (and Tavily, when a
+TAVILY_API_KEY is configured) via LangChain / the Tavily client.
 It is used as a fallback when the RAG tool cannot answer a query from the reference book.
+Results are cached on disk by normalized query. On a miss every configured provider is queried
+concurrently; the first one with results within the latency budget wins and the rest are
+abandoned. Results are deduplicated and truncated to a token budget before they reach the LLM.
+Each provider has its own deadline and circuit breaker; when every provider is down the tool tells
+the agent to answer from the reference only.
 """
 
 from dotenv import load_dotenv  # For loading environment variables from .env
+import contextvars  # Carry log context into provider threads
 import os
+import threading  # Guards lazy creation of the shared clients
+import time  # Latency budget
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # Provider fan-out
 load_dotenv()  # Load environment variables (if any)
 
-from langchain_community.tools import DuckDuckGoSearchRun  # LangChain DuckDuckGo search tool
-from backend.logger import logger  # Custom logger for logging search events
+from langchain_community.utilities import DuckDuckGoSearchAPIWrapper  # LangChain DuckDuckGo search wrapper
+from backend.logger import logger, phi  # Custom logger for logging search events
+from backend.metrics import stats_collector, timed  # Search latency histogram / cache gauges
+from backend.resilience import WEB_SEARCH_DEADLINE_SECONDS, Dependency  # Per-provider deadline and breaker
+from backend.search_cache import SEARCH_CACHE_ENABLED, SearchCache  # Disk cache keyed by normalized query
 
+# ---------------------- Search Configuration -------------------------- #
+SEARCH_PROVIDERS = [name.strip() for name in os.getenv("SEARCH_PROVIDERS", "duckduckgo,tavily").split(",")
+                    if name.strip()]  # Providers without credentials are skipped
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "5"))  # Per provider
+SEARCH_MAX_TOKENS = int(os.getenv("SEARCH_MAX_TOKENS", "600"))  # Result text passed to the LLM
+CHARS_PER_TOKEN = 4  # Same estimate as langchain_core's count_tokens_approximately
 
+# Returned instead of results when every provider fails or is open (degrades to RAG-only)
+SEARCH_UNAVAILABLE = ("Web search is currently unavailable. Answer from the nephrology reference (rag_tool_function) "
+                      "only, and say that the latest information could not be checked.")
+NO_RESULTS = "Web search found no results for this query."
+
+_lock = threading.Lock()
+_search = None
+_tavily = None
+_search_cache = None
+_pool = None
+
+# ---------------------- Providers ------------------------------------- #
+def get_search() -> DuckDuckGoSearchAPIWrapper:
+    """Return the shared DuckDuckGo search wrapper, creating it on first use."""
+    global _search
+    if _search is None:
+        with _lock:
+            if _search is None:
+                _search = DuckDuckGoSearchAPIWrapper()
+    return _search
+
+
+def get_tavily():
+    """Return the shared Tavily client, creating it on first use."""
+    global _tavily
+    if _tavily is None:
+        with _lock:
+            if _tavily is None:
+                from tavily import TavilyClient  # Optional dependency
+                _tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+    return _tavily
+
+
+def duckduckgo_search(query: str) -> list[dict]:
+    """DuckDuckGo text results as {'title', 'url', 'snippet'} dicts."""
+    return [{"title": r.get("title", ""), "url": r.get("link", ""), "snippet": r.get("snippet", "")}
+            for r in get_search().results(query, SEARCH_MAX_RESULTS)]
+
+
+def tavily_search(query: str) -> list[dict]:
+    """Tavily results as {'title', 'url', 'snippet'} dicts."""
+    response = get_tavily().search(query, max_results=SEARCH_MAX_RESULTS, timeout=WEB_SEARCH_DEADLINE_SECONDS)
+    return [{"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")}
+            for r in response.get("results", [])]
+
+
+def _tavily_configured() -> bool:
+    if not os.getenv("TAVILY_API_KEY"):
+        return False
+    try:
+        import tavily  # noqa: F401
+    except ImportError:
+        logger.warning("[WebSearch] TAVILY_API_KEY is set but tavily-python is not installed; skipping Tavily")
+        return False
+    return True
+
+
+# name -> (search function, whether it is configured)
+PROVIDERS = {
+    "duckduckgo": (duckduckgo_search, lambda: True),
+    "tavily": (tavily_search, _tavily_configured),
+}
+_dependencies = {name: Dependency(f"search_{name}", WEB_SEARCH_DEADLINE_SECONDS, attempts=1, enforce_deadline=True)
+                 for name in PROVIDERS}
+
+
+def active_providers() -> list[str]:
+    """Providers from SEARCH_PROVIDERS that are known and configured."""
+    return [name for name in SEARCH_PROVIDERS if name in PROVIDERS and PROVIDERS[name][1]()]
+
+# ---------------------- Result Handling ------------------------------- #
+def get_search_cache() -> SearchCache:
+    """Return the search result cache, opening it on first use."""
+    global _search_cache
+    if _search_cache is None:
+        with _lock:
+            if _search_cache is None:
+                _search_cache = SearchCache()
+                stats_collector.register("search_cache", _search_cache.stats)
+    return _search_cache
+
+
+def _url_key(url: str) -> str:
+    """Compare URLs without scheme, 'www.', fragment or trailing slash."""
+    url = url.split("#", 1)[0].split("://", 1)[-1].removeprefix("www.")
+    return url.rstrip("/").casefold()
+
+
+def deduplicate(results: list[dict]) -> list[dict]:
+    """Drop results whose URL or snippet text was already seen (first occurrence wins)."""
+    seen_urls, seen_snippets, unique = set(), set(), []
+    for result in results:
+        url, snippet = _url_key(result["url"]), " ".join(result["snippet"].casefold().split())
+        if not snippet or (url and url in seen_urls) or snippet in seen_snippets:
+            continue
+        seen_urls.add(url)
+        seen_snippets.add(snippet)
+        unique.append(result)
+    return unique
+
+
+def format_results(results: list[dict], max_tokens: int = SEARCH_MAX_TOKENS) -> str:
+    """
+    Render results as one line each ('- title: snippet (url)'), stopping at the token budget.
+    The last line that fits only partly is cut off with '...'.
+    """
+    budget, lines = max_tokens * CHARS_PER_TOKEN, []
+    for result in results:
+        line = f"- {result['title']}: {result['snippet']} ({result['url']})"
+        if len(line) > budget:
+            if budget > 80:  # Not worth a stub shorter than this
+                lines.append(line[:budget - 3].rstrip() + "...")
+            break
+        lines.append(line)
+        budget -= len(line) + 1
+    return "\n".join(lines)
+
+# ---------------------- Fan-out --------------------------------------- #
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+    return _pool
+
+
+def fan_out(query: str, providers: list[str], budget_s: float = WEB_SEARCH_DEADLINE_SECONDS):
+    """
+    Query `providers` concurrently and return as soon as one has results.
+    Providers that finished at the same moment are merged in; the others are abandoned (not yet
+    started ones are cancelled, running ones finish in the background and are ignored).
+    Args:
+        query (str): Search query.
+        providers (list[str]): Provider names.
+        budget_s (float): Latency budget for the whole search.
+    Returns:
+        tuple[str | None, list[dict], int]: Winning provider, its results, and the number of
+            providers that failed (raised or hit their deadline).
+    """
+    pool, deadline = _get_pool(), time.monotonic() + budget_s
+    futures = {pool.submit(contextvars.copy_context().run, _dependencies[name].call, PROVIDERS[name][0], query): name
+               for name in providers}
+    pending, failed, winner, results = set(futures), 0, None, []
+    while pending and winner is None:
+        done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+        if not done:
+            break  # Budget spent
+        for future in done:
+            if future.exception() is not None:
+                failed += 1
+                continue
+            if future.result():
+                winner = winner or futures[future]
+                results.extend(future.result())
+    for future in pending:
+        future.cancel()
+    if winner is None:
+        failed += len(pending)  # Still running at the deadline
+    return winner, results, failed
+
+# ---------------------- Web Search Tool ------------------------------- #
+@timed("web_search", "fan_out")
 def web_search_tool(query: str, agent_name: str = "ClinicalAgent") -> str:
     """
-    Searches DuckDuckGo using LangChain's DuckDuckGoSearchRun tool.
+    Searches the web (DuckDuckGo, plus Tavily when configured) for up-to-date medical information.
 
     Args:
         query (str): The search query string.
         agent_name (str): Name of the agent calling the tool (for logging).
 
     Returns:
-        str: The search result as a string (may be a summary or snippet).
+        str: The search results, one '- title: snippet (url)' line each, or a note that search is
+            unavailable / found nothing.
     """
-    logger.info(f"[WebSearch] Called by: {agent_name} | Query: {query}")
-    search = DuckDuckGoSearchRun()
-    result = search.run(query)
-    logger.info(f"[WebSearch] Responded by: {agent_name} | Result: {str(result)[:200]}")
+    logger.info("[WebSearch] Called by: %s | Query: %s", agent_name, phi(query))
+    if SEARCH_CACHE_ENABLED:
+        cached = get_search_cache().get(query)
+        if cached is not None:
+            logger.info("[WebSearch] Cache hit for: %s", agent_name)
+            return cached
+    providers = active_providers()
+    winner, results, failed = fan_out(query, providers)
+    if winner is None:
+        result = SEARCH_UNAVAILABLE if failed == len(providers) else NO_RESULTS
+    else:
+        result = format_results(deduplicate(results))
+        if SEARCH_CACHE_ENABLED:
+            get_search_cache().set(query, result, winner)
+    logger.info("[WebSearch] Responded by: %s | Provider: %s | Result: %s", agent_name, winner, str(result)[:200])
     return result
 
 # Example usage (uncomment to test):
 # res = web_search_tool("What's the latest research on SGLT2 inhibitors for kidney disease?")
-# print(res)
\ No newline at end of file
+# print(res)
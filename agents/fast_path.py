@@ -0,0 +1,324 @@
+"""
+fast_path.py
+------------
+Rule-based pre-routing for the swarm. Every turn enters the `fast_path` node before any agent:
+- a bare Patient ID ("P001") is looked up in the patient cache and answered from a template
+- a full name sent while a found report awaits verification is checked against the stored record,
+  and a verified patient gets a templated discharge summary
+- a verified patient's question that matches a precomputed answer pack for their diagnosis or
+  medications (`backend/answer_packs.py`) is answered from the pack, as the clinical expert,
+  unless the message describes symptoms
+- clearly medical questions are sent straight to `clinical_assistant` (no receptionist LLM hop)
+- everything else goes to the active agent as before
+Deterministic turns never call the LLM. `fast_path_stats` reports how many turns skipped it and
+the latency saved.
+"""
+
+import os  # For environment variable access
+import re  # Patient ID / name patterns
+import threading  # Guards the statistics counters
+import time  # Fast-path latency
+
+from langchain_core.messages import AIMessage, HumanMessage  # Conversation messages
+from langgraph.graph import END, StateGraph  # Graph construction
+from langgraph.types import Command  # Route + state update from one node
+from langgraph_swarm import SwarmState  # Base swarm state (messages + active_agent)
+from langgraph_swarm.handoff import get_handoff_destinations  # Agents each agent can hand off to
+from typing_extensions import NotRequired  # Optional state keys
+
+from backend import resources  # Shared embedding model (answer pack matching)
+from backend.answer_packs import ANSWER_PACKS_ENABLED, get_answer_pack_store  # Precomputed cohort answers
+from backend.mongo_database import normalize_name  # Same name normalization as the DB index
+from backend.patient_cache import RECORDS_UNAVAILABLE, patient_cache  # Read-through cache over the patient DB
+from backend.resilience import DependencyUnavailable  # MongoDB down / circuit open
+from backend.logger import logger  # Logger for tracking routing decisions
+
+# ---------------------- Router Configuration -------------------------- #
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_NODE = "fast_path"
+RECEPTIONIST = "receptionist_assistant"
+CLINICAL = "clinical_assistant"
+RECEPTIONIST_PREFIX = "👩‍⚕️ Receptionist:"
+CLINICAL_PREFIX = "👩‍⚕️ Clinical Expert:"
+
+PATIENT_ID_PATTERN = re.compile(
+    r"^\s*(?:(?:my\s+)?(?:patient\s+)?id\s*(?:is|:|#)?\s*)?(P\d{3,})\s*[.!]?\s*$", re.IGNORECASE
+)
+NAME_PATTERN = re.compile(
+    r"^\s*(?:(my\s+name\s+is|i\s+am|i'm|this\s+is)\s+)?"
+    r"([A-Za-z][A-Za-z'.-]*(?:\s+[A-Za-z][A-Za-z'.-]*){1,3})\s*[.!]?\s*$",
+    re.IGNORECASE,
+)
+# Short replies that match NAME_PATTERN but are not names; these go to the LLM
+NON_NAME_WORDS = {
+    "hi", "hello", "hey", "thanks", "thank", "you", "ok", "okay", "yes", "no", "please", "help",
+    "what", "why", "how", "when", "where", "who", "can", "could", "the", "my", "report", "id",
+}
+
+# ---------------------- Medical Query Keywords ------------------------ #
+MEDICAL_KEYWORDS = [
+    "medication", "dose", "symptom", "treatment", "side effect",
+    "pain", "diet", "swelling", "blood", "fever", "fatigue"
+]
+
+# Words that mean the patient is describing how they feel; such turns always reach the clinical agent
+SYMPTOM_KEYWORDS = [
+    "symptom", "symptoms", "pain", "painful", "swelling", "swollen", "blood", "bleeding", "fever", "fatigue",
+    "dizzy", "dizziness", "faint", "fainted", "breath", "breathe", "breathing", "chest", "vomit", "vomiting",
+    "nausea", "confused", "confusion", "rash", "emergency", "worse", "worsening", "overdose",
+]
+# Qualifiers in the warning_signs field that say nothing about a symptom on their own
+WARNING_SIGN_STOPWORDS = {"increased", "decreased", "severe", "persistent", "sudden", "difficulty", "more",
+                          "than", "with", "days", "weight", "gain"}
+
+
+def is_medical_query(query: str):
+    """
+    Checks if the query contains medical keywords.
+    Args:
+        query (str): The user's question.
+    Returns:
+        bool: True if the query is medical, False otherwise.
+    """
+    return any(word in query.lower() for word in MEDICAL_KEYWORDS)
+
+def reports_symptoms(query: str, patient: dict | None = None) -> bool:
+    """
+    Checks if the patient is describing symptoms: a symptom keyword, or a term from their own warning signs.
+    Words of the patient's diagnosis ("Chronic Back Pain") do not count.
+    Args:
+        query (str): The user's message.
+        patient (dict, optional): Patient record (its warning_signs add terms).
+    Returns:
+        bool: True if the message mentions a symptom.
+    """
+    patient = patient or {}
+    words = set(re.findall(r"[a-z]+", query.lower()))
+    words -= set(re.findall(r"[a-z]+", str(patient.get("primary_diagnosis", "")).lower()))
+    terms = set(SYMPTOM_KEYWORDS)
+    terms.update(word for word in re.findall(r"[a-z]+", str(patient.get("warning_signs", "")).lower())
+                 if len(word) > 3 and word not in WARNING_SIGN_STOPWORDS)
+    return bool(words & terms)
+
+# ---------------------- State Schema ---------------------------------- #
+class AssistantState(SwarmState):
+    """
+    Shared state of the swarm graph (the patient keys are also in the agents' state schemas).
+    Attributes:
+        patient_id (str | None): Patient ID found by the fast path, awaiting or past verification.
+        patient_name (str | None): Verified full name (set only after the name matched the record).
+        patient (dict | None): Patient record for `patient_id`.
+    """
+    patient_id: NotRequired[str | None]
+    patient_name: NotRequired[str | None]
+    patient: NotRequired[dict | None]
+
+# ---------------------- Statistics ------------------------------------ #
+class FastPathStats:
+    """Thread-safe counters for routing decisions and turn latencies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.fast_path_turns = 0
+        self.direct_clinical_routes = 0
+        self.fast_path_seconds = 0.0
+        self.llm_turns = 0
+        self.llm_turn_seconds = 0.0
+
+    def record_route(self, fast_path: bool = False, direct_clinical: bool = False, seconds: float = 0.0):
+        """Record one routing decision made by the fast-path node."""
+        with self._lock:
+            self.turns += 1
+            self.fast_path_turns += fast_path
+            self.direct_clinical_routes += direct_clinical
+            self.fast_path_seconds += seconds if fast_path else 0.0
+
+    def record_llm_turn(self, seconds: float):
+        """Record the end-to-end latency of a turn that went through an agent (called by the API)."""
+        with self._lock:
+            self.llm_turns += 1
+            self.llm_turn_seconds += seconds
+
+    def stats(self) -> dict:
+        """Share of turns that skipped the LLM and the latency saved against the measured LLM turns."""
+        with self._lock:
+            fast_ms = self.fast_path_seconds * 1000 / self.fast_path_turns if self.fast_path_turns else 0.0
+            llm_ms = self.llm_turn_seconds * 1000 / self.llm_turns if self.llm_turns else 0.0
+            return {
+                "turns": self.turns,
+                "fast_path_turns": self.fast_path_turns,
+                "skipped_llm_share": round(self.fast_path_turns / self.turns, 3) if self.turns else 0.0,
+                "receptionist_hops_skipped": self.direct_clinical_routes,
+                "fast_path_ms_avg": round(fast_ms, 2),
+                "llm_turn_ms_avg": round(llm_ms, 1),
+                "latency_saved_ms_total": round(max(llm_ms - fast_ms, 0.0) * self.fast_path_turns, 1)
+                if self.llm_turns else None,
+            }
+
+
+fast_path_stats = FastPathStats()
+
+# ---------------------- Templates ------------------------------------- #
+def _reply(text: str) -> AIMessage:
+    """A receptionist message produced without the LLM."""
+    return AIMessage(content=f"{RECEPTIONIST_PREFIX} {text}", name=RECEPTIONIST,
+                     response_metadata={"fast_path": True})
+
+
+def discharge_summary(patient: dict) -> str:
+    """Templated summary of a patient's discharge report."""
+    medications = patient.get("medications") or []
+    lines = [
+        f"Thank you for verifying your identity, {patient['patient_name']}.",
+        "",
+        "Here is a summary of your discharge information:",
+        f"- **Discharge date:** {patient.get('discharge_date', 'N/A')}",
+        f"- **Primary diagnosis:** {patient.get('primary_diagnosis', 'N/A')}",
+        f"- **Medications:** {'; '.join(medications) if medications else 'None listed'}",
+        f"- **Dietary restrictions:** {patient.get('dietary_restrictions', 'N/A')}",
+        f"- **Follow-up:** {patient.get('follow_up', 'N/A')}",
+        f"- **Warning signs:** {patient.get('warning_signs', 'N/A')}",
+        f"- **Discharge instructions:** {patient.get('discharge_instructions', 'N/A')}",
+        "",
+        "If you have questions about your medications, symptoms or recovery, just ask.",
+    ]
+    return "\n".join(lines)
+
+
+def looks_like_name(name: str, explicit: bool) -> bool:
+    """
+    Whether a non-matching reply is a name attempt (rejected here) rather than a short message for the LLM.
+    Args:
+        name (str): The captured words.
+        explicit (bool): The message started with "my name is", "I am", ...
+    Returns:
+        bool: True for an explicit introduction or title-cased words ("Jane Doe").
+    """
+    return explicit or all(word[0].isupper() for word in name.split())
+
+
+def deterministic_reply(text: str, state: dict) -> tuple[AIMessage, dict] | None:
+    """
+    Answer a turn from rules alone, if it is one of the deterministic receptionist steps.
+    Args:
+        text (str): The user's message.
+        state (dict): Current graph state.
+    Returns:
+        tuple[AIMessage, dict] | None: Reply and state update, or None to use an agent.
+    """
+    id_match = PATIENT_ID_PATTERN.match(text)
+    if id_match:
+        patient_id = id_match.group(1).upper()
+        try:
+            patient = patient_cache.get_by_id(patient_id)
+        except DependencyUnavailable:
+            return _reply(f"⚠️ {RECORDS_UNAVAILABLE}"), {}
+        if not patient:
+            return _reply("❌ I couldn't find a report with that Patient ID. Could you please double-check it?"), {}
+        return _reply(f"Thank you. I found your discharge report for Patient ID: {patient_id}. "
+                      "To verify, may I also have your full name?"), \
+            {"patient_id": patient_id, "patient": patient, "patient_name": None}
+
+    patient = state.get("patient")
+    if patient and not state.get("patient_name"):
+        name_match = NAME_PATTERN.match(text)
+        if name_match and not NON_NAME_WORDS.intersection(name_match.group(2).lower().split()):
+            name = name_match.group(2).rstrip(".'-")
+            if normalize_name(name) == normalize_name(patient["patient_name"]):
+                return _reply(discharge_summary(patient)), {"patient_name": patient["patient_name"]}
+            if not is_medical_query(text) and looks_like_name(name, explicit=bool(name_match.group(1))):
+                return _reply("❌ The name doesn't match our records. Please ensure you've provided "
+                              "the correct Patient ID and name."), {}
+    return None
+
+def answer_pack_reply(text: str, state: dict) -> AIMessage | None:
+    """
+    Answer a verified patient's question from the precomputed answer packs, if one matches.
+    The pack answer is followed by the patient's own discharge instructions for the topic.
+    Messages that describe symptoms never get a canned answer.
+    Args:
+        text (str): The user's message.
+        state (dict): Current graph state.
+    Returns:
+        AIMessage | None: Clinical expert reply, or None to use an agent.
+    """
+    patient = state.get("patient")
+    if not ANSWER_PACKS_ENABLED or not patient or not state.get("patient_name"):
+        return None
+    if reports_symptoms(text, patient):
+        return None
+    try:
+        hit = get_answer_pack_store().lookup(patient, text, lambda q: resources.get_embeddings().embed_query(q))
+    except Exception as e:  # A broken pack store must not break the turn
+        logger.warning("[FastPath] Answer pack lookup failed: %s", e)
+        return None
+    if hit is None:
+        return None
+    lines = [CLINICAL_PREFIX, "", f"✅ **From Reference Materials:** {hit['answer']}"]
+    own = patient.get(hit["field"])
+    if own:
+        lines += ["", f"**Your discharge plan:** {'; '.join(own) if isinstance(own, list) else own}"]
+    if hit["citations"]:
+        lines += ["", f"Sources: {', '.join(hit['citations'])}"]
+    return AIMessage(content="\n".join(lines), name=CLINICAL,
+                     response_metadata={"fast_path": True, "answer_pack": True})
+
+# ---------------------- Router Node ----------------------------------- #
+def make_fast_path_node(default_active_agent: str):
+    """Build the pre-routing node; it ends the turn itself or routes to an agent."""
+
+    def fast_path(state: AssistantState) -> Command:
+        start = time.perf_counter()
+        active_agent = state.get("active_agent") or default_active_agent
+        message = state["messages"][-1] if state.get("messages") else None
+        if not FAST_PATH_ENABLED or not isinstance(message, HumanMessage):
+            return Command(goto=active_agent)
+        text = message.text()
+
+        result = deterministic_reply(text, state)
+        if result is not None:
+            reply, update = result
+            elapsed = time.perf_counter() - start
+            fast_path_stats.record_route(fast_path=True, seconds=elapsed)
+            logger.info("[FastPath] Answered without LLM in %.1fms", elapsed * 1000)
+            return Command(goto=END, update={**update, "messages": [reply]})
+
+        reply = answer_pack_reply(text, state)
+        if reply is not None:
+            elapsed = time.perf_counter() - start
+            fast_path_stats.record_route(fast_path=True, seconds=elapsed)
+            logger.info("[FastPath] Answered from answer pack in %.1fms", elapsed * 1000)
+            return Command(goto=END, update={"messages": [reply], "active_agent": CLINICAL})
+
+        if active_agent != CLINICAL and is_medical_query(text):
+            fast_path_stats.record_route(direct_clinical=True)
+            logger.info("[FastPath] Medical query routed directly to clinical_assistant")
+            return Command(goto=CLINICAL, update={"active_agent": CLINICAL})
+
+        fast_path_stats.record_route()
+        return Command(goto=active_agent)
+
+    return fast_path
+
+
+def build_swarm_graph(agents: list, default_active_agent: str = RECEPTIONIST,
+                      state_schema=AssistantState) -> StateGraph:
+    """
+    Build the swarm graph with the fast-path node in front of the agents.
+    Equivalent to `langgraph_swarm.create_swarm`, except that START leads to the fast-path node,
+    which replaces the swarm's active-agent router.
+    Args:
+        agents (list): Compiled agents (their names are the node names).
+        default_active_agent (str): Agent used when none is active yet.
+        state_schema: Graph state (must extend SwarmState).
+    Returns:
+        StateGraph: Uncompiled graph.
+    """
+    agent_names = tuple(agent.name for agent in agents)
+    builder = StateGraph(state_schema)
+    builder.add_node(FAST_PATH_NODE, make_fast_path_node(default_active_agent), destinations=agent_names + (END,))
+    builder.set_entry_point(FAST_PATH_NODE)
+    for agent in agents:
+        builder.add_node(agent.name, agent, destinations=tuple(get_handoff_destinations(agent)))
+    return builder
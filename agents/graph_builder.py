@@ -3,36 +3,77 @@ graph_builder.py
 ----------------
 Builds and compiles the multi-agent workflow for the Post-Discharge Medical AI Assistant using LangGraph Swarm.
 This script sets up the receptionist and clinical agents, manages agent handoff, and provides logging utilities for interactions and retrieval attempts.
+The workflow is compiled on the first `get_app()` call rather than at import.
 """
 
-# from langgraph.graph import START,StateGraph, END  # Uncomment if using StateGraph directly
-from langchain_google_genai import ChatGoogleGenerativeAI  # (Optional) Google GenAI LLM
-from dotenv import load_dotenv  # For environment variable management
 import sys
 import os
+import threading  # Guards lazy graph construction
+import uuid  # For per-session thread IDs
 # Ensure parent directory is in sys.path for imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from agents.receptionist_agent.receptionist_agent import receptionist_assistant  # Receptionist agent
-from agents.clinical_agent.clinical_agent import clinical_assistant  # Clinical agent
-
-from langgraph_swarm import create_swarm  # For multi-agent workflow
-from langgraph_swarm import create_handoff_tool  # For agent handoff
-from langgraph.checkpoint.memory import InMemorySaver  # For in-memory checkpointing
-from backend.logger import logger  # Logger for tracking events
+from agents.fast_path import build_swarm_graph  # Swarm with the rule-based fast-path router in front
+from backend.checkpointer import get_checkpointer  # Compacting, pluggable checkpointer
+from backend.logger import logger, phi  # Logger for tracking events
+from backend.metrics import metrics_handler  # Per-stage latency / token metrics
 
 # ---------------------- Workflow Setup -------------------------------- #
-# Create an in-memory checkpointer for session state
-checkpointer = InMemorySaver()
-# Create a swarm workflow with both agents, receptionist as default
-workflow = create_swarm(
-    [receptionist_assistant, clinical_assistant],
-    default_active_agent="receptionist_assistant"
-)
-# Compile the workflow into an app object
-app = workflow.compile(checkpointer=checkpointer)
+_lock = threading.Lock()
+_app = None
+
 
-# Configuration for the workflow (threading, etc.)
-config = {"configurable": {"thread_id": "1"}}
+def build_app(checkpointer=None):
+    """
+    Build both agents and compile the swarm workflow, receptionist as default. Deterministic turns
+    (Patient ID, name verification) are answered by the fast-path node without an LLM call.
+    Args:
+        checkpointer: Session state store (defaults to the configured one: SQLite locally, Mongo in production).
+    Returns:
+        CompiledStateGraph: The multi-agent app.
+    """
+    # Imported here: the agent modules pull in the LLM client, Qdrant and LangChain chains
+    from agents.receptionist_agent.receptionist_agent import build_receptionist_agent  # Receptionist agent
+    from agents.clinical_agent.clinical_agent import build_clinical_agent  # Clinical agent
+
+    workflow = build_swarm_graph(
+        [build_receptionist_agent(), build_clinical_agent()],
+        default_active_agent="receptionist_assistant"
+    )
+    return workflow.compile(checkpointer=checkpointer or get_checkpointer())
+
+
+def get_app():
+    """
+    Return the process-wide compiled workflow, building it on first use.
+    Returns:
+        CompiledStateGraph: The multi-agent app.
+    """
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                _app = build_app()
+                logger.info("[Graph] Workflow compiled")
+    return _app
+
+# ---------------------- Session Utilities ----------------------------- #
+def new_thread_id() -> str:
+    """
+    Generate a fresh conversation thread ID for a new patient session.
+    Returns:
+        str: A random, URL-safe thread identifier.
+    """
+    return uuid.uuid4().hex
+
+def make_config(thread_id: str) -> dict:
+    """
+    Build the workflow configuration for one conversation thread.
+    Args:
+        thread_id (str): The session's thread ID.
+    Returns:
+        dict: Config passed to get_app().invoke / ainvoke (with the metrics callback attached).
+    """
+    return {"configurable": {"thread_id": thread_id}, "callbacks": [metrics_handler]}
 
 # ---------------------- Logging Utilities ----------------------------- #
 def log_interaction(role, content):
@@ -42,7 +83,7 @@ def log_interaction(role, content):
         role (str): 'User' or 'Agent'.
         content (str): The message content.
     """
-    logger.info(f"{role}: {content}")
+    logger.info("%s: %s", role, phi(content))
 
 def log_handoff(from_agent, to_agent, reason=None):
     """
@@ -52,7 +93,7 @@ def log_handoff(from_agent, to_agent, reason=None):
         to_agent (str): Name of the agent receiving.
         reason (str, optional): Reason for handoff.
     """
-    logger.info(f"Agent handoff from {from_agent} to {to_agent}. Reason: {reason if reason else 'N/A'}")
+    logger.info("Agent handoff from %s to %s. Reason: %s", from_agent, to_agent, reason if reason else 'N/A')
 
 def log_retrieval_attempt(agent, query, result):
     """
@@ -62,5 +103,5 @@ def log_retrieval_attempt(agent, query, result):
         query (str): The query string.
         result (str): The retrieval result or status.
     """
-    logger.info(f"{agent} retrieval attempt. Query: {query} | Result: {result}")
+    logger.info("%s retrieval attempt. Query: %s | Result: %s", agent, phi(query), result)
 
@@ -3,22 +3,51 @@ llm_model.py
 ------------
 Initializes the main language model (LLM) for the AI assistant system using Google's Gemini model via LangChain.
 Loads the API key from Streamlit Cloud secrets (or environment variable for local development).
+The client is created on first use by `get_llm()`, so importing this module is cheap and does not
+need credentials.
 """
 
 import os  # For environment variable access
+import sys  # To detect a Streamlit process
+import threading  # Guards lazy initialization
 
-try:
-    import streamlit as st
-    api_key = st.secrets["GOOGLE_API_KEY"]
-except (ImportError, KeyError):
+from backend.resilience import LLM_MAX_RETRIES, LLM_TIMEOUT_SECONDS  # Request deadline / retry policy
+
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.5-flash")  # Model name
+
+_lock = threading.Lock()
+_llm = None
+
+
+def _api_key():
+    """Streamlit Cloud secret when running under Streamlit, otherwise GOOGLE_API_KEY from the environment/.env."""
+    if "streamlit" in sys.modules:  # Only the Streamlit app has secrets; never import it just to look
+        import streamlit as st
+        try:
+            return st.secrets["GOOGLE_API_KEY"]
+        except (KeyError, FileNotFoundError):
+            pass
     # Fallback for local development
     from dotenv import load_dotenv
     load_dotenv()
-    api_key = os.getenv("GOOGLE_API_KEY")
+    return os.getenv("GOOGLE_API_KEY")
 
-from langchain_google_genai import ChatGoogleGenerativeAI  # LangChain wrapper for Google GenAI
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",  # Model name
-    google_api_key=api_key      # API key from Streamlit secrets or env
-)
+def get_llm():
+    """
+    Return the shared Gemini chat model, creating it on first use.
+    Returns:
+        ChatGoogleGenerativeAI: LangChain wrapper for Google GenAI.
+    """
+    global _llm
+    if _llm is None:
+        with _lock:
+            if _llm is None:
+                from langchain_google_genai import ChatGoogleGenerativeAI  # Heavy import
+                _llm = ChatGoogleGenerativeAI(
+                    model=LLM_MODEL_NAME,  # Model name
+                    google_api_key=_api_key(),  # API key from Streamlit secrets or env
+                    timeout=LLM_TIMEOUT_SECONDS,  # A hung request must not pin a worker
+                    max_retries=LLM_MAX_RETRIES,  # Client retries with backoff
+                )
+    return _llm
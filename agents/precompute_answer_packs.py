@@ -0,0 +1,229 @@
+"""
+precompute_answer_packs.py
+--------------------------
+Offline job that fills the answer pack store (`backend/answer_packs.py`). Discharged patients
+cluster into a few primary diagnoses and ask predictable questions about their warning signs,
+diet and medications, so those answers are generated ahead of time:
+1. patients are grouped by primary diagnosis, collecting the drug names of their medications,
+2. the top-N questions per diagnosis and per (diagnosis, medication) are built from templates,
+3. all questions are embedded in one call and searched in one batch request
+   (`batch_answer.search_batch`), and each is answered from its reference context by the LLM
+   with bounded concurrency,
+4. answers, their [source, p. N] citations and the collection version are written to the store,
+5. NEGATIVE_QUESTION_PAIRS are scored with the same embedding model, calibrating the threshold of
+   the opt-in paraphrase matching (ANSWER_PACK_SEMANTIC).
+Re-run it after re-ingesting the reference (packs of an older collection version are not served).
+
+Usage:
+    python -m agents.precompute_answer_packs
+    python -m agents.precompute_answer_packs --patients data/patient_reports.json --top-n 3
+    python -m agents.precompute_answer_packs --diagnosis "Heart Failure"
+"""
+
+import argparse  # CLI arguments
+import asyncio  # Bounded LLM concurrency
+import json  # Patient fixtures / summary
+import time  # Job timing
+from typing import Dict, List
+
+import numpy as np  # Negative-pair cosine similarity
+
+from langchain_core.prompts import PromptTemplate  # Pack answer prompt
+
+from agents.batch_answer import BATCH_LLM_CONCURRENCY, search_batch  # Batched embedding + vector search
+from agents.clinical_agent.rag.context_builder import build_context, citation  # Cited reference context
+from agents.llm_model import get_llm  # The main language model
+from backend import resources  # Shared embedding model / vector client
+from backend.answer_packs import (
+    NEGATIVE_QUESTION_PAIRS, AnswerPackStore, diagnosis_key, fingerprint, medication_name, record_collection_version,
+)
+from backend.logger import logger  # Custom logger
+from backend.metrics import metrics_handler  # LLM callback
+
+# (patient record field the question is about, template), most frequently asked first
+DIAGNOSIS_QUESTIONS = [
+    ("warning_signs", "What warning signs of {diagnosis} mean I should call my doctor?"),
+    ("dietary_restrictions", "What should I eat and avoid with {diagnosis}?"),
+    ("discharge_instructions", "How do I take care of myself at home with {diagnosis}?"),
+    ("dietary_restrictions", "How much salt and fluid can I have with {diagnosis}?"),
+    ("follow_up", "Which tests and check-ups do I need after being discharged with {diagnosis}?"),
+    ("discharge_instructions", "Can I exercise with {diagnosis}?"),
+]
+MEDICATION_QUESTIONS = [
+    ("medications", "What are the side effects of {medication}?"),
+    ("medications", "What should I do if I miss a dose of {medication}?"),
+    ("medications", "Can I take painkillers like ibuprofen with {medication}?"),
+    ("medications", "Why am I taking {medication} for {diagnosis}?"),
+]
+
+pack_prompt = PromptTemplate.from_template(
+    """Answer a question that patients discharged with {diagnosis} often ask, using only the
+       nephrology reference below. Keep it short and practical, cite the passages you use by their
+       [source, p. N] labels, and say so if the reference does not cover the question.
+
+    Reference:
+    {context}
+
+    Question:
+    {question}
+
+    Answer:"""
+)
+
+
+def load_patients(path: str | None) -> List[dict]:
+    """Patient records from a JSON file, or the diagnosis and medications of every stored patient."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    from backend.mongo_database import get_collection
+    return list(get_collection().find({}, {"_id": 0, "primary_diagnosis": 1, "medications": 1}))
+
+
+def cohorts(patients: List[dict]) -> Dict[str, dict]:
+    """
+    Group patients by diagnosis.
+    Returns:
+        Dict[str, dict]: diagnosis key -> {'diagnosis', 'patients', 'medications' (drug key -> name)}.
+    """
+    groups = {}
+    for patient in patients:
+        key = diagnosis_key(patient.get("primary_diagnosis"))
+        if not key:
+            continue
+        group = groups.setdefault(key, {"diagnosis": patient["primary_diagnosis"], "patients": 0, "medications": {}})
+        group["patients"] += 1
+        for medication in patient.get("medications") or []:
+            name = medication_name(medication)
+            if name:
+                group["medications"].setdefault(name, name.title())
+    return groups
+
+
+def pack_questions(groups: Dict[str, dict], top_n: int) -> List[dict]:
+    """The top-N template questions per diagnosis and per (diagnosis, medication)."""
+    questions = []
+    for key, group in groups.items():
+        for field, template in DIAGNOSIS_QUESTIONS[:top_n]:
+            questions.append({"diagnosis": key, "medication": "", "field": field, "label": group["diagnosis"],
+                              "question": template.format(diagnosis=group["diagnosis"])})
+        for medication, name in group["medications"].items():
+            for field, template in MEDICATION_QUESTIONS[:top_n]:
+                questions.append({"diagnosis": key, "medication": medication, "field": field,
+                                  "label": group["diagnosis"],
+                                  "question": template.format(medication=name, diagnosis=group["diagnosis"])})
+    return questions
+
+
+def current_version(collection: str) -> str:
+    """Fingerprint of the live collection's chunk IDs (recorded so packs can be checked against it)."""
+    from agents.clinical_agent.rag.create_vectorstore import existing_point_ids
+    version = fingerprint(existing_point_ids(resources.get_vector_client(), collection))
+    record_collection_version(collection, version)
+    return version
+
+
+async def answer_all(questions: List[dict], concurrency: int) -> List[dict]:
+    """Retrieve and answer every question; returns the packs ready for the store."""
+    texts = list(dict.fromkeys(q["question"] for q in questions))
+    vectors = resources.get_embeddings().embed_documents(texts)
+    docs = dict(zip(texts, await asyncio.to_thread(search_batch, texts, vectors)))
+    embedded = dict(zip(texts, vectors))
+    semaphore, llm = asyncio.Semaphore(concurrency), get_llm()
+
+    async def answer(question: dict) -> dict | None:
+        found = docs[question["question"]]
+        prompt = pack_prompt.format(diagnosis=question["label"], question=question["question"],
+                                    context=build_context(question["question"], found))
+        async with semaphore:
+            try:
+                message = await llm.ainvoke(prompt, {"callbacks": [metrics_handler]})
+            except Exception as e:
+                logger.error("[AnswerPacks] Answer failed for %r: %s", question["question"], e)
+                return None
+        return {**question, "embedding": embedded[question["question"]], "answer": message.content,
+                "citations": list(dict.fromkeys(citation(doc.metadata) for doc in found))}
+
+    return [pack for pack in await asyncio.gather(*(answer(q) for q in questions)) if pack is not None]
+
+
+def negative_pairs(groups: Dict[str, dict]) -> List[tuple]:
+    """NEGATIVE_QUESTION_PAIRS formatted with every cohort's diagnosis and drug names."""
+    pairs = []
+    for group in groups.values():
+        for question, pack_question in NEGATIVE_QUESTION_PAIRS:
+            names = group["medications"].values() if "{medication}" in question + pack_question else [""]
+            pairs += [(question.format(medication=name, diagnosis=group["diagnosis"]),
+                       pack_question.format(medication=name, diagnosis=group["diagnosis"])) for name in names]
+    return list(dict.fromkeys(pairs))
+
+
+def calibrate(pairs: List[tuple]) -> float | None:
+    """
+    Highest cosine similarity between negative question pairs, embedded as a lookup does.
+    Args:
+        pairs (List[tuple]): (patient question, pack question) pairs from `negative_pairs()`.
+    Returns:
+        float | None: Highest score, or None without pairs.
+    """
+    if not pairs:
+        return None
+    embeddings = resources.get_embeddings()
+    questions = list(dict.fromkeys(q for q, _ in pairs))
+    pack_questions = list(dict.fromkeys(q for _, q in pairs))
+    asked = dict(zip(questions, (embeddings.embed_query(q) for q in questions)))  # As the fast path embeds
+    packed = dict(zip(pack_questions, embeddings.embed_documents(pack_questions)))  # As packs are stored
+
+    def unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    scores = [float(unit(asked[q]) @ unit(packed[p])) for q, p in pairs]
+    worst = max(range(len(pairs)), key=scores.__getitem__)
+    logger.info("[AnswerPacks] %s negative pairs, highest %.3f: %r vs %r", len(pairs), scores[worst], *pairs[worst])
+    return max(scores)
+
+
+def precompute(patients: List[dict], top_n: int = 4, concurrency: int = BATCH_LLM_CONCURRENCY,
+               diagnosis: str | None = None, collection: str | None = None) -> dict:
+    """
+    Generate and store the answer packs for the given patients' cohorts.
+    Args:
+        patients (List[dict]): Records with primary_diagnosis and medications.
+        top_n (int): Questions per diagnosis and per medication.
+        concurrency (int): LLM calls in flight.
+        diagnosis (str, optional): Only this diagnosis.
+        collection (str, optional): Retrieval collection (defaults to the one the RAG tool searches).
+    Returns:
+        dict: Cohort, question and pack counts, the collection version and timing.
+    """
+    from agents.clinical_agent.tools.rag_tool import retrieval_collection
+    start = time.perf_counter()
+    collection = collection or retrieval_collection
+    groups = cohorts(patients)
+    if diagnosis:
+        groups = {key: group for key, group in groups.items() if key == diagnosis_key(diagnosis)}
+    questions = pack_questions(groups, top_n)
+    version = current_version(collection)
+    packs = asyncio.run(answer_all(questions, concurrency)) if questions else []
+    store = AnswerPackStore(collection)
+    store.write(packs, version)
+    pairs = negative_pairs(groups)
+    max_negative = calibrate(pairs)
+    if max_negative is not None:
+        store.record_calibration(resources.EMBEDDING_MODEL_NAME, max_negative, len(pairs))
+    summary = {"collection": collection, "version": version, "cohorts": len(groups), "questions": len(questions),
+               "packs": len(packs), "pruned_stale": store.prune_stale(), "max_negative_score": max_negative,
+               "seconds": round(time.perf_counter() - start, 2)}
+    logger.info("[AnswerPacks] %s", summary)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute per-diagnosis answer packs.")
+    parser.add_argument("--patients", help="Patient records JSON (default: the patient database)")
+    parser.add_argument("--top-n", type=int, default=4, help="Questions per diagnosis and per medication")
+    parser.add_argument("--diagnosis", help="Only this primary diagnosis")
+    parser.add_argument("--concurrency", type=int, default=BATCH_LLM_CONCURRENCY, help="LLM calls in flight")
+    args = parser.parse_args()
+    print(json.dumps(precompute(load_patients(args.patients), args.top_n, args.concurrency, args.diagnosis)))
@@ -0,0 +1,82 @@
+"""
+prompt_context.py
+-----------------
+Builds each LLM call's input from graph state instead of replaying the whole conversation.
+The thread's messages (held by the checkpointer) are trimmed to a token budget, keeping the most
+recent turns. The verified patient's record is added to the system prompt as one compact line, so
+the agents keep the facts they need after older turns drop out. Every call logs its prompt token
+count next to the untrimmed history size, so the growth can be watched per turn.
+"""
+
+import logging  # Level check before counting tokens
+import os  # For environment variable access
+
+from langchain_core.messages import HumanMessage, SystemMessage  # Prompt messages
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages  # Token budget
+
+from backend.logger import logger  # Logger for prompt sizes
+
+# ---------------------- Prompt Budget --------------------------------- #
+PROMPT_HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", "2000"))  # Conversation tokens per LLM call
+PATIENT_CONTEXT_FIELDS = (
+    "discharge_date", "primary_diagnosis", "medications", "dietary_restrictions",
+    "follow_up", "warning_signs", "discharge_instructions",
+)
+
+
+def patient_context(state: dict) -> str | None:
+    """
+    Compact, structured summary of the verified patient's record.
+    Args:
+        state (dict): Agent state with `patient`, `patient_id` and `patient_name`.
+    Returns:
+        str | None: One line of 'field: value' pairs, or None until the patient is verified.
+    """
+    patient = state.get("patient")
+    if not patient or not state.get("patient_name"):
+        return None  # Nothing is shared with the LLM before identity verification
+    parts = [f"patient: {state['patient_name']} ({state.get('patient_id')})"]
+    for field in PATIENT_CONTEXT_FIELDS:
+        value = patient.get(field)
+        if value:
+            parts.append(f"{field}: {'; '.join(value) if isinstance(value, list) else value}")
+    return " | ".join(parts)
+
+
+def trim_history(messages: list, max_tokens: int = PROMPT_HISTORY_TOKENS) -> list:
+    """
+    Keep the most recent messages that fit in `max_tokens`, starting on a user turn so tool calls
+    stay paired with their results. The current turn is always kept, even if it alone is larger.
+    """
+    trimmed = trim_messages(messages, max_tokens=max_tokens, strategy="last",
+                            token_counter=count_tokens_approximately, start_on="human",
+                            include_system=False, allow_partial=False)
+    if trimmed:
+        return trimmed
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+    return list(messages[last_human:])
+
+
+def make_prompt(system_prompt: str, agent_name: str):
+    """
+    Build a create_react_agent `prompt` callable: system prompt + patient context + trimmed history.
+    Args:
+        system_prompt (str): The agent's instructions.
+        agent_name (str): Used in the prompt-size log line.
+    Returns:
+        Callable[[dict], list]: State -> messages for the LLM.
+    """
+
+    def prompt(state: dict) -> list:
+        context = patient_context(state)
+        system = SystemMessage(content=system_prompt if context is None
+                               else f"{system_prompt}\n\nVerified patient context: {context}")
+        history = list(state["messages"])
+        messages = [system, *trim_history(history)]
+        if logger.isEnabledFor(logging.INFO):  # Token counting is skipped when INFO is off
+            logger.info("[Prompt] %s: %s prompt tokens | %s/%s messages | untrimmed history %s tokens",
+                        agent_name, count_tokens_approximately(messages), len(messages) - 1, len(history),
+                        count_tokens_approximately(history))
+        return messages
+
+    return prompt
@@ -1,38 +1,313 @@
 """
 load_reports.py
 ---------------
-Loads patient report data from a JSON file and inserts it into a MongoDB collection.
-This script is intended for initial data population or migration.
+Streams patient reports from a JSON array or NDJSON file into MongoDB.
+Records are parsed incrementally (the file is never loaded whole), validated, and upserted by
+`patient_id` in unordered `bulk_write` batches, so re-running the loader never duplicates a
+patient. Progress is checkpointed after every batch so a failed nightly load can resume: the
+checkpoint is tied to the file's size, mtime and first block, NDJSON resumes by seeking to the
+saved byte offset, and the checkpoint is removed once a load completes.
+
+Usage:
+    python agents/receptionist_agent/load_reports.py --file data/patient_reports.json
+    python agents/receptionist_agent/load_reports.py --file feed.ndjson --batch-size 5000 --resume
 """
 
-import json  # For loading JSON data
-from pymongo import MongoClient  # For MongoDB connection'
-import os  # For environment variable access
-from dotenv import load_dotenv  # For loading environment variables from .env file
-
-# ---------------------- MongoDB Connection ---------------------------- #
-# Connect to local MongoDB instance (update URI for cloud/Atlas if needed)
-# client = MongoClient(os.getenv("MONGODB_URI_KEY"))
-client= MongoClient("mongodb://localhost:27017")  # Default local MongoDB URI
-
-# Create or use the database and collection
-# Change 'patient_reports_db' and 'patients' as needed for your project
-db = client["patient_reports_database"]
-collection = db["patients_data"]
-
-# ---------------------- Load Data from JSON --------------------------- #
-# Load patient reports from a local JSON file
-with open('data/patient_reports.json') as file:
-    data = json.load(file)  # `data` is a list of dicts or a single dict
-    print(f"Loaded {len(data)} records from JSON file.")
-
-# ---------------------- Insert Data into MongoDB ---------------------- #
-# Insert the loaded data into the MongoDB collection
-if isinstance(data, list):
-    res = collection.insert_many(data)
-    print(data)
-else:
-    res = collection.insert_one(data)
-
-print("Data inserted successfully!")
-print(res)
+import argparse  # CLI arguments
+import hashlib  # Source file fingerprint
+import io  # Text decoding of JSON array streams
+import itertools  # Re-attach the first NDJSON line
+import json  # Incremental JSON decoding
+import os  # For file paths
+import sys
+import time  # Throughput measurement
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from pymongo import UpdateOne  # Upsert operation for bulk_write
+from pymongo.errors import BulkWriteError  # Per-document write failures
+from backend.mongo_database import (  # Shared MongoDB collection and schema helpers
+    NORMALIZED_NAME_FIELD,
+    ensure_indexes,
+    get_collection,
+    normalize_name,
+)
+from backend.logger import logger  # Custom logger
+
+# ---------------------- Loader Configuration -------------------------- #
+DEFAULT_FILE = "data/patient_reports.json"
+DEFAULT_BATCH_SIZE = 1000  # Upserts per bulk_write
+DEFAULT_CHECKPOINT_FILE = "cache/load_reports.checkpoint.json"
+READ_CHUNK_SIZE = 1 << 16  # Characters read from the file per refill
+MAX_RECORD_CHARS = 1 << 24  # A JSON array record larger than this is treated as malformed
+MAX_REPORTED_INVALID = 100  # Locations of invalid records kept in the summary
+FINGERPRINT_BYTES = 1 << 16  # Head of the source file hashed into the checkpoint
+STRING_FIELDS = (
+    "patient_id", "patient_name", "discharge_date", "primary_diagnosis", "dietary_restrictions",
+    "follow_up", "warning_signs", "discharge_instructions",
+)
+REQUIRED_FIELDS = ("patient_id", "patient_name")
+
+_decoder = json.JSONDecoder()
+
+
+# ---------------------- Streaming Parser ------------------------------ #
+def iter_json_records(file):
+    """
+    Incrementally yield JSON values from a file containing either newline-delimited objects
+    (NDJSON), a JSON array of objects, or a single / concatenated objects.
+    NDJSON (the first non-blank line is a complete value) is decoded line by line, so a malformed
+    line is reported and skipped; anything else is decoded as a stream.
+    Args:
+        file (BinaryIO): File opened in binary mode (NDJSON positions are byte offsets).
+    Yields:
+        tuple: (location, record, error, position) - 'line N' or 'character N', the decoded value
+            (None if malformed), the decode error (None if it decoded) and, for NDJSON, the
+            (byte offset, line number) just after the record (None for a stream).
+    Raises:
+        ValueError: If an array / concatenated stream is truncated or malformed (with the character
+            offset), or a single record exceeds MAX_RECORD_CHARS.
+    """
+    head, line_number, position = b"", 0, 0
+    while True:
+        line = file.readline()
+        line_number += 1
+        if not line:
+            return
+        if line.strip():
+            break
+        head += line
+        position += len(line)
+    if not line.lstrip().startswith(b"["):
+        try:
+            json.loads(line.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            pass  # Not NDJSON: a record spans several lines
+        else:
+            yield from iter_ndjson(itertools.chain([line], file), line_number, position)
+            return
+    text = io.TextIOWrapper(file, encoding="utf-8")
+    yield from _iter_stream(text, (head + line).decode("utf-8"))
+
+
+def iter_ndjson(lines, first_line_number: int = 1, position: int = 0):
+    """
+    NDJSON: one value per line; malformed lines are yielded with their error.
+    Args:
+        lines (Iterable[bytes]): Raw lines, e.g. a binary file seeked to `position`.
+        first_line_number (int): Line number of the first line.
+        position (int): Byte offset of the first line.
+    Yields:
+        tuple: As `iter_json_records`, with the (byte offset, line number) after each line.
+    """
+    for number, line in enumerate(lines, first_line_number):
+        position += len(line)
+        if not line.strip():
+            continue
+        try:
+            yield f"line {number}", json.loads(line.decode("utf-8")), None, (position, number)
+        except json.JSONDecodeError as e:
+            yield f"line {number}", None, f"malformed JSON ({e.msg})", (position, number)
+        except UnicodeDecodeError as e:
+            yield f"line {number}", None, f"not UTF-8 ({e.reason})", (position, number)
+
+
+def _iter_stream(file, buffer: str):
+    """JSON array or concatenated values, read in chunks; `buffer` is the start of the file."""
+    pos, eof, consumed = 0, False, 0  # consumed: characters dropped from the front of the buffer
+    while True:
+        # Skip whitespace and array punctuation between records
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,[]":
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                return
+            consumed += len(buffer)
+            buffer, pos = file.read(READ_CHUNK_SIZE), 0
+            eof = not buffer
+            continue
+        try:
+            record, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"Truncated or malformed record at character {consumed + pos}: {e.msg}")
+            if len(buffer) - pos > MAX_RECORD_CHARS:
+                raise ValueError(f"Malformed record at character {consumed + pos}: "
+                                 f"no complete record within {MAX_RECORD_CHARS} characters")
+            more = file.read(READ_CHUNK_SIZE)
+            eof = not more
+            consumed += pos
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        yield f"character {consumed + pos}", record, None, None
+        pos = end
+
+
+# ---------------------- Validation ------------------------------------ #
+def validate_record(record) -> str | None:
+    """
+    Check a patient record against the expected schema.
+    Args:
+        record (Any): Decoded JSON value.
+    Returns:
+        str | None: Reason the record is invalid, or None if it is valid.
+    """
+    if not isinstance(record, dict):
+        return "record is not an object"
+    for field in REQUIRED_FIELDS:
+        if not isinstance(record.get(field), str) or not record[field].strip():
+            return f"missing or empty '{field}'"
+    for field in STRING_FIELDS:
+        if field in record and not isinstance(record[field], str):
+            return f"'{field}' must be a string"
+    medications = record.get("medications", [])
+    if not isinstance(medications, list) or not all(isinstance(m, str) for m in medications):
+        return "'medications' must be a list of strings"
+    return None
+
+
+def to_upsert(record: dict) -> UpdateOne:
+    """Build an idempotent upsert keyed by patient_id (also sets the normalized name)."""
+    document = {**record, NORMALIZED_NAME_FIELD: normalize_name(record["patient_name"])}
+    document.pop("_id", None)
+    return UpdateOne({"patient_id": record["patient_id"]}, {"$set": document}, upsert=True)
+
+
+# ---------------------- Checkpointing --------------------------------- #
+def source_fingerprint(source_path: str) -> dict:
+    """Size, modification time and a hash of the first block: a new feed at the same path differs."""
+    stat = os.stat(source_path)
+    with open(source_path, "rb") as f:
+        head = hashlib.sha256(f.read(FINGERPRINT_BYTES)).hexdigest()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "head": head}
+
+
+def read_checkpoint(checkpoint_path: str, source_path: str) -> dict | None:
+    """
+    Return the checkpoint saved for this exact source file.
+    Args:
+        checkpoint_path (str): Checkpoint file.
+        source_path (str): Source being loaded.
+    Returns:
+        dict | None: 'records' processed and, for NDJSON, the byte 'position' and 'line' to resume
+            after; None if there is no checkpoint or it belongs to another file or version of it.
+    """
+    try:
+        with open(checkpoint_path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("file") != os.path.abspath(source_path):
+        return None
+    if saved.get("fingerprint") != source_fingerprint(source_path):
+        logger.warning("[LoadReports] Ignoring checkpoint for %s: the file has changed since it was written",
+                       source_path)
+        return None
+    return saved
+
+
+def write_checkpoint(checkpoint_path: str, source_path: str, fingerprint: dict, records: int,
+                     position: tuple | None = None):
+    """Atomically record how many source records have been fully processed (and where, for NDJSON)."""
+    directory = os.path.dirname(checkpoint_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = checkpoint_path + ".tmp"
+    saved = {"file": os.path.abspath(source_path), "fingerprint": fingerprint, "records": records}
+    if position:
+        saved["position"], saved["line"] = position
+    with open(tmp_path, "w") as f:
+        json.dump(saved, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def clear_checkpoint(checkpoint_path: str):
+    """Remove the checkpoint once a load has completed."""
+    try:
+        os.remove(checkpoint_path)
+    except FileNotFoundError:
+        pass
+
+
+# ---------------------- Loader ---------------------------------------- #
+def load_reports(path: str = DEFAULT_FILE, batch_size: int = DEFAULT_BATCH_SIZE,
+                 checkpoint_path: str = DEFAULT_CHECKPOINT_FILE, resume: bool = False) -> dict:
+    """
+    Stream, validate and upsert patient reports.
+    Args:
+        path (str): JSON or NDJSON file.
+        batch_size (int): Upserts per bulk_write call.
+        checkpoint_path (str): File recording the last fully written record; removed on completion.
+        resume (bool): Continue after the records processed by a previous (failed) run of the same
+            file (NDJSON seeks to the saved byte offset; a JSON array is re-parsed up to the record).
+    Returns:
+        dict: Counts of processed, upserted, modified, invalid and failed records, the locations
+            of the first invalid records ('invalid_at') and throughput.
+    """
+    ensure_indexes()  # Unique patient_id index keeps upserts fast and duplicate-free
+    collection = get_collection()
+    fingerprint = source_fingerprint(path)
+    checkpoint = read_checkpoint(checkpoint_path, path) if resume else None
+    start_offset = checkpoint["records"] if checkpoint else 0
+    if start_offset:
+        print(f"Resuming from record {start_offset}")
+
+    stats = {"processed": 0, "upserted": 0, "modified": 0, "invalid": 0, "failed": 0, "invalid_at": []}
+    offset, position, batch = 0, None, []
+    start = time.perf_counter()
+
+    def flush():
+        if batch:
+            try:
+                result = collection.bulk_write(batch, ordered=False)
+                stats["upserted"] += result.upserted_count
+                stats["modified"] += result.modified_count
+            except BulkWriteError as e:
+                details = e.details
+                stats["upserted"] += details.get("nUpserted", 0)
+                stats["modified"] += details.get("nModified", 0)
+                stats["failed"] += len(details.get("writeErrors", []))
+                logger.error("[LoadReports] %s write errors in batch ending at %s", len(details.get('writeErrors', [])), offset)
+            batch.clear()
+            elapsed = time.perf_counter() - start
+            print(f"Processed {offset} records | {stats['processed'] / elapsed:,.0f} records/s")
+        write_checkpoint(checkpoint_path, path, fingerprint, offset, position)
+
+    with open(path, "rb") as file:
+        if checkpoint and "position" in checkpoint:
+            file.seek(checkpoint["position"])
+            offset = start_offset
+            records = iter_ndjson(file, checkpoint["line"] + 1, checkpoint["position"])
+        else:
+            records = iter_json_records(file)
+        for location, record, error, position in records:
+            offset += 1
+            if offset <= start_offset:
+                continue
+            stats["processed"] += 1
+            error = error or validate_record(record)
+            if error:
+                stats["invalid"] += 1
+                if len(stats["invalid_at"]) < MAX_REPORTED_INVALID:
+                    stats["invalid_at"].append(location)
+                logger.info("[LoadReports] Skipping record %s (%s): %s", offset, location, error)
+                continue
+            batch.append(to_upsert(record))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    clear_checkpoint(checkpoint_path)
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    stats["records_per_second"] = round(stats["processed"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream patient reports (JSON/NDJSON) into MongoDB.")
+    parser.add_argument("--file", default=DEFAULT_FILE, help="JSON array or NDJSON file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Upserts per bulk_write")
+    parser.add_argument("--checkpoint-file", default=DEFAULT_CHECKPOINT_FILE, help="Resume checkpoint path")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpointed offset")
+    args = parser.parse_args()
+    summary = load_reports(args.file, args.batch_size, args.checkpoint_file, args.resume)
+    print(f"Load complete: {summary}")
@@ -7,8 +7,9 @@ This module provides a tool for fetching patient details from the database and r
 # from langgraph import tool  # Uncomment if using LangGraph tool decorator
 from langchain_core.messages import AIMessage, HumanMessage  # For message formatting (if needed)
 
-from backend.mongo_database import get_patient_by_name  # Function to fetch patient from DB
-from backend.logger import logger  # Logger for tracking tool usage
+from backend.patient_cache import RECORDS_UNAVAILABLE, patient_cache  # Read-through cache over the patient DB
+from backend.resilience import DependencyUnavailable  # MongoDB down / circuit open
+from backend.logger import logger, phi  # Logger for tracking tool usage (names masked)
 
 
 def patient_report_tool(patient_name: str, agent_name: str = "ReceptionistAgent") -> dict:
@@ -23,13 +24,17 @@ def patient_report_tool(patient_name: str, agent_name: str = "ReceptionistAgent"
     Returns:
         dict or str: Patient details as a dict if found, or an error message string if not found.
     """
-    logger.info(f"[PatientReportTool] Called by: {agent_name} | Patient Name: {patient_name}")
-    patient = get_patient_by_name(patient_name)
+    logger.info("[PatientReportTool] Called by: %s | Patient Name: %s", agent_name, phi(patient_name))
+    try:
+        patient = patient_cache.get_by_name(patient_name)
+    except DependencyUnavailable:
+        logger.warning("[PatientReportTool] Patient records unavailable for: %s", agent_name)
+        return f"⚠️ {RECORDS_UNAVAILABLE}"
     if not patient:
-        logger.info(f"[PatientReportTool] Responded by: {agent_name} | No patient found: {patient_name}")
+        logger.info("[PatientReportTool] Responded by: %s | No patient found: %s", agent_name, phi(patient_name))
         return f"❌ No patient found with name: {patient_name}."
     if patient_name == patient["patient_name"]:
-        logger.info(f"[PatientReportTool] Responded by: {agent_name} | Patient found: {patient['patient_name']}")
+        logger.info("[PatientReportTool] Responded by: %s | Patient found: %s", agent_name, phi(patient['patient_name']))
         return f"✅ Patient found: {patient['patient_name']}. Please enter Patient Id to confirm."
     # Optionally, you can return a summary string here if needed
     summary = (
@@ -39,5 +44,5 @@ def patient_report_tool(patient_name: str, agent_name: str = "ReceptionistAgent"
         f"Dietary Restrictions: {patient['dietary_restrictions']}\n"
         f"Follow-up: {patient.get('follow_up', 'N/A')}"
     )
-    logger.info(f"[PatientReportTool] Responded by: {agent_name} | Summary sent for: {patient['patient_name']}")
+    logger.info("[PatientReportTool] Responded by: %s | Summary sent for: %s", agent_name, phi(patient['patient_name']))
     return patient
\ No newline at end of file
@@ -5,54 +5,34 @@ Defines the Receptionist Agent for the AI assistant system. This agent handles p
 """
 
 from langgraph.prebuilt import create_react_agent  # For agent creation
-from langgraph.graph import START, END, StateGraph  # For workflow graphs (not used directly here)
-from langchain_google_genai import ChatGoogleGenerativeAI  # (Optional) Google GenAI LLM
-from langchain_core.tools import tool  # For tool integration
-from langchain.prompts import ChatPromptTemplate  # For prompt templates
-from dotenv import load_dotenv  # For environment variable management
+from langchain_core.tools import tool, InjectedToolCallId  # For tool integration
+from langchain_core.messages import ToolMessage  # Result message of the verification tool
+from langgraph.prebuilt.chat_agent_executor import AgentState  # Base ReAct agent state
+from langgraph.types import Command  # Tool result that also updates graph state
 import os, sys
 # from langgraph.types import Command  # Uncomment if needed
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from backend.mongo_database import get_patient_by_id  # DB function to fetch patient by ID
-from agents.clinical_agent.clinical_agent import clinical_assistant  # Clinical agent for handoff
-from langgraph_swarm import create_handoff_tool, create_swarm  # For agent handoff and swarm
+from backend.patient_cache import RECORDS_UNAVAILABLE, patient_cache  # Read-through cache over the patient DB
+from backend.resilience import DependencyUnavailable  # MongoDB down / circuit open
+from langgraph_swarm import create_handoff_tool  # For agent handoff
 from agents.receptionist_agent.patient_report_tool import patient_report_tool  # Tool to fetch patient report
-from typing_extensions import TypedDict, Literal  # For type annotations
-from agents.llm_model import llm  # Main language model
-from backend.logger import logger  # Logger for tracking agent events
-
-# ---------------------- Medical Query Keywords ------------------------ #
-MEDICAL_KEYWORDS = [
-    "medication", "dose", "symptom", "treatment", "side effect",
-    "pain", "diet", "swelling", "blood", "fever", "fatigue"
-]
-
-def is_medical_query(query: str):
-    """
-    Checks if the query contains medical keywords.
-    Args:
-        query (str): The user's question.
-    Returns:
-        bool: True if the query is medical, False otherwise.
-    """
-    return any(word in query.lower() for word in MEDICAL_KEYWORDS)
+from typing_extensions import Annotated, NotRequired  # For type annotations
+from backend.mongo_database import normalize_name  # Same name normalization as the DB index
+from agents.prompt_context import make_prompt  # Trimmed history + verified patient context
+from agents.llm_model import get_llm  # Main language model (created on first use)
 
 # ---------------------- State Schema ---------------------------------- #
-class ReceptionistState(TypedDict):
+class ReceptionistState(AgentState):
     """
-    State schema for the receptionist agent workflow.
+    State schema for the receptionist agent (shared with the swarm graph and checkpointed).
     Attributes:
         patient_id (str): Unique identifier for the patient.
-        patient_name (str): Full name of the patient.
-        query (str): User's question or request.
-        response (str): Response generated by the agent.
+        patient_name (str): Full name of the patient, set once verification succeeds.
         patient (dict | None): Patient record fetched from MongoDB.
     """
-    patient_id: str
-    patient_name: str
-    query: str
-    response: str
-    patient: dict | None
+    patient_id: NotRequired[str | None]
+    patient_name: NotRequired[str | None]
+    patient: NotRequired[dict | None]
 
 # ---------------------- Prompt Template ------------------------------- #
 prompt = """
@@ -112,19 +92,39 @@ def get_patient_report(patient_id: str) -> dict:
     Returns:
         dict: The patient report data, or an error message if not found.
     """
-    patient = get_patient_by_id(patient_id)
+    try:
+        patient = patient_cache.get_by_id(patient_id)
+    except DependencyUnavailable:
+        return {"error": RECORDS_UNAVAILABLE}
     if not patient:
         return {"error": f"No patient found with ID: {patient_id}"}
     return patient
 
-# Create the receptionist agent using ReAct framework
-# This agent will handle patient queries and hand off medical questions to the clinical agent
-receptionist_assistant = create_react_agent(
-    llm,
-    [get_patient_report,  patient_report_tool,create_handoff_tool(agent_name="clinical_assistant", description="Transfer to medical queries to the clinical assistant for expert handling.")],
-    name="receptionist_assistant",
-    prompt=(
-        """
+@tool
+def verify_patient_identity(patient_id: str, full_name: str,
+                            tool_call_id: Annotated[str, InjectedToolCallId]) -> Command:
+    """
+    Verify a patient by their Patient ID and full name. On success the discharge report is stored
+    in the session, so it does not need to be fetched or repeated again.
+    Args:
+        patient_id (str): The Patient ID the user gave (e.g. P001).
+        full_name (str): The full name the user gave.
+    """
+    try:
+        patient = patient_cache.get_by_id(patient_id.strip().upper())
+    except DependencyUnavailable:
+        return Command(update={"messages": [ToolMessage(RECORDS_UNAVAILABLE, tool_call_id=tool_call_id)]})
+    if not patient:
+        result, update = f"No patient found with ID: {patient_id}", {}
+    elif normalize_name(full_name) != normalize_name(patient["patient_name"]):
+        result, update = "The name doesn't match our records.", {}
+    else:
+        result = f"Verified. Discharge report: {patient}"
+        update = {"patient_id": patient["patient_id"], "patient_name": patient["patient_name"], "patient": patient}
+    return Command(update={**update, "messages": [ToolMessage(result, tool_call_id=tool_call_id)]})
+
+# Instructions passed to the agent (system prompt)
+RECEPTIONIST_PROMPT = """
         "You are a helpful and intelligent Medical Receptionist Assistant designed to support patients after discharge.\n\n" \
 
         
@@ -135,15 +135,28 @@ receptionist_assistant = create_react_agent(
         "Mention this 👩‍⚕️ Receptionist:  with your response\n\n
         "1. Greet and ask for Patient ID.\n" \
         "2. Retrieve patient report using the patient_report_tool.\n" \ 
-        "3. Verify patient identity by asking for full name.\n" \
+        "3. Verify patient identity by asking for full name, then call verify_patient_identity.\n" \
         "4. Summarize discharge information and dietary restrictions.\n" \
         "5. Handle general queries or route medical questions to the clinical assistant.\n\n" \
         "Use the following format for your responses:",
 
          
         """
-    )
-   
-)
 
 
+def build_receptionist_agent(llm=None):
+    """
+    Create the receptionist agent using ReAct framework.
+    This agent will handle patient queries and hand off medical questions to the clinical agent.
+    Args:
+        llm: Chat model (defaults to the shared Gemini model).
+    Returns:
+        CompiledStateGraph: The `receptionist_assistant` agent.
+    """
+    return create_react_agent(
+        llm or get_llm(),
+        [get_patient_report,  patient_report_tool, verify_patient_identity, create_handoff_tool(agent_name="clinical_assistant", description="Transfer to medical queries to the clinical assistant for expert handling.")],
+        name="receptionist_assistant",
+        state_schema=ReceptionistState,
+        prompt=make_prompt(RECEPTIONIST_PROMPT, agent_name="receptionist_assistant"),
+    )
@@ -0,0 +1,169 @@
+"""
+stream_events.py
+----------------
+Translates LangGraph streaming output from the compiled swarm into simple chat events.
+Used by the SSE endpoint (`POST /chat/stream`) and by the Streamlit UI to show LLM tokens,
+agent handoffs and tool activity while the ReAct loop is still running. Replies written by the
+fast-path router without an LLM arrive as a single token event.
+"""
+
+import json  # For SSE payloads
+import os  # For environment variable access
+
+from langchain_core.messages import AIMessage, AIMessageChunk  # Streamed LLM output (chunks subclass AIMessage)
+from langgraph.constants import TAG_NOSTREAM  # Tag of LLM calls whose tokens are never streamed
+from langgraph.types import Command  # Node output carrying a state update
+
+HANDOFF_PREFIX = "transfer_to_"  # Name prefix of langgraph_swarm handoff tools
+AGENT_MODEL_NODE = "agent"  # Model node inside each ReAct agent (the other one runs the tools)
+# Characters of a model step held back before streaming, so narration ahead of a tool call is dropped
+STREAM_HOLD_CHARS = int(os.getenv("STREAM_HOLD_CHARS", "64"))
+
+
+def _chunk_text(chunk) -> str:
+    """Extract plain text from an AIMessage(Chunk) (Gemini may return a list of content parts)."""
+    content = chunk.content
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return content or ""
+
+
+def _fast_path_replies(output) -> list:
+    """Messages in a node's Command update that were produced by the fast-path router."""
+    update = output.update if isinstance(output, Command) else None
+    if not isinstance(update, dict):
+        return []
+    return [message for message in update.get("messages", [])
+            if isinstance(message, AIMessage) and message.response_metadata.get("fast_path")]
+
+
+def _agent_name(metadata: dict) -> str | None:
+    """The swarm agent an event belongs to, taken from the checkpoint namespace ('agent:task|...')."""
+    namespace = metadata.get("langgraph_checkpoint_ns", "")
+    if namespace:
+        return namespace.split(":", 1)[0]
+    return metadata.get("langgraph_node")
+
+
+class AnswerTokenFilter:
+    """
+    Picks the tokens of the agents' answers out of the LLM chunks of a turn.
+    Only the agent model node counts: LLM calls nested in tools (the RAG chain's model is tagged
+    'nostream') are skipped, and a model step that turns into a tool call is dropped. Each step's
+    text is held until it reaches `hold_chars` or the step ends, so the short narration models
+    sometimes send before a tool call never reaches the user; after that it streams as generated
+    (text a step sends after a tool call has started is dropped).
+    """
+
+    def __init__(self, hold_chars: int = STREAM_HOLD_CHARS):
+        self.hold_chars = hold_chars
+        self._steps = {}  # run / message ID -> {"held": str, "live": bool, "tool_call": bool}
+
+    @staticmethod
+    def accepts(metadata: dict, tags: list | None = None) -> bool:
+        """True for LLM output of an agent's model node."""
+        tags = tags if tags is not None else metadata.get("tags") or []
+        return TAG_NOSTREAM not in tags and metadata.get("langgraph_node") == AGENT_MODEL_NODE
+
+    def feed(self, step_id: str, chunk) -> str:
+        """Text of `chunk` that can be sent now."""
+        step = self._steps.setdefault(step_id, {"held": "", "live": False, "tool_call": False})
+        if step["tool_call"]:
+            return ""
+        if getattr(chunk, "tool_call_chunks", None) or chunk.tool_calls:
+            step.update(held="", tool_call=True)
+            return ""
+        text = _chunk_text(chunk)
+        if step["live"]:
+            return text
+        step["held"] += text
+        if len(step["held"]) < self.hold_chars:
+            return ""
+        text, step["held"], step["live"] = step["held"], "", True
+        return text
+
+    def finish(self, step_id: str) -> str:
+        """Held text of a step that ended without a tool call."""
+        step = self._steps.pop(step_id, None)
+        return "" if step is None or step["tool_call"] else step["held"]
+
+
+async def astream_chat_events(app, inputs: dict, config: dict):
+    """
+    Stream a chat turn as events.
+    Args:
+        app: Compiled LangGraph swarm.
+        inputs (dict): Graph input, e.g. {"messages": [...]}.
+        config (dict): Workflow config with the thread ID.
+    Yields:
+        dict: Events with a 'type' of 'token', 'handoff', 'tool_start' or 'tool_end'
+            (fast-path tokens carry 'fast_path': True).
+    """
+    answer = AnswerTokenFilter()
+    async for event in app.astream_events(inputs, config, version="v2"):
+        kind, name = event["event"], event.get("name", "")
+        if kind in ("on_chat_model_stream", "on_chat_model_end"):
+            if not answer.accepts(event["metadata"], event.get("tags")):
+                continue
+            if kind == "on_chat_model_stream":
+                text = answer.feed(event["run_id"], event["data"]["chunk"])
+            else:
+                text = answer.finish(event["run_id"])
+            if text:
+                yield {"type": "token", "agent": _agent_name(event["metadata"]), "content": text}
+        elif kind == "on_tool_start":
+            if name.startswith(HANDOFF_PREFIX):
+                yield {"type": "handoff", "from": _agent_name(event["metadata"]),
+                       "to": name[len(HANDOFF_PREFIX):]}
+            else:
+                yield {"type": "tool_start", "tool": name, "input": event["data"].get("input")}
+        elif kind == "on_tool_end" and not name.startswith(HANDOFF_PREFIX):
+            yield {"type": "tool_end", "tool": name}
+        elif kind == "on_chain_end":
+            for message in _fast_path_replies(event["data"].get("output")):
+                yield {"type": "token", "agent": message.name, "content": _chunk_text(message), "fast_path": True}
+
+
+def stream_chat_tokens(app, inputs: dict, config: dict):
+    """
+    Synchronously stream only the answer tokens of a chat turn (for Streamlit's st.write_stream).
+    Args:
+        app: Compiled LangGraph swarm.
+        inputs (dict): Graph input, e.g. {"messages": [...]}.
+        config (dict): Workflow config with the thread ID.
+    Yields:
+        str: Text tokens as they are generated.
+    """
+    answer, step_id, streamed = AnswerTokenFilter(), None, set()
+    for _namespace, (message, metadata) in app.stream(inputs, config, stream_mode="messages", subgraphs=True):
+        if not isinstance(message, AIMessage):
+            continue
+        if message.response_metadata.get("fast_path"):
+            text = _chunk_text(message)  # Router reply, not generated by an LLM
+        elif not answer.accepts(metadata):
+            continue
+        elif isinstance(message, AIMessageChunk):
+            text = answer.finish(step_id) if message.id != step_id else ""
+            step_id = message.id
+            streamed.add(message.id)
+            text += answer.feed(message.id, message)
+        elif message.id not in streamed and not message.tool_calls:
+            text = _chunk_text(message)  # Model that did not stream
+        else:
+            continue
+        if text:
+            yield text
+    text = answer.finish(step_id)
+    if text:
+        yield text
+
+
+def format_sse(event: dict) -> str:
+    """
+    Encode an event as a Server-Sent Events frame.
+    Args:
+        event (dict): Event with a 'type' key.
+    Returns:
+        str: 'event: <type>\\ndata: <json>\\n\\n'
+    """
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
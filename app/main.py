@@ -9,8 +9,10 @@ from typing import Literal
 # ---------------------------------------------------------------------- #
 # Add the parent directory to sys.path so that backend and agents modules can be imported
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from backend.logger import logger  # Custom logger for app events
-from agents.graph_builder import app   # LangGraph Swarm (receptionist + clinical)
+from backend.logger import logger, phi, thread_id_var  # Custom logger for app events + thread log context
+from agents.graph_builder import get_app, make_config, new_thread_id   # LangGraph Swarm (receptionist + clinical)
+from agents.stream_events import stream_chat_tokens  # Incremental token rendering
+from backend.mongo_database import ensure_indexes  # Startup index migration
 
 # ---------------------------------------------------------------------- #
 #  Streamlit config
@@ -21,6 +23,10 @@ st.set_page_config(
     layout="wide",                                   # Use full screen width
 )
 
+# Run the patient index migration once per server process (not on every rerun)
+st.cache_resource(ensure_indexes)()
+app = get_app()  # Compiled once per process on the first script run
+
 # ---------------------------------------------------------------------- #
 #  Session State
 # ---------------------------------------------------------------------- #
@@ -29,6 +35,9 @@ if "chat_history" not in st.session_state:
     st.session_state.chat_history = []          # Current chat messages
 if "previous_sessions" not in st.session_state:
     st.session_state.previous_sessions = []     # List of previous chat sessions
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = new_thread_id()  # Checkpointer thread for this session
+thread_id_var.set(st.session_state.thread_id)  # Log records of this script run carry the thread ID
 
 # ---------------------------------------------------------------------- #
 #  Helpers
@@ -98,19 +107,23 @@ with mid_col:
         submitted = st.form_submit_button("Send")
 
         if submitted and user_query.strip():
-            logger.info(f"User query: {user_query}")
+            logger.info("User query: %s", phi(user_query))
             st.session_state.chat_history.append(
                 {"role": "user", "content": user_query.strip()}
             )
             try:
-                # Call the LangGraph agent with the full chat history
-                config = {"configurable": {"thread_id": "1"}}
-                response = app.invoke({"messages": st.session_state.chat_history},
-                                      config=config)
-
-                agent_msg = "[No response]"
-                if response.get("messages"):
-                    agent_msg = response["messages"][-1].content
+                # Stream the LangGraph agent's reply token by token. Only the new message is sent:
+                # the checkpointer already holds the thread's history and verified patient state.
+                config = make_config(st.session_state.thread_id)
+                with chat_container:
+                    st.markdown(f"🧑 **You:** {user_query.strip()}")
+                    streamed = st.write_stream(
+                        stream_chat_tokens(app, {"messages": [{"role": "user", "content": user_query.strip()}]}, config)
+                    )
+
+                # The final message in the thread is the authoritative reply for the history
+                messages = app.get_state(config).values.get("messages", [])
+                agent_msg = messages[-1].content if messages else (streamed or "[No response]")
 
                 # Determine agent type for formatting (optional)
                 agent_type = (
@@ -123,7 +136,7 @@ with mid_col:
                 st.rerun()
 
             except Exception as e:
-                logger.error(f"Error: {e}")
+                logger.error("Error: %s", e)
                 st.session_state.chat_history.append(
                     {"role": "assistant", "content": f"❌ Error: {e}"}
                 )
@@ -146,9 +159,11 @@ with right_col:
                 {
                     "timestamp": datetime.now().strftime("%b %d, %I:%M %p"),
                     "messages": list(st.session_state.chat_history),
+                    "thread_id": st.session_state.thread_id,
                 }
             )
         st.session_state.chat_history = []
+        st.session_state.thread_id = new_thread_id()
         st.rerun()
 
     if st.session_state.previous_sessions:
@@ -169,6 +184,7 @@ with right_col:
             # Button to load previous session into chat
             if st.button(label, key=f"load_{idx}"):
                 st.session_state.chat_history = list(session["messages"])
+                st.session_state.thread_id = session.get("thread_id", new_thread_id())
                 st.rerun()
     else:
         st.markdown("_No previous sessions._")
@@ -5,10 +5,38 @@ FastAPI app for exposing the multi-agent medical assistant as a REST API endpoin
 Handles chat requests and returns responses from the agent workflow.
 """
 
-from fastapi import FastAPI, Request  # FastAPI framework
-from pydantic import BaseModel  # For request/response models
-from agents.graph_builder import app as agent_app, config  # Multi-agent workflow and config
+import asyncio  # Background warm-up task
+import json  # NDJSON batch results
+import time  # For time-to-first-byte measurement
+import uuid  # Request IDs
+from contextlib import asynccontextmanager  # For the application lifespan handler
+from fastapi import FastAPI, HTTPException, Request  # FastAPI framework
+from fastapi.responses import JSONResponse, Response, StreamingResponse  # Readiness, /metrics and SSE
+from pydantic import BaseModel, Field  # For request/response models
+from agents.graph_builder import get_app, make_config, new_thread_id  # Multi-agent workflow (built lazily)
 from fastapi.middleware.cors import CORSMiddleware  # For CORS support
+from agents.stream_events import astream_chat_events, format_sse  # Streaming event translation
+from backend.logger import (  # Custom logger, request/thread log context and queue stats
+    log_context,
+    logger,
+    queue_stats,
+    request_id_var,
+    thread_id_var,
+)
+from backend.concurrency import (  # Bounded executor and admission control
+    ConcurrencyLimiter,
+    QueueFullError,
+    install_default_executor,
+    run_blocking,
+    shutdown_executor,
+)
+from backend.mongo_database import close_client, ensure_indexes  # Startup index migration / pool shutdown
+from backend.patient_cache import patient_cache  # Patient record cache (for stats)
+from agents.fast_path import fast_path_stats  # Share of turns answered without the LLM
+from agents.batch_answer import BATCH_MAX_ITEMS, answer_batch  # Bulk follow-up answering
+from backend.metrics import TTFB_SECONDS, TURN_SECONDS, render_metrics, stats_collector  # Prometheus metrics
+from backend import resources  # Embedding models / Qdrant client
+from backend.warmup import WARMUP_ON_STARTUP, WARMUP_RETRY_SECONDS, warmup  # Deferred initialization
 
 # ---------------------- Request/Response Models ----------------------- #
 class ChatRequest(BaseModel):
@@ -16,19 +44,95 @@ class ChatRequest(BaseModel):
     Request model for chat endpoint.
     Attributes:
         message (str): The user's message to the assistant.
+        thread_id (str | None): Conversation thread; omit to start a new session.
     """
     message: str
+    thread_id: str | None = None
 
 class ChatResponse(BaseModel):
     """
     Response model for chat endpoint.
     Attributes:
         response (str): The assistant's reply.
+        thread_id (str): Conversation thread to send with the next message.
     """
     response: str
+    thread_id: str
+
+class BatchItem(BaseModel):
+    """
+    One follow-up question for one patient.
+    Attributes:
+        patient_id (str): Patient the question is about (e.g. P001).
+        question (str): The question to answer.
+    """
+    patient_id: str
+    question: str
+
+class BatchRequest(BaseModel):
+    """
+    Request model for the batch endpoint.
+    Attributes:
+        items (list[BatchItem]): Pairs to answer (at most BATCH_MAX_ITEMS).
+    """
+    items: list[BatchItem] = Field(min_length=1)
+
+# ---------------------- Warm-up -------------------------------------- #
+def warm_rag():
+    """Open the answer cache and build the RAG chain (connects to Qdrant)."""
+    from agents.clinical_agent.tools.rag_tool import get_rag_chain, get_semantic_cache
+    get_semantic_cache()
+    get_rag_chain()
+
+# Built in this order after startup; /readyz reports each step
+warmup.register("mongo", ensure_indexes)  # Patient index migration
+warmup.register("models", resources.warm_models)  # Embedding model (+ sparse model / reranker)
+warmup.register("vector_store", resources.check_vector_store)
+warmup.register("graph", get_app)  # LLM client + agents + checkpointer
+warmup.register("rag", warm_rag)
+
+async def warm_up_until_ready():
+    """Run the warm-up steps off the event loop, retrying failed ones until all are ready."""
+    while not await run_blocking(warmup.run):
+        await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+async def agent_app():
+    """The compiled workflow; built in the executor if warm-up has not got to it yet."""
+    return get_app() if warmup.is_ready("graph") else await run_blocking(get_app)
 
 # ---------------------- FastAPI App Setup ----------------------------- #
-fastapi_app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Route blocking tool calls (pymongo, Qdrant, DuckDuckGo) through the bounded executor
+    for the lifetime of the server, warm up in the background (the server accepts requests
+    immediately; /readyz turns 200 once everything is built), and shut down gracefully.
+    Shutdown runs after the server has stopped accepting connections and let in-flight requests
+    (including open SSE / NDJSON streams) finish, bounded by gunicorn's graceful_timeout. It then
+    turns readiness off, waits for running blocking calls and closes the Mongo and Qdrant pools.
+    """
+    install_default_executor()
+    task = asyncio.create_task(warm_up_until_ready()) if WARMUP_ON_STARTUP else None
+    yield
+    warmup.drain()
+    if task is not None:
+        task.cancel()
+    if chat_limiter.in_flight:
+        logger.warning("[Shutdown] %s chat requests still in flight", chat_limiter.in_flight)
+    shutdown_executor()  # Waits for blocking calls that are still running
+    close_client()
+    resources.close_clients()
+    logger.info("[Shutdown] Drained and closed connection pools")
+
+fastapi_app = FastAPI(lifespan=lifespan)
+
+# Existing stats dicts, exported as gauges on /metrics
+stats_collector.register("patient_cache", patient_cache.stats)
+stats_collector.register("fast_path", fast_path_stats.stats)
+stats_collector.register("log_queue", queue_stats)
+
+# Per-process cap on running + queued chats; excess requests get HTTP 429
+chat_limiter = ConcurrencyLimiter()
 
 # Optional: Allow CORS for local development or frontend integration
 fastapi_app.add_middleware(
@@ -39,6 +143,15 @@ fastapi_app.add_middleware(
     allow_headers=["*"],
 )
 
+@fastapi_app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag every log record of a request with its ID (client's X-Request-ID or a new one) and echo it back."""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    with log_context(request_id=request_id):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # ---------------------- Chat Endpoint --------------------------------- #
 @fastapi_app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
@@ -48,10 +161,176 @@ async def chat_endpoint(request: ChatRequest):
         request (ChatRequest): The incoming chat request.
     Returns:
         ChatResponse: The assistant's reply.
+    Raises:
+        HTTPException: 429 if the server's chat queue is full.
     """
     user_input = request.message
-    agent_response = agent_app.invoke({"messages": [{"role": "user", "content": user_input}]}, config)
-    content = agent_response["messages"][-1].content
-    return ChatResponse(response=content)
+    thread_id = request.thread_id or new_thread_id()
+    try:
+        async with chat_limiter.slot():
+            start = time.perf_counter()
+            with log_context(thread_id=thread_id):
+                agent_response = await (await agent_app()).ainvoke(
+                    {"messages": [{"role": "user", "content": user_input}]}, make_config(thread_id)
+                )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    last_message = agent_response["messages"][-1]
+    elapsed = time.perf_counter() - start
+    TURN_SECONDS.labels("chat").observe(elapsed)
+    if not last_message.response_metadata.get("fast_path"):
+        fast_path_stats.record_llm_turn(elapsed)
+    return ChatResponse(response=last_message.content, thread_id=thread_id)
+
+# ---------------------- Cache Statistics Endpoint --------------------- #
+@fastapi_app.get("/stats/cache")
+async def cache_stats_endpoint(thread_id: str | None = None):
+    """
+    Reports hit ratios of this process's caches (patient records, RAG answers and answer packs).
+    Args:
+        thread_id (str, optional): Also report the patient lookups of this conversation.
+    Returns:
+        dict: Per-cache statistics.
+    """
+    from agents.clinical_agent.tools.rag_tool import get_semantic_cache
+    from backend.answer_packs import get_answer_pack_store
+    stats = {"patient_cache": patient_cache.stats(), "semantic_cache": get_semantic_cache().stats(),
+             "answer_packs": get_answer_pack_store().stats()}
+    if thread_id:
+        stats["conversation"] = patient_cache.conversation_stats(thread_id)
+    return stats
+
+@fastapi_app.get("/stats/routing")
+async def routing_stats_endpoint():
+    """
+    Reports how many turns the fast-path router answered without an LLM call and the latency saved.
+    Returns:
+        dict: Fast-path statistics for this process.
+    """
+    return fast_path_stats.stats()
+
+@fastapi_app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms (LLM, retriever, embed_query, Mongo,
+    web search, tools, graph nodes), LLM token counts, handoffs, time to first token, and the
+    cache / routing / log-queue statistics as gauges.
+    Returns:
+        Response: Prometheus text exposition format.
+    """
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+# ---------------------- Health Endpoints ------------------------------ #
+@fastapi_app.get("/healthz")
+async def health_endpoint():
+    """
+    Liveness: the process is up and serving, whether or not warm-up has finished.
+    Returns:
+        dict: Status and uptime.
+    """
+    return {"status": "ok", "uptime_s": warmup.report()["uptime_s"]}
+
+@fastapi_app.get("/readyz")
+async def readiness_endpoint():
+    """
+    Readiness: 200 once every warm-up step (Mongo, models, vector store, agent graph, RAG chain) is ready,
+    503 before that, if a step failed, or while the process drains on shutdown.
+    Returns:
+        JSONResponse: Readiness and per-step state and duration.
+    """
+    report = warmup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+# ---------------------- Streaming Chat Endpoint ----------------------- #
+@fastapi_app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Handles POST requests to /chat/stream. Streams the agent workflow as Server-Sent Events:
+    'session' (thread ID), 'handoff', 'tool_start', 'tool_end', 'token' and a final 'done'
+    event carrying the time-to-first-byte of the first LLM token (or a single 'error' event if
+    the queue filled up before the stream started).
+    Args:
+        request (ChatRequest): The incoming chat request.
+    Returns:
+        StreamingResponse: A text/event-stream response.
+    Raises:
+        HTTPException: 429 if the server's chat queue is full.
+    """
+    received = time.perf_counter()
+    thread_id = request.thread_id or new_thread_id()
+    try:
+        chat_limiter.check_admission()  # A full queue is a 429 before the response starts
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+    request_id = request_id_var.get()  # The generator runs after the middleware has returned
+
+    async def event_stream():
+        # Set without reset: the body is iterated in its own task, so the values stay local to this stream
+        request_id_var.set(request_id)
+        thread_id_var.set(thread_id)
+        ttfb_ms, fast_path = None, False
+        try:
+            # The slot lives with the body: a body that never starts holds none, and closing it releases it
+            async with chat_limiter.slot():
+                yield format_sse({"type": "session", "thread_id": thread_id})
+                inputs = {"messages": [{"role": "user", "content": request.message}]}
+                async for event in astream_chat_events(await agent_app(), inputs, make_config(thread_id)):
+                    if ttfb_ms is None and event["type"] == "token":
+                        ttfb_ms = (time.perf_counter() - received) * 1000
+                        TTFB_SECONDS.observe(ttfb_ms / 1000)
+                        logger.info("[Stream] Time to first token: %.0f ms", ttfb_ms)
+                    fast_path = fast_path or event.get("fast_path", False)
+                    yield format_sse(event)
+                elapsed = time.perf_counter() - received
+                TURN_SECONDS.labels("chat_stream").observe(elapsed)
+                if not fast_path:
+                    fast_path_stats.record_llm_turn(elapsed)
+                yield format_sse({"type": "done", "thread_id": thread_id, "ttfb_ms": ttfb_ms})
+        except QueueFullError as e:  # Filled up between the admission check and the first chunk
+            yield format_sse({"type": "error", "status": 429, "detail": str(e)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ---------------------- Batch Endpoint -------------------------------- #
+@fastapi_app.post("/chat/batch")
+async def chat_batch_endpoint(request: BatchRequest):
+    """
+    Handles POST requests to /chat/batch. Answers many (patient_id, question) pairs without the
+    agent loop: records, embeddings and vector searches are fetched once for the whole batch, and
+    answers are streamed back as NDJSON lines in completion order, each carrying its input `index`.
+    Args:
+        request (BatchRequest): The pairs to answer.
+    Returns:
+        StreamingResponse: application/x-ndjson, one {index, patient_id, question, answer | error} per line.
+    Raises:
+        HTTPException: 413 if the batch is larger than BATCH_MAX_ITEMS, 429 if the chat queue is full.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    try:
+        chat_limiter.check_admission()  # A batch takes one chat slot; its LLM calls are bounded separately
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+    request_id = request_id_var.get()
+    items = [item.model_dump() for item in request.items]
+
+    async def result_stream():
+        request_id_var.set(request_id)
+        start = time.perf_counter()
+        try:
+            async with chat_limiter.slot():  # Released with the body, as in /chat/stream
+                async for result in answer_batch(items):
+                    yield json.dumps(result) + "\n"
+                TURN_SECONDS.labels("chat_batch").observe(time.perf_counter() - start)
+        except QueueFullError as e:
+            yield json.dumps({"error": str(e), "status": 429}) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # To run: uvicorn app.main_api:fastapi_app --reload
+# Multi-worker: gunicorn -c gunicorn.conf.py app.main_api:fastapi_app
@@ -0,0 +1,336 @@
+"""
+answer_packs.py
+---------------
+Store of precomputed answers to the questions discharge cohorts predictably ask, written by
+`agents/precompute_answer_packs.py` and checked by the fast-path router before the clinical agent.
+A pack is keyed by (collection, diagnosis, medication): diagnosis-level questions have an empty
+medication. A lookup only considers the packs of the patient's own diagnosis and medications and
+serves exact matches of the normalized question text. Matching paraphrases by embedding similarity
+is opt-in (ANSWER_PACK_SEMANTIC): embedding cosines sit in a narrow high band, so questions with
+opposite meanings ("Can I double my dose?" / "What if I miss a dose?") can score above any fixed
+threshold. The precompute job therefore scores NEGATIVE_QUESTION_PAIRS with the live model, and a
+semantic hit must beat the highest of those scores by ANSWER_PACK_MARGIN; without a calibration
+for the current model only exact matches are served.
+
+Each pack records the collection version it was generated from: a fingerprint of the
+collection's chunk IDs, which are content hashes, so it changes exactly when ingestion adds or
+removes chunks. `create_vectorstore.ingest` records the new version after every sync; packs of an
+older version are no longer served (and counted as stale) until the precompute job is re-run.
+"""
+
+import hashlib  # Collection fingerprint
+import json  # Citations column
+import os  # For environment variable access
+import re  # Question / medication normalization
+import sqlite3  # Indexed on-disk store shared by all workers
+import threading  # Guards the in-memory index
+import time  # Timestamps
+from typing import Callable, Iterable, List
+
+import numpy as np  # Vectorized cosine similarity
+
+from backend.logger import logger  # Custom logger
+
+# ---------------------- Answer Pack Configuration --------------------- #
+ANSWER_PACKS_PATH = os.getenv("ANSWER_PACKS_PATH", "cache/answer_packs.sqlite3")
+ANSWER_PACKS_ENABLED = os.getenv("ANSWER_PACKS_ENABLED", "true").lower() == "true"
+ANSWER_PACK_SEMANTIC = os.getenv("ANSWER_PACK_SEMANTIC", "false").lower() == "true"  # Paraphrase matching
+ANSWER_PACK_THRESHOLD = float(os.getenv("ANSWER_PACK_THRESHOLD", "0.9"))  # Floor of the semantic threshold
+ANSWER_PACK_MARGIN = float(os.getenv("ANSWER_PACK_MARGIN", "0.02"))  # Above the best-scoring negative pair
+
+# (patient question, pack question) pairs that must never match: same drug or topic, different
+# meaning. Formatted with each cohort's diagnosis and drugs when calibrating.
+NEGATIVE_QUESTION_PAIRS = [
+    ("Can I double my {medication} dose?", "What should I do if I miss a dose of {medication}?"),
+    ("I took too much {medication}, what should I do?", "What should I do if I miss a dose of {medication}?"),
+    ("Can I stop taking {medication}?", "Why am I taking {medication} for {diagnosis}?"),
+    ("Can I drink alcohol with {medication}?", "Can I take painkillers like ibuprofen with {medication}?"),
+    ("I think I am having side effects from {medication}", "What are the side effects of {medication}?"),
+    ("I have chest pain and can't breathe", "What warning signs of {diagnosis} mean I should call my doctor?"),
+    ("My legs are very swollen today", "What warning signs of {diagnosis} mean I should call my doctor?"),
+    ("Should I stop exercising with {diagnosis}?", "Can I exercise with {diagnosis}?"),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS packs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    diagnosis TEXT NOT NULL,
+    medication TEXT NOT NULL,
+    field TEXT NOT NULL,
+    question TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    citations TEXT NOT NULL,
+    collection_version TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_packs_question ON packs (collection, diagnosis, medication, question_key);
+CREATE TABLE IF NOT EXISTS calibrations (
+    collection TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    max_negative REAL NOT NULL,
+    pairs INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS collection_versions (
+    collection TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    packs_updated REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Open the store, creating the file and schema if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers in other workers are not blocked by writes
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ---------------------- Keys & Versions ------------------------------- #
+def question_key(text: str) -> str:
+    """Lowercase words only, so punctuation and spacing do not defeat an exact match."""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def diagnosis_key(diagnosis: str) -> str:
+    return question_key(diagnosis or "")
+
+
+def medication_name(medication: str) -> str:
+    """Drug name of a medication line ('Furosemide 20mg twice daily' -> 'furosemide')."""
+    words = []
+    for word in re.findall(r"[A-Za-z0-9-]+", medication or ""):
+        if any(ch.isdigit() for ch in word):
+            break
+        words.append(word.lower())
+    return " ".join(words[:3])
+
+
+def fingerprint(point_ids: Iterable) -> str:
+    """Collection version: hash of the sorted chunk IDs (content hashes)."""
+    digest = hashlib.sha256()
+    for point_id in sorted(str(pid) for pid in point_ids):
+        digest.update(point_id.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def record_collection_version(collection: str, version: str, path: str = ANSWER_PACKS_PATH):
+    """Store the current version of a collection (called after every ingestion sync)."""
+    conn = _connect(path)
+    try:
+        conn.execute(
+            "INSERT INTO collection_versions (collection, version) VALUES (?, ?) "
+            "ON CONFLICT(collection) DO UPDATE SET version = excluded.version",
+            (collection, version),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    logger.info("[AnswerPacks] %s is at version %s", collection, version)
+
+
+# ---------------------- Store ----------------------------------------- #
+class AnswerPackStore:
+    """
+    Precomputed answers for one collection, with hit/miss counters.
+    Attributes:
+        collection (str): Vector collection the answers were retrieved from.
+        threshold (float): Floor of the cosine similarity for a semantic hit.
+        semantic (bool): Match paraphrases by embedding similarity (needs a calibration).
+        model (str): Embedding model the calibration must have been measured with.
+    """
+
+    def __init__(self, collection: str, path: str = ANSWER_PACKS_PATH, threshold: float = ANSWER_PACK_THRESHOLD,
+                 semantic: bool = ANSWER_PACK_SEMANTIC, model: str | None = None):
+        self.collection = collection
+        self.threshold = threshold
+        self.semantic = semantic
+        self.model = model
+        self.semantic_threshold = None  # Calibrated threshold once loaded; None serves exact matches only
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._stamp = None  # (version, packs_updated) the index was loaded at
+        self._index = {}  # (diagnosis, medication) -> {'keys': {question_key: row}, 'matrix', 'rows'}
+
+    def _version_row(self) -> tuple:
+        row = self._conn.execute("SELECT version, packs_updated FROM collection_versions WHERE collection = ?",
+                                 (self.collection,)).fetchone()
+        return tuple(row) if row else (None, 0)
+
+    def _reload_if_stale(self):
+        """Reload the packs of the current collection version after re-ingestion or a precompute run."""
+        stamp = self._version_row()
+        if stamp == self._stamp:
+            return
+        rows = self._conn.execute(
+            "SELECT diagnosis, medication, field, question, question_key, embedding, answer, citations "
+            "FROM packs WHERE collection = ? AND collection_version = ?", (self.collection, stamp[0]),
+        ).fetchall()
+        grouped = {}
+        for diagnosis, medication, field, question, key, embedding, answer, citations in rows:
+            grouped.setdefault((diagnosis, medication), []).append({
+                "field": field, "question": question, "key": key, "answer": answer,
+                "citations": json.loads(citations), "embedding": np.frombuffer(embedding, dtype=np.float32),
+            })
+        self._index = {
+            pack: {"keys": {row["key"]: row for row in entries}, "rows": entries,
+                   "matrix": np.vstack([row["embedding"] for row in entries])}
+            for pack, entries in grouped.items()
+        }
+        self.semantic_threshold = self._calibrated_threshold() if self.semantic else None
+        self._stamp = stamp
+
+    def _calibrated_threshold(self) -> float | None:
+        """Semantic threshold from the negative-pair calibration of the current model, or None."""
+        row = self._conn.execute("SELECT model, max_negative FROM calibrations WHERE collection = ?",
+                                 (self.collection,)).fetchone()
+        if row is None or (self.model and row[0] != self.model):
+            logger.warning("[AnswerPacks] No negative-pair calibration for %s; serving exact matches only",
+                           self.model or "the embedding model")
+            return None
+        threshold = max(self.threshold, row[1] + ANSWER_PACK_MARGIN)
+        if threshold >= 1.0:
+            logger.warning("[AnswerPacks] Negative pairs score up to %.3f; serving exact matches only", row[1])
+            return None
+        return threshold
+
+    def lookup(self, patient: dict, question: str, embed: Callable[[str], list]) -> dict | None:
+        """
+        Find a precomputed answer for a patient's question.
+        Args:
+            patient (dict): Patient record (primary_diagnosis and medications select the packs).
+            question (str): The patient's message.
+            embed (Callable): Embeds the question; only called for a semantic lookup after no exact match.
+        Returns:
+            dict | None: field, question, answer and citations on a hit, None on a miss.
+        """
+        packs = [(diagnosis_key(patient.get("primary_diagnosis")), "")]
+        packs += [(packs[0][0], medication_name(m)) for m in patient.get("medications") or []]
+        with self._lock:
+            self._reload_if_stale()
+            candidates = [self._index[pack] for pack in packs if pack in self._index]
+            if not candidates:
+                return None  # Nothing precomputed for this cohort: not counted
+            key = question_key(question)
+            hit = next((c["keys"][key] for c in candidates if key in c["keys"]), None)
+            threshold = self.semantic_threshold
+        if hit is None and threshold is not None:
+            vector = np.asarray(embed(question), dtype=np.float32)
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+            best_score = -1.0
+            for candidate in candidates:
+                scores = candidate["matrix"] @ vector
+                index = int(np.argmax(scores))
+                if scores[index] > best_score:
+                    best_score, hit = float(scores[index]), candidate["rows"][index]
+            if best_score < threshold:
+                hit = None
+        with self._lock:
+            self.hits += hit is not None
+            self.misses += hit is None
+        return None if hit is None else {k: hit[k] for k in ("field", "question", "answer", "citations")}
+
+    def write(self, packs: List[dict], version: str):
+        """
+        Insert or replace precomputed answers and mark the collection's packs as updated.
+        Args:
+            packs (List[dict]): diagnosis, medication (keys), field, question, embedding, answer and
+                citations per answer.
+            version (str): Collection version the answers were retrieved from.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO packs (collection, diagnosis, medication, field, question, question_key, "
+                "embedding, answer, citations, collection_version, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(self.collection, p["diagnosis"], p["medication"], p["field"], p["question"],
+                  question_key(p["question"]), self._normalize(p["embedding"]).tobytes(), p["answer"],
+                  json.dumps(p["citations"]), version, now) for p in packs],
+            )
+            self._conn.execute(
+                "INSERT INTO collection_versions (collection, version, packs_updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(collection) DO UPDATE SET packs_updated = excluded.packs_updated",
+                (self.collection, version, now),
+            )
+            self._conn.commit()
+
+    def record_calibration(self, model: str, max_negative: float, pairs: int):
+        """
+        Store the highest cosine similarity measured between negative question pairs.
+        Args:
+            model (str): Embedding model the pairs were scored with.
+            max_negative (float): Highest negative-pair score; semantic hits must beat it by ANSWER_PACK_MARGIN.
+            pairs (int): Number of pairs scored.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO calibrations (collection, model, max_negative, pairs, created_at) "
+                "VALUES (?, ?, ?, ?, ?)", (self.collection, model, max_negative, pairs, now),
+            )
+            self._conn.execute("UPDATE collection_versions SET packs_updated = ? WHERE collection = ?",
+                               (now, self.collection))  # Reload (and re-read the calibration) everywhere
+            self._conn.commit()
+
+    def prune_stale(self) -> int:
+        """Delete packs generated from an older collection version; returns the number removed."""
+        with self._lock:
+            version = self._version_row()[0]
+            cursor = self._conn.execute("DELETE FROM packs WHERE collection = ? AND collection_version IS NOT ?",
+                                        (self.collection, version))
+            self._conn.commit()
+            return cursor.rowcount
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters for this process and pack counts.
+        Returns:
+            dict: hits, misses, hit_ratio, packs (current version), stale_packs and semantic_threshold.
+        """
+        with self._lock:
+            self._reload_if_stale()
+            fresh = sum(len(pack["rows"]) for pack in self._index.values())
+            total = self._conn.execute("SELECT COUNT(*) FROM packs WHERE collection = ?",
+                                       (self.collection,)).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "packs": fresh,
+            "stale_packs": total - fresh,
+            "semantic_threshold": self.semantic_threshold,
+        }
+
+
+_store_lock = threading.Lock()
+_store = None
+
+
+def get_answer_pack_store() -> AnswerPackStore:
+    """Return the answer pack store of the retrieval collection, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from agents.clinical_agent.tools.rag_tool import retrieval_collection
+                from backend.metrics import stats_collector
+                from backend.resources import EMBEDDING_MODEL_NAME
+                _store = AnswerPackStore(retrieval_collection, model=EMBEDDING_MODEL_NAME)
+                stats_collector.register("answer_packs", _store.stats)
+    return _store
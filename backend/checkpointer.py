@@ -0,0 +1,242 @@
+"""
+checkpointer.py
+---------------
+Pluggable, compacting LangGraph checkpointers for per-session conversation state.
+Backends: in-memory (tests), SQLite (local development) and MongoDB (production). Every backend
+keeps only the last N checkpoints per thread and evicts threads that have been idle longer than
+a TTL, so storage and memory stay flat no matter how many sessions the server handles.
+"""
+
+import os  # For environment variable access
+import sqlite3  # SQLite backend connection
+import threading  # Guards in-memory activity bookkeeping
+import time  # Activity timestamps
+from collections import defaultdict  # In-memory activity table
+
+from langgraph.checkpoint.memory import InMemorySaver  # In-memory backend
+from backend.concurrency import run_blocking  # Async wrappers for the sync-only savers
+from backend.logger import logger  # Custom logger
+
+# ---------------------- Checkpointer Configuration -------------------- #
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "sqlite")  # memory | sqlite | mongo
+SQLITE_PATH = os.getenv("CHECKPOINTER_SQLITE_PATH", "cache/checkpoints.sqlite3")
+MONGO_DB_NAME = os.getenv("CHECKPOINTER_MONGO_DB", "checkpointing_db")
+KEEP_LAST_CHECKPOINTS = int(os.getenv("CHECKPOINT_KEEP_LAST", "10"))  # Per thread and namespace
+THREAD_IDLE_TTL_SECONDS = int(os.getenv("THREAD_IDLE_TTL_SECONDS", str(6 * 3600)))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("THREAD_SWEEP_INTERVAL_SECONDS", "300"))
+
+
+class CompactionMixin:
+    """
+    Adds checkpoint compaction and idle-thread eviction to a LangGraph checkpoint saver.
+    Subclasses implement `_prune`, `_touch`, `_idle_threads` and `_forget` for their storage.
+    """
+
+    def _init_compaction(self, keep_last: int, idle_ttl: int, sweep_interval: int):
+        self.keep_last = max(1, keep_last)
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        self._prune(thread_id, config["configurable"]["checkpoint_ns"])
+        self._touch(thread_id)
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            self.evict_idle_threads()
+        return saved
+
+    def evict_idle_threads(self) -> int:
+        """
+        Delete every thread whose last checkpoint is older than the idle TTL.
+        Returns:
+            int: Number of threads evicted.
+        """
+        self._last_sweep = time.time()
+        idle = self._idle_threads(self._last_sweep - self.idle_ttl)
+        for thread_id in idle:
+            self.delete_thread(thread_id)
+            self._forget(thread_id)
+        if idle:
+            logger.info("[Checkpointer] Evicted %s idle threads", len(idle))
+        return len(idle)
+
+
+class OffloadedAsyncMixin:
+    """Async API for sync-only savers: each call runs on the bounded blocking executor."""
+
+    async def aget_tuple(self, config):
+        return await run_blocking(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await run_blocking(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await run_blocking(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await run_blocking(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await run_blocking(self.delete_thread, thread_id)
+
+
+# ---------------------- In-Memory Backend ----------------------------- #
+class CompactingInMemorySaver(CompactionMixin, InMemorySaver):
+    """InMemorySaver that keeps the last N checkpoints per thread and evicts idle threads."""
+
+    def __init__(self, keep_last: int = KEEP_LAST_CHECKPOINTS, idle_ttl: int = THREAD_IDLE_TTL_SECONDS,
+                 sweep_interval: int = SWEEP_INTERVAL_SECONDS, **kwargs):
+        super().__init__(**kwargs)
+        self._init_compaction(keep_last, idle_ttl, sweep_interval)
+        self._activity = defaultdict(float)
+        self._activity_lock = threading.Lock()
+
+    def _prune(self, thread_id, checkpoint_ns):
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        stale = sorted(checkpoints)[:-self.keep_last]  # Checkpoint ids are time-ordered
+        for checkpoint_id in stale:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        if stale:
+            # Channel values live in blobs keyed by version; drop versions no kept checkpoint uses
+            live = set()
+            for saved, _, _ in checkpoints.values():
+                live.update(self.serde.loads_typed(saved)["channel_versions"].items())
+            for key in [k for k in self.blobs if k[0] == thread_id and k[1] == checkpoint_ns]:
+                if (key[2], key[3]) not in live:
+                    del self.blobs[key]
+
+    def _touch(self, thread_id):
+        with self._activity_lock:
+            self._activity[thread_id] = time.time()
+
+    def _idle_threads(self, cutoff):
+        with self._activity_lock:
+            return [t for t, seen in self._activity.items() if seen < cutoff]
+
+    def _forget(self, thread_id):
+        with self._activity_lock:
+            self._activity.pop(thread_id, None)
+
+
+# ---------------------- SQLite Backend -------------------------------- #
+def _sqlite_saver_class():
+    from langgraph.checkpoint.sqlite import SqliteSaver  # Optional dependency
+
+    class CompactingSqliteSaver(OffloadedAsyncMixin, CompactionMixin, SqliteSaver):
+        """SqliteSaver with compaction, idle eviction and an async API for the FastAPI path."""
+
+        def __init__(self, conn, keep_last=KEEP_LAST_CHECKPOINTS, idle_ttl=THREAD_IDLE_TTL_SECONDS,
+                     sweep_interval=SWEEP_INTERVAL_SECONDS, **kwargs):
+            super().__init__(conn, **kwargs)
+            self._init_compaction(keep_last, idle_ttl, sweep_interval)
+            with self.cursor() as cur:
+                cur.execute(
+                    "CREATE TABLE IF NOT EXISTS thread_activity "
+                    "(thread_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+                )
+
+        def _prune(self, thread_id, checkpoint_ns):
+            keep = (
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT ?"
+            )
+            args = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+            with self.cursor() as cur:
+                for table in ("checkpoints", "writes"):
+                    cur.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                        f"AND checkpoint_id NOT IN ({keep})",
+                        args,
+                    )
+
+        def _touch(self, thread_id):
+            with self.cursor() as cur:
+                cur.execute(
+                    "INSERT OR REPLACE INTO thread_activity (thread_id, last_seen) VALUES (?, ?)",
+                    (thread_id, time.time()),
+                )
+
+        def _idle_threads(self, cutoff):
+            with self.cursor(transaction=False) as cur:
+                cur.execute("SELECT thread_id FROM thread_activity WHERE last_seen < ?", (cutoff,))
+                return [row[0] for row in cur.fetchall()]
+
+        def _forget(self, thread_id):
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+
+    return CompactingSqliteSaver
+
+
+# ---------------------- MongoDB Backend ------------------------------- #
+def _mongo_saver_class():
+    from langgraph.checkpoint.mongodb import MongoDBSaver  # Optional dependency
+
+    class CompactingMongoDBSaver(OffloadedAsyncMixin, CompactionMixin, MongoDBSaver):
+        """MongoDBSaver with compaction, idle eviction and an async API for the FastAPI path."""
+
+        def __init__(self, client, keep_last=KEEP_LAST_CHECKPOINTS, idle_ttl=THREAD_IDLE_TTL_SECONDS,
+                     sweep_interval=SWEEP_INTERVAL_SECONDS, **kwargs):
+            super().__init__(client, **kwargs)
+            self._init_compaction(keep_last, idle_ttl, sweep_interval)
+            self.activity_collection = self.checkpoint_collection.database["thread_activity"]
+            self.activity_collection.create_index("thread_id", unique=True)
+            self.activity_collection.create_index("last_seen")
+
+        def _prune(self, thread_id, checkpoint_ns):
+            scope = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+            stale = [
+                doc["checkpoint_id"] for doc in self.checkpoint_collection.find(scope, {"checkpoint_id": 1})
+                .sort("checkpoint_id", -1).skip(self.keep_last)
+            ]
+            if stale:
+                stale_scope = {**scope, "checkpoint_id": {"$in": stale}}
+                self.checkpoint_collection.delete_many(stale_scope)
+                self.writes_collection.delete_many(stale_scope)
+
+        def _touch(self, thread_id):
+            self.activity_collection.update_one(
+                {"thread_id": thread_id}, {"$set": {"last_seen": time.time()}}, upsert=True
+            )
+
+        def _idle_threads(self, cutoff):
+            return [doc["thread_id"] for doc in self.activity_collection.find({"last_seen": {"$lt": cutoff}})]
+
+        def _forget(self, thread_id):
+            self.activity_collection.delete_one({"thread_id": thread_id})
+
+    return CompactingMongoDBSaver
+
+
+# ---------------------- Factory --------------------------------------- #
+def get_checkpointer(backend: str = CHECKPOINTER_BACKEND, **kwargs):
+    """
+    Build the configured compacting checkpointer.
+    Args:
+        backend (str): 'memory', 'sqlite' or 'mongo'.
+        **kwargs: Overrides for keep_last / idle_ttl / sweep_interval.
+    Returns:
+        BaseCheckpointSaver: A LangGraph checkpoint saver.
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    logger.info("[Checkpointer] Using '%s' backend", backend)
+    if backend == "memory":
+        return CompactingInMemorySaver(**kwargs)
+    if backend == "sqlite":
+        directory = os.path.dirname(SQLITE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Server workers share the file: WAL lets readers run during a write, and writers wait their turn
+        conn = sqlite3.connect(SQLITE_PATH, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return _sqlite_saver_class()(conn, **kwargs)
+    if backend == "mongo":
+        from backend.mongo_database import get_client  # Reuse the application's Mongo connection pool
+        return _mongo_saver_class()(get_client(), db_name=MONGO_DB_NAME, **kwargs)
+    raise ValueError(f"Unknown checkpointer backend: {backend}")
@@ -0,0 +1,114 @@
+"""
+concurrency.py
+--------------
+Bounded execution primitives for the async API.
+Blocking work (pymongo, Qdrant, DuckDuckGo and any other synchronous tool) runs on a fixed-size
+thread pool instead of the event loop, and a per-process limiter caps how many chats run at once
+and how many may wait for a slot before new requests are rejected.
+"""
+
+import asyncio  # Event loop integration
+import contextvars  # Carry request/thread log context into pool threads
+import os  # For environment variable access
+from concurrent.futures import ThreadPoolExecutor  # Bounded pool for blocking calls
+from contextlib import asynccontextmanager  # For the limiter slot context manager
+from functools import partial  # For binding call arguments
+
+# ---------------------- Concurrency Configuration --------------------- #
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "16"))  # Threads for blocking tool calls
+MAX_CONCURRENT_CHATS = int(os.getenv("MAX_CONCURRENT_CHATS", "32"))  # Chats running at once
+MAX_QUEUED_CHATS = int(os.getenv("MAX_QUEUED_CHATS", "64"))  # Chats allowed to wait for a slot
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the process-wide bounded executor for blocking calls, creating it on first use.
+    Returns:
+        ThreadPoolExecutor: Shared pool with BLOCKING_POOL_SIZE threads.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+    return _executor
+
+
+def install_default_executor(loop: asyncio.AbstractEventLoop | None = None):
+    """
+    Make the bounded pool the loop's default executor.
+    LangChain/LangGraph run synchronous tools via `run_in_executor(None, ...)` on the async path,
+    so this routes every blocking tool call through the bounded pool.
+    Args:
+        loop (asyncio.AbstractEventLoop, optional): Loop to configure (defaults to the running loop).
+    """
+    (loop or asyncio.get_running_loop()).set_default_executor(get_executor())
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking callable on the bounded executor without blocking the event loop.
+    Args:
+        func (Callable): The blocking function.
+        *args, **kwargs: Arguments passed to the function.
+    Returns:
+        Any: The function's return value.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()  # run_in_executor does not propagate contextvars by itself
+    return await loop.run_in_executor(get_executor(), partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executor(wait: bool = True):
+    """Shut down the bounded executor (called on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
+
+
+# ---------------------- Admission Control ----------------------------- #
+class QueueFullError(Exception):
+    """Raised when both the running slots and the wait queue are full."""
+
+
+class ConcurrencyLimiter:
+    """
+    Per-process admission control for chat requests.
+    Attributes:
+        max_concurrent (int): Requests allowed to run at the same time.
+        max_queued (int): Requests allowed to wait for a free slot.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_CHATS, max_queued: int = MAX_QUEUED_CHATS):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0  # Running + waiting requests
+        self.rejected = 0
+
+    def check_admission(self):
+        """
+        Reject early, without taking a slot (for streaming endpoints, which take the slot inside
+        the response body so it is released with the body).
+        Raises:
+            QueueFullError: If max_concurrent + max_queued requests are already admitted.
+        """
+        if self.in_flight >= self.max_concurrent + self.max_queued:
+            self.rejected += 1
+            raise QueueFullError("Too many concurrent chat requests; please retry shortly.")
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Acquire a running slot, waiting in the bounded queue if necessary.
+        Raises:
+            QueueFullError: If max_concurrent + max_queued requests are already admitted.
+        """
+        self.check_admission()
+        self.in_flight += 1
+        try:
+            async with self._semaphore:
+                yield
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,447 @@
+"""
+local_index.py
+--------------
+Server-less vector backend (VECTOR_BACKEND=local) for edge clinics and CI, where the Qdrant
+container cannot run. Each collection is a directory under LOCAL_INDEX_DIR:
+- vectors.npy: unit-normalized embeddings as float16, or int8 with a per-row scale (scales.npy)
+- payloads.jsonl + offsets.npy: one {"id", "payload"} line per row and the byte offset of each line
+- centroids.npy + lists.npy: optional IVF partition (rows sorted by list, list boundaries)
+- meta.json: dtype, dimension, row count and IVF list count
+Everything is opened memory-mapped, so all worker processes on a host read the same page-cache
+pages (zero-copy) instead of each loading a copy. Search is vectorized brute force over the
+matrix in blocks, or over the `nprobe` closest IVF lists for large collections.
+`LocalIndexClient` implements the subset of QdrantClient that `create_vectorstore.ingest` uses,
+so the same incremental pipeline builds the index. Writes are buffered and `persist()` replaces
+the collection directory in one rename; readers pick up the new files on their next search, as
+a new immutable snapshot swapped in by one reference.
+"""
+
+import json  # meta.json / payload sidecar
+import mmap  # Shared read-only payload pages
+import os  # Paths / atomic renames
+import shutil  # Removing replaced index directories
+import threading  # Guards index reloads and the writer state
+from types import SimpleNamespace  # Scroll records
+from typing import Any, List
+
+import numpy as np  # Vector matrix and brute-force search
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from backend.logger import logger  # Custom logger
+from backend.metrics import stage_timer  # Search latency histogram
+
+# ---------------------- Local Index Configuration --------------------- #
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "vector_index")
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float16")  # 'float16' (2 bytes/dim) or 'int8' (1 byte/dim)
+LOCAL_INDEX_IVF_MIN_POINTS = int(os.getenv("LOCAL_INDEX_IVF_MIN_POINTS", "50000"))  # Brute force below this
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))  # IVF lists searched per query
+BLOCK_ROWS = 4096  # Rows converted to float32 at a time during brute force (~12 MB at 768-d)
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 50000  # Rows used to train the IVF centroids
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Unit-normalize float vectors and store them as float16, or int8 with a per-row scale."""
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    raise ValueError(f"Unknown local index dtype: {dtype!r} (expected float16 or int8)")
+
+
+def _payload_value(payload: dict, key: str):
+    """Value at a dotted payload path ('metadata.chapter'), or None."""
+    for part in key.split("."):
+        if not isinstance(payload, dict):
+            return None
+        payload = payload.get(part)
+    return payload
+
+
+def filter_conditions(query_filter) -> dict:
+    """
+    Equality conditions of a filter as {payload path: value}.
+    Accepts a plain dict or a Qdrant `models.Filter` whose `must` clauses match single values
+    (such as `hybrid_retriever.chapter_filter`).
+    """
+    if not query_filter:
+        return {}
+    if isinstance(query_filter, dict):
+        return query_filter
+    conditions = {}
+    for condition in query_filter.must or []:
+        value = getattr(getattr(condition, "match", None), "value", None)
+        if value is None or query_filter.should or query_filter.must_not:
+            raise ValueError("The local index supports only 'must' match-value filters")
+        conditions[condition.key] = value
+    return conditions
+
+
+# ---------------------- Reader ---------------------------------------- #
+class IndexSnapshot:
+    """
+    One version of a collection directory, memory-mapped. Never modified after loading: a rebuild
+    yields a new snapshot, so a search that holds one reads vectors, offsets and payloads of the
+    same version.
+    Attributes:
+        meta (dict): dtype, dimension, count and lists of this version.
+        stamp (int): mtime of its meta.json, to detect rebuilds.
+    """
+
+    def __init__(self, path: str):
+        meta_path = os.path.join(path, "meta.json")
+        self.stamp = os.stat(meta_path).st_mtime_ns
+        with open(meta_path, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.offsets = self._payloads = None
+        if self.meta["count"]:
+            self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+            self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+            with open(os.path.join(path, "payloads.jsonl"), "rb") as f:
+                self._payloads = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.vectors = np.zeros((0, self.meta["dimension"]), dtype=np.float16)
+        self.scales = np.load(os.path.join(path, "scales.npy"), mmap_mode="r") \
+            if self.meta["dtype"] == "int8" and self.meta["count"] else None
+        self.centroids = self.lists = None
+        if self.meta.get("lists"):
+            self.centroids = np.load(os.path.join(path, "centroids.npy"))
+            self.lists = np.load(os.path.join(path, "lists.npy"))
+        self._columns = {}  # Payload path -> values per row, for filters (built once per column)
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def record(self, row: int) -> dict:
+        """The stored {'id', 'payload'} of a row."""
+        return json.loads(self._payloads[int(self.offsets[row]):int(self.offsets[row + 1])])
+
+    def _mask(self, conditions: dict) -> np.ndarray | None:
+        """Rows matching every condition (payload columns are read once and cached)."""
+        if not conditions:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in conditions.items():
+            if key not in self._columns:
+                self._columns[key] = np.array([_payload_value(self.record(row)["payload"], key)
+                                               for row in range(len(self))], dtype=object)
+            mask &= self._columns[key] == value
+        return mask
+
+    def _score_rows(self, queries: np.ndarray, start: int, stop: int) -> np.ndarray:
+        block = np.asarray(self.vectors[start:stop], dtype=np.float32)
+        scores = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales[start:stop]
+        return scores
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> List[tuple[int, int]]:
+        """Row ranges to score: everything, or the nprobe closest IVF lists."""
+        if self.lists is None:
+            return [(start, min(start + BLOCK_ROWS, len(self))) for start in range(0, len(self), BLOCK_ROWS)]
+        closest = np.argsort(-(self.centroids @ query))[:nprobe]
+        return [(int(self.lists[i]), int(self.lists[i + 1])) for i in closest if self.lists[i + 1] > self.lists[i]]
+
+    def search_batch(self, queries: np.ndarray, k: int, query_filter=None,
+                     nprobe: int = LOCAL_INDEX_NPROBE) -> List[List[tuple[float, dict]]]:
+        """Top-k (score, {'id', 'payload'}) per normalized query, best first (see LocalIndex.search_batch)."""
+        if not len(self):
+            return [[] for _ in queries]
+        mask = self._mask(filter_conditions(query_filter))
+        results = []
+        with stage_timer("local_index", "search"):
+            if self.lists is None:  # Whole matrix: score every query against each block at once
+                scores = np.concatenate([self._score_rows(queries, start, stop)
+                                         for start, stop in self._candidates(queries[0], nprobe)], axis=1)
+                rows = [np.arange(len(self))] * len(queries)
+            else:
+                ranges = [self._candidates(query, nprobe) for query in queries]
+                rows = [np.concatenate([np.arange(start, stop) for start, stop in r] or [np.arange(0)])
+                        for r in ranges]
+                scores = [np.concatenate([self._score_rows(query[None], start, stop)[0] for start, stop in r]
+                                         or [np.zeros(0, dtype=np.float32)])
+                          for query, r in zip(queries, ranges)]
+            for query_scores, query_rows in zip(scores, rows):
+                if mask is not None:
+                    keep = mask[query_rows]
+                    query_scores, query_rows = query_scores[keep], query_rows[keep]
+                top = min(k, len(query_rows))
+                best = np.argpartition(-query_scores, top - 1)[:top] if top else np.arange(0)
+                best = best[np.argsort(-query_scores[best])]
+                results.append([(float(query_scores[i]), self.record(query_rows[i])) for i in best])
+        return results
+
+
+class LocalIndex:
+    """
+    Read-only, memory-mapped view of one collection directory with brute-force / IVF search.
+    A rebuild is loaded into a new `IndexSnapshot` and swapped in with one assignment; each search
+    reads a single snapshot, so it never mixes files of two versions.
+    Attributes:
+        path (str): Collection directory.
+        nprobe (int): IVF lists searched per query (when the index has lists).
+    """
+
+    def __init__(self, path: str, nprobe: int = LOCAL_INDEX_NPROBE):
+        self.path = path
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._snapshot = IndexSnapshot(path)
+
+    def refresh(self) -> IndexSnapshot:
+        """
+        Re-open the files if the collection was rebuilt since they were mapped.
+        Returns:
+            IndexSnapshot: The current version (readers keep older ones alive while they use them).
+        """
+        snapshot = self._snapshot
+        try:
+            stamp = os.stat(os.path.join(self.path, "meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return snapshot  # Mid-swap: keep serving the mapped version
+        if stamp != snapshot.stamp:
+            with self._lock:
+                if stamp != self._snapshot.stamp:
+                    try:
+                        self._snapshot = IndexSnapshot(self.path)
+                    except FileNotFoundError:
+                        return self._snapshot  # Swapped again while loading; the next search retries
+                    logger.info("[LocalIndex] Reloaded %s (%s vectors)", self.path, len(self._snapshot))
+                snapshot = self._snapshot
+        return snapshot
+
+    def snapshot(self) -> IndexSnapshot:
+        """The currently mapped version, for reads that must see one version across several calls."""
+        return self._snapshot
+
+    @property
+    def meta(self) -> dict:
+        return self._snapshot.meta
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def record(self, row: int) -> dict:
+        """The stored {'id', 'payload'} of a row (of the current version; use `snapshot()` across calls)."""
+        return self._snapshot.record(row)
+
+    def search_batch(self, queries, k: int, query_filter=None) -> List[List[tuple[float, dict]]]:
+        """
+        Top-k rows by cosine similarity for each query.
+        Args:
+            queries: (m, d) query embeddings (normalized here).
+            k (int): Results per query.
+            query_filter (dict | models.Filter, optional): Payload equality conditions.
+        Returns:
+            List[List[tuple[float, dict]]]: Per query, (score, {'id', 'payload'}) best first.
+        """
+        snapshot = self.refresh()
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        return snapshot.search_batch(queries, k, query_filter, self.nprobe)
+
+    def search(self, query, k: int, query_filter=None) -> List[tuple[float, dict]]:
+        """Top-k (score, {'id', 'payload'}) for one query embedding."""
+        return self.search_batch([query], k, query_filter)[0]
+
+
+# ---------------------- Writer (Qdrant-compatible subset) ------------- #
+class LocalIndexClient:
+    """
+    Stands in for QdrantClient in `create_vectorstore.ingest` and hands out readers.
+    Upserts and deletes are buffered per collection until `persist(collection_name)`.
+    Attributes:
+        root (str): Directory holding one subdirectory per collection.
+        dtype (str): 'float16' or 'int8' storage for new collections.
+    """
+
+    def __init__(self, root: str = LOCAL_INDEX_DIR, dtype: str = LOCAL_INDEX_DTYPE,
+                 ivf_min_points: int = LOCAL_INDEX_IVF_MIN_POINTS):
+        self.root = root
+        self.dtype = dtype
+        self.ivf_min_points = ivf_min_points
+        self._lock = threading.Lock()
+        self._pending = {}  # collection -> {'dimension', 'points': {id: (row, scale, payload)}}
+        self._readers = {}
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.root, collection_name)
+
+    # Reading
+    def get_index(self, collection_name: str) -> LocalIndex:
+        """Return the shared reader for a collection, mapping its files on first use."""
+        if collection_name not in self._readers:
+            with self._lock:
+                if collection_name not in self._readers:
+                    if not os.path.exists(os.path.join(self._path(collection_name), "meta.json")):
+                        raise FileNotFoundError(f"No local index at {self._path(collection_name)}; build it with "
+                                                "create_vectorstore.py --backend local")
+                    self._readers[collection_name] = LocalIndex(self._path(collection_name))
+        return self._readers[collection_name]
+
+    def get_collections(self) -> list:
+        return sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._pending or os.path.exists(
+            os.path.join(self._path(collection_name), "meta.json"))
+
+    # Writing
+    def create_collection(self, collection_name: str, vectors_config, sparse_vectors_config=None, **storage):
+        """Start an empty collection (Qdrant storage options such as HNSW or quantization do not apply)."""
+        if sparse_vectors_config is not None or isinstance(vectors_config, dict):
+            raise ValueError("The local index stores one dense vector per point; hybrid collections need Qdrant")
+        self._pending[collection_name] = {"dimension": vectors_config.size, "points": {}}
+
+    def create_payload_index(self, *args, **kwargs):
+        """No-op: filters scan a cached payload column."""
+
+    def delete_collection(self, collection_name: str):
+        self._pending.pop(collection_name, None)
+        shutil.rmtree(self._path(collection_name), ignore_errors=True)
+
+    def _state(self, collection_name: str) -> dict:
+        """Buffered contents of a collection, starting from the stored rows (kept quantized)."""
+        if collection_name not in self._pending:
+            index = IndexSnapshot(self._path(collection_name))
+            points = {}
+            for row in range(len(index)):
+                record = index.record(row)
+                scale = float(index.scales[row]) if index.scales is not None else None
+                points[record["id"]] = (np.array(index.vectors[row]), scale, record["payload"])
+            self._pending[collection_name] = {"dimension": index.meta["dimension"], "points": points,
+                                              "dtype": index.meta["dtype"]}
+        return self._pending[collection_name]
+
+    def scroll(self, collection_name: str, limit: int = 10, offset=None, with_payload: bool = True,
+               with_vectors: bool = False):
+        """Page through point IDs (and payloads) like QdrantClient.scroll."""
+        ids = list(self._state(collection_name)["points"].items())
+        start = offset or 0
+        page = [SimpleNamespace(id=point_id, payload=point[2] if with_payload else None)
+                for point_id, point in ids[start:start + limit]]
+        return page, (start + limit if start + limit < len(ids) else None)
+
+    def upsert(self, collection_name: str, points, wait: bool = True):
+        state = self._state(collection_name)
+        rows, scales = quantize([point.vector for point in points], state.get("dtype", self.dtype))
+        for i, point in enumerate(points):
+            state["points"][str(point.id)] = (rows[i], None if scales is None else float(scales[i]), point.payload)
+
+    def delete(self, collection_name: str, points_selector, wait: bool = True):
+        points = self._state(collection_name)["points"]
+        for point_id in points_selector.points:
+            points.pop(str(point_id), None)
+
+    def persist(self, collection_name: str):
+        """
+        Write the buffered collection and swap it in with a directory rename. Large collections
+        get an IVF partition (rows grouped by their closest centroid).
+        """
+        state = self._pending.pop(collection_name, None)
+        if state is None:
+            return
+        dtype = state.get("dtype", self.dtype)
+        ids = list(state["points"])
+        points = [state["points"][point_id] for point_id in ids]
+        vectors = np.stack([row for row, _, _ in points]) if points else np.zeros((0, state["dimension"]))
+        scales = np.array([scale for _, scale, _ in points], dtype=np.float32) if dtype == "int8" else None
+        lists = centroids = None
+        if len(ids) >= self.ivf_min_points:
+            centroids, assignment = self._train_ivf(vectors, scales)
+            order = np.argsort(assignment, kind="stable")
+            vectors, ids, points = vectors[order], [ids[i] for i in order], [points[i] for i in order]
+            scales = scales[order] if scales is not None else None
+            lists = np.searchsorted(assignment[order], np.arange(len(centroids) + 1)).astype(np.int64)
+
+        target = self._path(collection_name)
+        staging, retired = f"{target}.tmp-{os.getpid()}", f"{target}.old-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        np.save(os.path.join(staging, "vectors.npy"), vectors)
+        if scales is not None:
+            np.save(os.path.join(staging, "scales.npy"), scales)
+        offsets = [0]
+        with open(os.path.join(staging, "payloads.jsonl"), "wb") as f:
+            for point_id, (_, _, payload) in zip(ids, points):
+                line = (json.dumps({"id": point_id, "payload": payload}, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+        np.save(os.path.join(staging, "offsets.npy"), np.array(offsets, dtype=np.int64))
+        if lists is not None:
+            np.save(os.path.join(staging, "centroids.npy"), centroids.astype(np.float32))
+            np.save(os.path.join(staging, "lists.npy"), lists)
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dtype": dtype, "dimension": state["dimension"], "count": len(ids),
+                       "lists": 0 if lists is None else len(centroids)}, f)
+        if os.path.exists(target):
+            os.replace(target, retired)
+        os.replace(staging, target)
+        shutil.rmtree(retired, ignore_errors=True)  # Readers keep their mappings of the old files
+        logger.info("[LocalIndex] Wrote %s: %s vectors (%s, %s IVF lists)", target, len(ids), dtype,
+                    0 if lists is None else len(centroids))
+
+    @staticmethod
+    def _train_ivf(vectors: np.ndarray, scales: np.ndarray | None):
+        """k-means centroids (about 4*sqrt(n)) on a sample, and each row's closest centroid."""
+        data = vectors.astype(np.float32) * (scales[:, None] if scales is not None else 1)
+        rng = np.random.default_rng(0)
+        n_lists = max(1, int(4 * np.sqrt(len(data))))
+        sample = data[rng.choice(len(data), size=min(KMEANS_SAMPLE, len(data)), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for i in range(n_lists):
+                members = sample[assignment == i]
+                if len(members):
+                    centroids[i] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        assignment = np.concatenate([np.argmax(data[start:start + BLOCK_ROWS] @ centroids.T, axis=1)
+                                     for start in range(0, len(data), BLOCK_ROWS)])
+        return centroids, assignment
+
+
+# ---------------------- LangChain Vector Store ------------------------ #
+class LocalVectorStore(VectorStore):
+    """LangChain vector store over a `LocalIndex` (read-only; build it with create_vectorstore.py --backend local)."""
+
+    def __init__(self, index: LocalIndex, embedding):
+        self.index = index
+        self.embedding = embedding
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter=None, **kwargs: Any) -> List[tuple]:
+        """Qdrant-only keyword arguments (such as search_params) are ignored."""
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, filter)
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, filter=None) -> List[tuple]:
+        return [(Document(page_content=record["payload"].get("page_content", ""),
+                          metadata=record["payload"].get("metadata") or {}), score)
+                for score, record in self.index.search(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter=None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter=None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score  # Cosine similarity
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("The local index is built by create_vectorstore.py --backend local")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("The local index is built by create_vectorstore.py --backend local")
@@ -1,31 +1,324 @@
 """
 logger.py
 ---------
-Configures a logger for the Post-Discharge Medical AI Assistant system.
-Logs are saved to a timestamped file in the 'logs' directory for debugging and audit purposes.
+Configures the logger for the Post-Discharge Medical AI Assistant system.
+Request threads only enqueue records (QueueHandler); a background QueueListener formats them as
+JSON lines, redacts PHI and writes them to `logs/assistant.log`, which rotates by size and by time
+and gzips rotated files. Records carry the request and conversation thread IDs bound with
+`log_context`. Log with lazy %-style arguments (`logger.info("Query: %s", phi(query))`) so disabled
+levels cost nothing and interpolation happens on the listener thread; wrap names and free text
+from patients in `phi()` so they are masked as a whole.
 """
 
-# ---------------------- Log Directory Setup --------------------------- #
-# Create logs directory if it doesn't exist
+import atexit  # Flush the queue on interpreter exit
+import contextvars  # Request / thread IDs across threads and tasks
+import glob  # Rotated files to prune
+import gzip  # Compress rotated files
+import json  # JSON lines
+import logging  # Python standard logging library
+import logging.handlers  # Queue and rotating handlers
 import os  # For directory/file operations
-os.makedirs("logs", exist_ok=True)
+import queue  # Hand-off between request threads and the writer
+import re  # PHI patterns
+import shutil  # Stream copy into gzip
+import time  # Rotation timestamps
+from contextlib import contextmanager  # For log_context
+from datetime import datetime, timezone  # For timestamps
 
-# ---------------------- Logger Configuration -------------------------- #
-# Create a logger instance for the application
-import logging  # Python standard logging library
-from datetime import datetime  # For timestamping log files
+# ---------------------- Logging Configuration ------------------------- #
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FILE = os.getenv("LOG_FILE", os.path.join(LOG_DIR, "assistant.log"))  # '{pid}' gives each worker its own file
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # 'json' or 'text'
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))  # Rotate when the file exceeds this
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")  # ... or at this interval (TimedRotatingFileHandler 'when')
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))  # Rotated files kept
+LOG_COMPRESS = os.getenv("LOG_COMPRESS", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records buffered before new ones are dropped
+LOG_REDACT_PHI = os.getenv("LOG_REDACT_PHI", "true").lower() == "true"
+
+os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+
+
+def _log_path() -> str:
+    return LOG_FILE.format(pid=os.getpid()) if "{pid}" in LOG_FILE else LOG_FILE
+
+# ---------------------- Request Context ------------------------------- #
+request_id_var = contextvars.ContextVar("request_id", default=None)
+thread_id_var = contextvars.ContextVar("thread_id", default=None)
+
+
+@contextmanager
+def log_context(request_id: str | None = None, thread_id: str | None = None):
+    """
+    Attach a request ID and/or conversation thread ID to every record logged inside the block
+    (including from executor threads that copy the context).
+    """
+    tokens = []
+    if request_id is not None:
+        tokens.append((request_id_var, request_id_var.set(request_id)))
+    if thread_id is not None:
+        tokens.append((thread_id_var, thread_id_var.set(thread_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the current request/thread IDs (runs on the logging thread of the caller)."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.thread_id = thread_id_var.get()
+        return True
+
+# ---------------------- PHI Redaction --------------------------------- #
+PHI_PATTERNS = [
+    # Labelled names, e.g. "Patient Name: John Smith" or "'patient_name': 'John Smith'"
+    (re.compile(r"(\b(?:patient[_ ]?name|full[_ ]?name|name)['\"]?\s*[:=]\s*['\"]?)([^'\",|}\n]+)", re.IGNORECASE),
+     r"\1[REDACTED]"),
+    (re.compile(r"\bP\d{3,}\b"), "P***"),  # Patient IDs
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+"), "[EMAIL]"),
+    (re.compile(r"(?<!\w)(?:\+\d{1,3}[\s.-]?)?\(?\d{3}\)?[\s.-]\d{3}[\s.-]\d{4}(?!\w)"), "[PHONE]"),
+]
+
+
+REDACTED = "[REDACTED]"
+
+
+class Sensitive(str):
+    """A log argument that is PHI as a whole (a name, a free-text message); see `phi`."""
+
+
+def phi(value) -> Sensitive:
+    """
+    Mark a log argument or `extra` field as PHI: it is written as [REDACTED] unless
+    LOG_REDACT_PHI=false (`logger.info("Patient found: %s", phi(name))`).
+    """
+    return Sensitive(value)
+
+
+def redact_phi(text: str) -> str:
+    """Mask patient identifiers, labelled names, e-mail addresses and phone numbers."""
+    for pattern, replacement in PHI_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _mask(value):
+    return REDACTED if isinstance(value, Sensitive) else value
+
+
+class RedactPHIFilter(logging.Filter):
+    """
+    Masks `phi()` arguments and `extra` fields, then redacts the formatted message and string
+    `extra` fields (runs on the listener thread, attached to the file handler).
+    """
+
+    def filter(self, record):
+        if isinstance(record.args, dict):
+            record.args = {key: _mask(value) for key, value in record.args.items()}
+        elif isinstance(record.args, tuple):
+            record.args = tuple(_mask(arg) for arg in record.args)
+        record.msg = redact_phi(record.getMessage())
+        record.args = None
+        for key, value in list(vars(record).items()):
+            if key not in _STANDARD_ATTRS and isinstance(value, str):
+                setattr(record, key, REDACTED if isinstance(value, Sensitive) else redact_phi(value))
+        return True
+
+# ---------------------- Formatting ------------------------------------ #
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id", "thread_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, message, request/thread IDs and any `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "thread_id": getattr(record, "thread_id", None),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+# ---------------------- Rotation -------------------------------------- #
+class SizeAndTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    Rotates at the configured interval or when the file exceeds `max_bytes`, whichever comes first.
+    Rotated files are named '<file>.<timestamp>[.gz]' and the oldest beyond `backupCount` are removed.
+    """
 
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, when=LOG_ROTATE_WHEN, backup_count=LOG_BACKUP_COUNT,
+                 compress=LOG_COMPRESS):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.max_bytes = max_bytes
+        self.compress = compress
+
+    def shouldRollover(self, record):
+        if self.max_bytes and self.stream is not None and self.stream.tell() >= self.max_bytes:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename):
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            target = f"{self.baseFilename}.{stamp}"
+            n = 1
+            while glob.glob(target + "*"):  # Several size rollovers within one second
+                target, n = f"{self.baseFilename}.{stamp}-{n}", n + 1
+            os.replace(self.baseFilename, target)
+            if self.compress:
+                with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(target)
+        for old in self.getFilesToDelete():
+            os.remove(old)
+        current = int(time.time())
+        self.rolloverAt = self.computeRollover(current)
+        if not self.delay:
+            self.stream = self._open()
+
+    def getFilesToDelete(self):
+        rotated = sorted(glob.glob(self.baseFilename + ".*"), key=lambda path: (os.path.getmtime(path), path))
+        return rotated[:-self.backupCount] if self.backupCount else []
+
+# ---------------------- Queue Pipeline -------------------------------- #
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them; never blocks the caller (records are dropped and
+    counted when the queue is full). Interpolation happens later on the listener thread.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record  # Same process: no pickling, so formatting can wait for the listener
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of raising queue.Full."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def create_file_handler(path: str | None = None, log_format: str = LOG_FORMAT, redact: bool = LOG_REDACT_PHI,
+                        **rotation) -> logging.Handler:
+    """
+    Build the rotating file handler used by the listener.
+    Args:
+        path (str, optional): Log file (defaults to LOG_FILE for this process).
+        log_format (str): 'json' for JSON lines, anything else for plain text.
+        redact (bool): Apply the PHI redaction filter.
+        **rotation: max_bytes / when / backup_count / compress overrides.
+    Returns:
+        logging.Handler: Configured handler.
+    """
+    return _configure(SizeAndTimeRotatingFileHandler(path or _log_path(), **rotation), log_format, redact)
+
+
+def _configure(handler: logging.Handler, log_format: str = LOG_FORMAT, redact: bool = LOG_REDACT_PHI):
+    handler.setFormatter(JsonFormatter() if log_format == "json" else
+                         logging.Formatter("%(asctime)s — %(levelname)s — %(message)s"))
+    if redact:
+        handler.addFilter(RedactPHIFilter())
+    return handler
+
+
+def start_queue_logging(target: logging.Logger, handlers: list, queue_size: int = LOG_QUEUE_SIZE):
+    """
+    Route `target` through a bounded queue drained by a background listener writing to `handlers`.
+    Returns:
+        logging.handlers.QueueListener: The started listener (stop it to flush).
+    """
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())  # Context must be read on the caller's thread
+    for existing in list(target.handlers):
+        target.removeHandler(existing)
+    target.addHandler(queue_handler)
+    listener = DrainingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+# ---------------------- Logger Setup ---------------------------------- #
 logger = logging.getLogger("post_discharge_ai")
-logger.setLevel(logging.INFO)  # Set logging level (INFO, DEBUG, etc.)
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+
+file_handler = create_file_handler()
+listener = start_queue_logging(logger, [file_handler])
+_logging_pid = os.getpid()  # Process that owns the running listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener (safe to call more than once)."""
+    if listener._thread is not None and _logging_pid == os.getpid():
+        listener.stop()
+
+
+atexit.register(stop_logging)
+
+
+def restart_logging_after_fork():
+    """
+    Start a new queue/listener pipeline in a forked server worker (call from gunicorn's `post_fork`).
+    A forked child inherits the queue but not the listener thread. With '{pid}' in LOG_FILE the
+    worker writes its own file; otherwise all workers share (and rotate) LOG_FILE. Safe to call
+    more than once per process.
+    """
+    global listener, file_handler, _logging_pid
+    if _logging_pid == os.getpid():
+        return
+    _logging_pid = os.getpid()
+    if "{pid}" in LOG_FILE:
+        file_handler = create_file_handler()
+    listener = start_queue_logging(logger, [file_handler])
+
+
+def _after_fork_in_child():
+    """
+    Any other forked child (process-pool workers, fastembed's parallel workers) must not append to
+    and rotate the parent's file: unless LOG_FILE has '{pid}', it logs synchronously to stderr.
+    """
+    global _logging_pid
+    if "{pid}" in LOG_FILE:
+        restart_logging_after_fork()
+        return
+    _logging_pid = None  # A later restart_logging_after_fork() (gunicorn worker) still takes over
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    stderr_handler = _configure(logging.StreamHandler())
+    stderr_handler.addFilter(ContextFilter())
+    logger.addHandler(stderr_handler)
+
+
+def queue_stats() -> dict:
+    """Records waiting to be written and records dropped because the queue was full."""
+    queue_handler = logger.handlers[0] if logger.handlers else None
+    return {"queued": queue_handler.queue.qsize() if isinstance(queue_handler, DroppingQueueHandler) else 0,
+            "dropped": DroppingQueueHandler.dropped}
 
-# Create a file handler that logs to a file with a timestamp in its name
-file_handler = logging.FileHandler(f"logs/session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-formatter = logging.Formatter('%(asctime)s — %(levelname)s — %(message)s')
-file_handler.setFormatter(formatter)
 
-# Add the file handler to the logger if not already present
-if not logger.hasHandlers():
-    logger.addHandler(file_handler)
+os.register_at_fork(after_in_child=_after_fork_in_child)
 
 # ---------------------- Logger Utility Function ----------------------- #
 def save_logger():
@@ -33,9 +326,9 @@ def save_logger():
     Save the logger configuration to a file for debugging and tracking issues.
     Writes the logger's creation time, log file path, and handler details to logs/logger_config.txt.
     """
-    with open("logs/logger_config.txt", "w") as f:
+    with open(os.path.join(LOG_DIR, "logger_config.txt"), "w") as f:
         f.write(f"Logger created on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         f.write(f"Log file: {file_handler.baseFilename}\n")
         f.write("Logger handlers:\n")
-        for handler in logger.handlers:
-            f.write(f"- {handler}\n")
\ No newline at end of file
+        for handler in logger.handlers + list(listener.handlers):
+            f.write(f"- {handler}\n")
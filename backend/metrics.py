@@ -0,0 +1,260 @@
+"""
+metrics.py
+----------
+Per-stage latency instrumentation exposed in Prometheus format.
+Every stage of a turn is timed into one histogram labelled by stage and name: LLM calls, retriever
+searches, `embed_query`, MongoDB patient lookups, web search, tools and graph nodes. LLM token
+counts and agent handoffs are counted, and the existing stats (caches, fast path, log queue) are
+exported as gauges. Graph stages are recorded by `MetricsCallbackHandler`, which `make_config`
+attaches to every run. When `OTEL_ENABLED=true` and `opentelemetry` is installed, each graph node
+also gets a span (exported by whatever tracer provider the process configures).
+"""
+
+import functools  # For the timing decorator
+import os  # For environment variable access
+import time  # Stage timings
+from contextlib import contextmanager  # For stage_timer
+from typing import Callable
+
+from langchain_core.callbacks import BaseCallbackHandler  # Graph / LLM / tool events
+from langchain_core.embeddings import Embeddings  # Base class of the timed embeddings wrapper
+from langgraph.errors import GraphBubbleUp  # Control-flow exceptions (handoffs, interrupts)
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily  # Gauges computed at scrape time
+
+from backend.logger import logger  # Custom logger
+
+# ---------------------- Metrics Configuration ------------------------- #
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true"
+# Set by gunicorn deployments so /metrics aggregates every worker (see prometheus_client multiprocess mode)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# ---------------------- Metric Definitions ---------------------------- #
+STAGE_SECONDS = Histogram(
+    "assistant_stage_duration_seconds", "Latency of one pipeline stage (llm, retriever, embed_query, "
+    "mongo, web_search, tool, node)", ["stage", "name"], buckets=LATENCY_BUCKETS)
+STAGE_ERRORS = Counter("assistant_stage_errors_total", "Stages that raised", ["stage", "name"])
+LLM_TOKENS = Counter("assistant_llm_tokens_total", "LLM tokens by model and direction", ["model", "kind"])
+HANDOFFS = Counter("assistant_handoffs_total", "Agent handoffs by destination agent", ["target"])
+TTFB_SECONDS = Histogram("assistant_stream_ttfb_seconds", "Time to the first streamed token",
+                         buckets=LATENCY_BUCKETS)
+TURN_SECONDS = Histogram("assistant_turn_duration_seconds", "End-to-end chat turn latency", ["endpoint"],
+                         buckets=LATENCY_BUCKETS)
+# Circuit breakers (backend/resilience.py); under gunicorn the scrape shows the worst worker
+BREAKER_STATE = Gauge("assistant_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+                      ["dependency"], multiprocess_mode="max")
+DEPENDENCY_CALLS = Counter("assistant_dependency_calls_total", "External calls by outcome (success, failure, "
+                           "retry, rejected, fallback)", ["dependency", "outcome"])
+
+# ---------------------- Timing Helpers -------------------------------- #
+@contextmanager
+def stage_timer(stage: str, name: str = ""):
+    """Time the enclosed block into STAGE_SECONDS (and STAGE_ERRORS if it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage, name).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage, name).observe(time.perf_counter() - start)
+
+
+def timed(stage: str, name: str | None = None):
+    """Decorator form of `stage_timer`; the name defaults to the function's name."""
+
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage, label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper timing `embed_query` / `embed_documents`; other attributes pass through."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_query(self, text: str) -> list[float]:
+        with stage_timer("embed_query", "dense"):
+            return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with stage_timer("embed_documents", "dense"):
+            return self.embeddings.embed_documents(texts)
+
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
+
+# ---------------------- Graph Callbacks ------------------------------- #
+if OTEL_ENABLED:
+    try:
+        from opentelemetry import trace  # Optional dependency
+        _tracer = trace.get_tracer("post_discharge_ai")
+    except ImportError:
+        logger.warning("[Metrics] OTEL_ENABLED is set but opentelemetry is not installed; spans disabled")
+        _tracer = None
+else:
+    _tracer = None
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records LLM, retriever, tool and graph-node latencies, LLM token usage and handoffs from
+    LangChain callback events (one shared instance; state is keyed by run ID).
+    """
+
+    run_inline = True  # Cheap bookkeeping: no executor hop in async runs
+
+    def __init__(self):
+        self._runs = {}  # run_id -> (stage, name, start)
+        self._spans = {}  # run_id -> (enclosing node span, whether this run owns it) for OpenTelemetry
+
+    def _start(self, run_id, stage: str, name: str):
+        self._runs[run_id] = (stage, name, time.perf_counter())
+
+    def _end(self, run_id, error: bool = False):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        stage, name, start = run
+        STAGE_SECONDS.labels(stage, name).observe(time.perf_counter() - start)
+        if error:
+            STAGE_ERRORS.labels(stage, name).inc()
+        return name
+
+    # LLM calls
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", (metadata or {}).get("ls_model_name") or kwargs.get("name") or "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model = self._end(run_id)
+        if model is None:
+            return
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                if usage.get("input_tokens"):
+                    LLM_TOKENS.labels(model, "input").inc(usage["input_tokens"])
+                if usage.get("output_tokens"):
+                    LLM_TOKENS.labels(model, "output").inc(usage["output_tokens"])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    # Retriever searches
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retriever", kwargs.get("name") or (serialized or {}).get("name") or "retriever")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    # Tools (handoffs are the swarm's transfer_to_<agent> tools)
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        if name.startswith("transfer_to_"):
+            HANDOFFS.labels(name.removeprefix("transfer_to_")).inc()
+        self._start(run_id, "tool", name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=not isinstance(error, GraphBubbleUp))
+
+    # Graph nodes (chains tagged with their LangGraph node name)
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        parent = self._spans.get(parent_run_id)
+        # A subgraph node (agent) runs a chain of the same name inside the node's own chain
+        outer = self._runs.get(parent_run_id)
+        if node is None or kwargs.get("name") != node or (outer is not None and outer[:2] == ("node", node)):
+            if parent is not None:
+                self._spans[run_id] = (parent[0], False)  # Inner chains nest under the node's span
+            return
+        self._start(run_id, "node", node)
+        if _tracer is not None:
+            context = trace.set_span_in_context(parent[0]) if parent is not None else None
+            span = _tracer.start_span(f"node {node}", context=context, attributes={"langgraph.node": node})
+            self._spans[run_id] = (span, True)
+
+    def _end_chain(self, run_id, error: BaseException | None = None):
+        span, owned = self._spans.pop(run_id, (None, False))
+        if owned:
+            if error is not None:
+                span.record_exception(error)
+                span.set_status(trace.Status(trace.StatusCode.ERROR))
+            span.end()
+        self._end(run_id, error=error is not None)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # Handoffs and interrupts travel up the graph as GraphBubbleUp exceptions; they are not failures
+        self._end_chain(run_id, error=None if isinstance(error, GraphBubbleUp) else error)
+
+
+metrics_handler = MetricsCallbackHandler()
+
+# ---------------------- Stats Gauges ---------------------------------- #
+class StatsCollector:
+    """Exports the numeric fields of registered `stats()` dicts as gauges at scrape time."""
+
+    def __init__(self):
+        self._sources = {}
+
+    def register(self, name: str, stats: Callable[[], dict]):
+        """Add a stats source; each numeric key becomes gauge `assistant_<name>_<key>`."""
+        self._sources[name] = stats
+
+    def collect(self):
+        for name, stats in self._sources.items():
+            try:
+                values = stats()
+            except Exception as e:  # A broken source must not break the scrape
+                logger.warning("[Metrics] Stats source %s failed: %s", name, e)
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield GaugeMetricFamily(f"assistant_{name}_{key}", f"{name} stats: {key}", value=value)
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Serialize all metrics for a Prometheus scrape.
+    With PROMETHEUS_MULTIPROC_DIR set, histograms and counters are aggregated across workers;
+    the stats gauges always describe the worker answering the scrape.
+    Returns:
+        tuple[bytes, str]: Payload and its content type.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(stats_collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -3,43 +3,184 @@ mongo_database.py
 -----------------
 Provides MongoDB connection and helper functions for retrieving patient records by name or ID.
 Loads configuration from environment variables or uses defaults for local development.
+The client is created on first use (`get_collection()`), so importing this module opens no
+connections.
 """
 
 # ---------------------- Environment Setup ----------------------------- #
-from pymongo import MongoClient  # MongoDB client
+from pymongo import MongoClient, UpdateOne  # MongoDB client and bulk update operation
+from pymongo.collation import Collation  # Case-insensitive index/query collation
+from pymongo.errors import OperationFailure  # Raised when an index cannot be built
 from dotenv import load_dotenv  # For loading .env files
 import os  # For environment variable access
+import threading  # Guards lazy client creation
+from backend.logger import logger  # Custom logger
+from backend.metrics import timed  # Lookup latency histogram
+from backend.resilience import MONGO_TIMEOUT_MS, mongo  # Client timeouts / retries and circuit breaker
 
 load_dotenv()  # Load environment variables from .env file
 
 # ---------------------- MongoDB Configuration ------------------------- #
 # MONGO_URI = os.getenv("MONGODB_URI_KEY")  # MongoDB URI from environment variable
-MONGO_URI = "mongodb://localhost:27017"  # Default local MongoDB URI
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")  # Default local MongoDB URI
 DB_NAME = "patient_reports_database"  # Database name
 COLLECTION_NAME = "patients_data"  # Collection name
 
+# ---------------------- Patient Schema / Indexing --------------------- #
+NORMALIZED_NAME_FIELD = "patient_name_normalized"  # Casefolded, whitespace-collapsed name
+NAME_COLLATION = Collation(locale="en", strength=2)  # Case-insensitive comparisons
+# Only the fields the agents actually use are returned (also drops the non-JSON ObjectId)
+PATIENT_FIELDS = (
+    "patient_id", "patient_name", "discharge_date", "primary_diagnosis", "medications",
+    "dietary_restrictions", "follow_up", "warning_signs", "discharge_instructions",
+)
+PATIENT_PROJECTION = {"_id": 0, **{field: 1 for field in PATIENT_FIELDS}}
+MIGRATION_BATCH_SIZE = 1000  # Documents per bulk_write during the backfill
+MAX_REPORTED_DUPLICATES = 20  # Duplicate patient_ids listed when the unique index cannot be built
+DUPLICATE_KEY_ERROR = 11000
+
+
+class DuplicatePatientIds(Exception):
+    """Raised by the startup migration when patient_id is not unique, so the unique index cannot be built."""
+
+    def __init__(self, duplicates: dict):
+        self.duplicates = duplicates  # patient_id -> number of documents (the most repeated first)
+        listed = ", ".join(f"{patient_id} (x{count})" for patient_id, count in duplicates.items())
+        super().__init__(f"patient_id is not unique: {listed}. Remove the duplicate documents, then restart "
+                         "(the loader upserts by patient_id and will not create new ones)")
+
 # ---------------------- MongoDB Client/Collection --------------------- #
-client = MongoClient(MONGO_URI)
-collection = client[DB_NAME][COLLECTION_NAME]
+_lock = threading.Lock()
+_client = None
+_collection = None
+
+
+def get_client() -> MongoClient:
+    """
+    Return the shared MongoDB client (one connection pool per process), creating it on first use.
+    Returns:
+        MongoClient: Client for MONGO_URI.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+                                      connectTimeoutMS=MONGO_TIMEOUT_MS, socketTimeoutMS=MONGO_TIMEOUT_MS)
+    return _client
+
+
+def close_client():
+    """Close the shared client's connection pool (on server shutdown)."""
+    global _client, _collection
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client, _collection = None, None
+
+
+def get_collection():
+    """
+    Return the patient collection.
+    Returns:
+        Collection: `patients_data` in `patient_reports_database`.
+    """
+    global _collection
+    if _collection is None:
+        _collection = get_client()[DB_NAME][COLLECTION_NAME]
+    return _collection
+
+# ---------------------- Startup Migration ----------------------------- #
+def normalize_name(name):
+    """
+    Normalize a patient name for exact, indexable matching.
+    Args:
+        name (str): Name as typed or stored.
+    Returns:
+        str: Casefolded name with runs of whitespace collapsed to single spaces.
+    """
+    return " ".join(str(name).split()).casefold()
+
+def find_duplicate_patient_ids(limit: int = MAX_REPORTED_DUPLICATES) -> dict:
+    """
+    Patient IDs stored more than once.
+    Args:
+        limit (int): Maximum number of IDs returned.
+    Returns:
+        dict: patient_id -> number of documents, the most repeated first.
+    """
+    pipeline = [
+        {"$group": {"_id": "$patient_id", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+    ]
+    return {row["_id"]: row["count"] for row in get_collection().aggregate(pipeline, allowDiskUse=True)}
+
+def _duplicate_ids_found(duplicates: dict, cause: Exception | None = None):
+    error = DuplicatePatientIds(duplicates)
+    logger.error("[MongoMigration] Unique patient_id index cannot be built: %s", error)
+    raise error from cause
+
+def ensure_indexes():
+    """
+    Idempotent startup migration: backfill the normalized name field on documents that lack it,
+    then create a unique index on patient_id and a collation index on the normalized name.
+    Raises:
+        DuplicatePatientIds: If patient_id is not unique; the duplicates must be removed first.
+    """
+    collection = get_collection()
+    batch = []
+    for doc in collection.find({NORMALIZED_NAME_FIELD: {"$exists": False}}, {"patient_name": 1}):
+        batch.append(UpdateOne({"_id": doc["_id"]},
+                               {"$set": {NORMALIZED_NAME_FIELD: normalize_name(doc.get("patient_name", ""))}}))
+        if len(batch) >= MIGRATION_BATCH_SIZE:
+            collection.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+
+    if "patient_id" in collection.index_information():
+        # Non-unique index left by earlier versions of this migration: kept until the IDs are unique
+        duplicates = find_duplicate_patient_ids()
+        if duplicates:
+            _duplicate_ids_found(duplicates)
+        collection.drop_index("patient_id")
+    try:
+        collection.create_index("patient_id", unique=True, name="patient_id_unique")
+    except OperationFailure as e:
+        if e.code != DUPLICATE_KEY_ERROR:
+            raise
+        _duplicate_ids_found(find_duplicate_patient_ids(), e)
+    collection.create_index(NORMALIZED_NAME_FIELD, name="patient_name_normalized_ci", collation=NAME_COLLATION)
 
 # ---------------------- Patient Query Functions ----------------------- #
+@timed("mongo")
+@mongo.guard
 def get_patient_by_name(name):
     """
-    Retrieve a patient record by name (case-insensitive, exact match).
+    Retrieve a patient record by name (case-insensitive, exact match on the normalized name index).
     Args:
         name (str): Patient's full name.
     Returns:
         dict: Patient record if found.
         str: 'multiple' if multiple matches found.
         None: If no match found.
+    Raises:
+        DependencyUnavailable: If MongoDB cannot be reached.
     """
-    matches = list(collection.find({"patient_name": {"$regex": f"^{name}$", "$options": "i"}}))
+    matches = list(
+        get_collection().find({NORMALIZED_NAME_FIELD: normalize_name(name)}, PATIENT_PROJECTION,
+                        collation=NAME_COLLATION).limit(2)
+    )
     if not matches:
         return None
     elif len(matches) > 1:
         return "multiple"
     return matches[0]
 
+@timed("mongo")
+@mongo.guard
 def get_patient_by_id(patient_id):
     """
     Retrieve a patient record by patient ID.
@@ -47,10 +188,25 @@ def get_patient_by_id(patient_id):
         patient_id (str): Unique patient identifier.
     Returns:
         dict: Patient record if found, else None.
+    Raises:
+        DependencyUnavailable: If MongoDB cannot be reached.
     """
-    match = collection.find_one({"patient_id": patient_id})
+    match = get_collection().find_one({"patient_id": patient_id}, PATIENT_PROJECTION)
     if not match:
         return None
     return match
 
-print(get_patient_by_id("P001"))  # Example usage to test connection and query
\ No newline at end of file
+@timed("mongo")
+@mongo.guard
+def get_patients_by_ids(patient_ids):
+    """
+    Retrieve several patient records in one `$in` query (batch answering).
+    Args:
+        patient_ids (Iterable[str]): Patient identifiers.
+    Returns:
+        dict: patient_id -> record, for the IDs that exist.
+    Raises:
+        DependencyUnavailable: If MongoDB cannot be reached.
+    """
+    cursor = get_collection().find({"patient_id": {"$in": list(set(patient_ids))}}, PATIENT_PROJECTION)
+    return {doc["patient_id"]: doc for doc in cursor}
@@ -0,0 +1,335 @@
+"""
+patient_cache.py
+----------------
+Process-local read-through cache for patient records used by the receptionist tools.
+Within one conversation the same record is fetched by ID, again for name verification and again
+for the summary; the cache serves the repeats from memory. Entries are LRU-evicted beyond a size
+limit and expire after a TTL. Changes in MongoDB invalidate entries through a change stream, or by
+polling when the server is a standalone instance without change-stream support. A failed stream
+is reopened with exponential backoff from its last resume token, and the cache polls until then.
+"""
+
+import os  # For environment variable access
+import threading  # Locking and the background invalidation thread
+import time  # TTL bookkeeping
+from collections import OrderedDict  # LRU ordering
+
+from pymongo.errors import OperationFailure, PyMongoError  # Change-stream / connection failures
+
+from backend import mongo_database  # Patient queries and collection
+from backend.logger import logger, thread_id_var  # Custom logger / conversation of the current turn
+
+# ---------------------- Cache Configuration --------------------------- #
+PATIENT_CACHE_MAX_ENTRIES = int(os.getenv("PATIENT_CACHE_MAX_ENTRIES", "1024"))
+PATIENT_CACHE_TTL_SECONDS = int(os.getenv("PATIENT_CACHE_TTL_SECONDS", "300"))
+PATIENT_CACHE_POLL_SECONDS = int(os.getenv("PATIENT_CACHE_POLL_SECONDS", "30"))  # Polling fallback
+# Backoff between change-stream reconnects; the cache polls while the stream is down
+PATIENT_CACHE_RETRY_SECONDS = float(os.getenv("PATIENT_CACHE_RETRY_SECONDS", "1"))
+PATIENT_CACHE_MAX_RETRY_SECONDS = float(os.getenv("PATIENT_CACHE_MAX_RETRY_SECONDS", "60"))
+CHANGE_STREAM_UNSUPPORTED = {40573}  # "$changeStream is only supported on replica sets"
+RESUME_TOKEN_LOST = {260, 280, 286}  # InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost
+# Shown instead of a lookup result while MongoDB is unreachable (cached records are still served)
+RECORDS_UNAVAILABLE = "Patient records are temporarily unavailable. Please try again in a few minutes."
+
+
+class LRUTTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after a TTL.
+    Attributes:
+        max_entries (int): Entries kept before the least recently used is evicted.
+        ttl_seconds (float): Lifetime of an entry.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value (refreshing its LRU position) or `default` if absent/expired."""
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                return default
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        """Insert or replace a value, evicting the least recently used entries if over capacity."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        """Remove a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """Snapshot of (key, value) pairs, including entries that may have expired."""
+        with self._lock:
+            return [(key, entry[1]) for key, entry in self._data.items()]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class PatientCache:
+    """
+    Read-through cache over `get_patient_by_id` / `get_patient_by_name` / `get_patients_by_ids` with invalidation and hit ratios.
+    Lookups and DB round trips are also counted per conversation (the `thread_id` of the log context).
+    """
+
+    def __init__(self, max_entries: int = PATIENT_CACHE_MAX_ENTRIES, ttl_seconds: float = PATIENT_CACHE_TTL_SECONDS,
+                 poll_seconds: float = PATIENT_CACHE_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._by_id = LRUTTLCache(max_entries, ttl_seconds)  # patient_id -> record
+        self._name_to_id = LRUTTLCache(max_entries, ttl_seconds)  # normalized name -> patient_id
+        self.hits = 0
+        self.misses = 0
+        self.db_round_trips = 0
+        self._conversations = LRUTTLCache(max_entries, ttl_seconds)  # thread_id -> [lookups, hits, db_round_trips]
+        self._stats_lock = threading.Lock()  # Counters are updated from the tool thread pool
+        self.invalidation_mode = None  # 'change_stream' | 'polling' once started
+        self._resume_token = None  # Last change-stream position, to resume after a reconnect
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+
+    # ---------------------- Read-Through Lookups ---------------------- #
+    def get_by_id(self, patient_id):
+        """
+        Retrieve a patient record by ID, from cache when possible.
+        Args:
+            patient_id (str): Unique patient identifier.
+        Returns:
+            dict: Patient record if found, else None.
+        Raises:
+            DependencyUnavailable: If the record is not cached and MongoDB cannot be reached.
+        """
+        self._ensure_invalidation()
+        patient = self._by_id.get(patient_id)
+        if patient is not None:
+            self._count(hits=1)
+            return patient
+        self._count(misses=1, round_trips=1)
+        patient = mongo_database.get_patient_by_id(patient_id)
+        if patient:
+            self._store(patient)
+        return patient
+
+    def get_by_name(self, name):
+        """
+        Retrieve a patient record by name, from cache when possible.
+        Args:
+            name (str): Patient's full name.
+        Returns:
+            dict | str | None: Same contract as `get_patient_by_name` ('multiple' is never cached).
+        """
+        self._ensure_invalidation()
+        patient_id = self._name_to_id.get(mongo_database.normalize_name(name))
+        patient = self._by_id.get(patient_id) if patient_id else None
+        if patient is not None:
+            self._count(hits=1)
+            return patient
+        self._count(misses=1, round_trips=1)
+        patient = mongo_database.get_patient_by_name(name)
+        if isinstance(patient, dict):
+            self._store(patient)
+        return patient
+
+    def get_many(self, patient_ids):
+        """
+        Retrieve several patient records, fetching every uncached one in a single `$in` query.
+        Args:
+            patient_ids (Iterable[str]): Unique patient identifiers.
+        Returns:
+            dict: patient_id -> record, for the IDs that exist.
+        Raises:
+            DependencyUnavailable: If some records are not cached and MongoDB cannot be reached.
+        """
+        self._ensure_invalidation()
+        found, missing = {}, set()
+        for patient_id in set(patient_ids):
+            patient = self._by_id.get(patient_id)
+            if patient is not None:
+                found[patient_id] = patient
+            else:
+                missing.add(patient_id)
+        self._count(hits=len(found), misses=len(missing), round_trips=1 if missing else 0)
+        if missing:
+            for patient_id, patient in mongo_database.get_patients_by_ids(missing).items():
+                self._store(patient)
+                found[patient_id] = patient
+        return found
+
+    def _count(self, hits: int = 0, misses: int = 0, round_trips: int = 0):
+        """Add to the process counters and to those of the current conversation, if any."""
+        thread_id = thread_id_var.get()
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+            self.db_round_trips += round_trips
+            if thread_id is not None:
+                counts = self._conversations.get(thread_id) or [0, 0, 0]
+                self._conversations.set(thread_id, [counts[0] + hits + misses, counts[1] + hits,
+                                                    counts[2] + round_trips])
+
+    def _store(self, patient: dict):
+        self._by_id.set(patient["patient_id"], patient)
+        self._name_to_id.set(mongo_database.normalize_name(patient["patient_name"]), patient["patient_id"])
+
+    # ---------------------- Invalidation ------------------------------ #
+    def invalidate(self, patient_id):
+        """Drop a patient (and any name mapping to it) from the cache."""
+        self._by_id.pop(patient_id)
+        for name, cached_id in self._name_to_id.items():
+            if cached_id == patient_id:
+                self._name_to_id.pop(name)
+
+    def clear(self):
+        self._by_id.clear()
+        self._name_to_id.clear()
+
+    def _ensure_invalidation(self):
+        """Start the background invalidation thread on first use."""
+        if self._watcher is None:
+            with self._watcher_lock:
+                if self._watcher is None:
+                    self._watcher = threading.Thread(target=self._invalidation_loop, name="patient-cache-invalidation",
+                                                     daemon=True)
+                    self._watcher.start()
+
+    def _invalidation_loop(self):
+        delay = PATIENT_CACHE_RETRY_SECONDS
+        while True:
+            try:
+                self._watch_change_stream()
+                error = "stream closed"
+            except NotImplementedError as e:
+                logger.info("[PatientCache] Change streams unavailable (%s); polling every %ss", e, self.poll_seconds)
+                self._poll_forever()
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    # Standalone servers have no change streams
+                    logger.info("[PatientCache] Change streams unavailable (%s); polling every %ss", e, self.poll_seconds)
+                    self._poll_forever()
+                if e.code in RESUME_TOKEN_LOST:
+                    self._resume_token = None  # Missed changes are caught by the poll below
+                error = e
+            except Exception as e:
+                error = e
+            if self.invalidation_mode == "change_stream":
+                delay = PATIENT_CACHE_RETRY_SECONDS  # The stream was up: restart the backoff
+            self.invalidation_mode = "polling"
+            logger.warning("[PatientCache] Change stream down (%s); polling, retrying in %.1fs", error, delay)
+            self._poll_until(time.monotonic() + delay)
+            delay = min(delay * 2, PATIENT_CACHE_MAX_RETRY_SECONDS)
+
+    def _watch_change_stream(self):
+        """Invalidate entries from the change stream, resuming after the last change seen; returns if it closes."""
+        collection = mongo_database.get_collection()
+        if not callable(getattr(type(collection), "watch", None)):
+            raise NotImplementedError(f"{type(collection).__name__} has no watch()")  # e.g. mongomock
+        with collection.watch(full_document="updateLookup", resume_after=self._resume_token) as stream:
+            if self.invalidation_mode == "polling":
+                logger.info("[PatientCache] Change stream resumed")
+            self.invalidation_mode = "change_stream"
+            while stream.alive:
+                change = stream.try_next()
+                self._resume_token = stream.resume_token  # Advances on empty batches too
+                if change is None:
+                    continue
+                document = change.get("fullDocument") or {}
+                if "patient_id" in document:
+                    self.invalidate(document["patient_id"])
+                else:
+                    self.clear()  # Deletes only carry _id, which the cache does not key on
+
+    def _poll_until(self, deadline: float):
+        """Poll now and every `poll_seconds`, then wait until `deadline` (time.monotonic())."""
+        next_poll = time.monotonic()
+        while next_poll < deadline:
+            time.sleep(max(0.0, next_poll - time.monotonic()))
+            try:
+                self.refresh_stale()
+            except PyMongoError as e:
+                logger.error("[PatientCache] Polling failed: %s", e)
+            next_poll += self.poll_seconds
+        time.sleep(max(0.0, deadline - time.monotonic()))
+
+    def _poll_forever(self):
+        self.invalidation_mode = "polling"
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.refresh_stale()
+            except PyMongoError as e:
+                logger.error("[PatientCache] Polling failed: %s", e)
+
+    def refresh_stale(self):
+        """Re-read every cached patient in one `$in` query and drop entries that changed or vanished."""
+        cached = dict(self._by_id.items())
+        if not cached:
+            return
+        current = {
+            doc["patient_id"]: doc for doc in mongo_database.get_collection().find(
+                {"patient_id": {"$in": list(cached)}}, mongo_database.PATIENT_PROJECTION
+            )
+        }
+        for patient_id, patient in cached.items():
+            if current.get(patient_id) != patient:
+                self.invalidate(patient_id)
+
+    # ---------------------- Statistics -------------------------------- #
+    def conversation_stats(self, thread_id: str) -> dict:
+        """
+        Patient lookups of one conversation served by this process.
+        Args:
+            thread_id (str): Conversation thread ID.
+        Returns:
+            dict: lookups, hits and db_round_trips (zeros if unknown or expired).
+        """
+        with self._stats_lock:
+            lookups, hits, round_trips = self._conversations.get(thread_id) or [0, 0, 0]
+        return {"lookups": lookups, "hits": hits, "db_round_trips": round_trips}
+
+    def stats(self) -> dict:
+        """
+        Cache effectiveness for this process.
+        Returns:
+            dict: hits, misses, hit_ratio, db_round_trips, entries, invalidation_mode and, over the
+                recent conversations, lookups and DB round trips per conversation.
+        """
+        with self._stats_lock:
+            hits, misses, round_trips = self.hits, self.misses, self.db_round_trips
+            conversations = [counts for _, counts in self._conversations.items()]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "db_round_trips": round_trips,
+            "entries": len(self._by_id),
+            "invalidation_mode": self.invalidation_mode,
+            "conversations": len(conversations),
+            "lookups_per_conversation": round(sum(c[0] for c in conversations) / len(conversations), 2)
+            if conversations else 0.0,
+            "db_round_trips_per_conversation": round(sum(c[2] for c in conversations) / len(conversations), 2)
+            if conversations else 0.0,
+        }
+
+
+# Process-wide instance shared by the receptionist tools
+patient_cache = PatientCache()
@@ -0,0 +1,286 @@
+"""
+resilience.py
+-------------
+Deadlines, retries and circuit breakers for external dependencies (MongoDB, Qdrant/RAG, web
+search), plus the client-side timeouts used when the LLM, Qdrant and MongoDB clients are created.
+Each dependency gets a `Dependency` with its own policy: a deadline for the whole call (retries
+included), jittered exponential backoff between attempts, a process-wide retry budget so retries
+cannot multiply load during an outage, and a circuit breaker that opens after consecutive failures
+and then fails fast (to a fallback, when the caller has one) until a probe call succeeds.
+Breaker states and call outcomes are exported on /metrics.
+"""
+
+import contextvars  # Carry log context into deadline threads
+import functools  # For the decorator form
+import os  # For environment variable access
+import random  # Backoff jitter
+import threading  # Breaker / budget locks
+import time  # Deadlines and breaker timers
+from concurrent.futures import ThreadPoolExecutor  # Runs calls that have no client-side timeout
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from pymongo.errors import ConnectionFailure  # Network errors, server selection timeouts
+
+from backend.logger import logger  # Custom logger
+from backend.metrics import BREAKER_STATE, DEPENDENCY_CALLS  # Breaker state / outcome metrics
+
+# ---------------------- Resilience Configuration ---------------------- #
+# Client-side timeouts (applied where each client is created)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # The Gemini client's own retries
+QDRANT_TIMEOUT_SECONDS = int(os.getenv("QDRANT_TIMEOUT_SECONDS", "5"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "3000"))  # Server selection / connect / socket
+# Deadlines for a whole call, retries included
+RAG_DEADLINE_SECONDS = float(os.getenv("RAG_DEADLINE_SECONDS", "45"))
+WEB_SEARCH_DEADLINE_SECONDS = float(os.getenv("WEB_SEARCH_DEADLINE_SECONDS", "8"))  # Latency budget per search
+MONGO_DEADLINE_SECONDS = float(os.getenv("MONGO_DEADLINE_SECONDS", "5"))
+# Retries and breakers
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))  # Attempts per call, first one included
+RETRY_BACKOFF_SECONDS = float(os.getenv("RETRY_BACKOFF_SECONDS", "0.2"))  # Base of the exponential backoff
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))  # Retries allowed per call made
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))  # Open time before a probe
+DEADLINE_POOL_SIZE = int(os.getenv("DEADLINE_POOL_SIZE", "32"))  # Threads running deadline-enforced attempts
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+DEPENDENCIES = {}  # name -> Dependency, for stats()
+
+
+class DependencyUnavailable(Exception):
+    """Raised when a dependency's breaker is open, or its call failed or missed its deadline, and there is no fallback."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    Closed: calls pass. After `failure_threshold` failures in a row it opens and rejects calls for
+    `reset_seconds`; then one probe call is let through (half-open), which closes or re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0  # Consecutive
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        BREAKER_STATE.labels(name).set(0)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning("[Resilience] %s breaker %s -> %s", self.name, self.state, state)
+            self.state = state
+            BREAKER_STATE.labels(self.name).set(_STATE_VALUES[state])
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of calls: each call deposits `ratio` tokens
+    (up to `max_tokens`) and each retry spends one, so an outage cannot turn into a retry storm.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class Dependency:
+    """
+    Call policy for one external dependency.
+    Attributes:
+        name (str): Label used in logs and metrics.
+        deadline_seconds (float): Time allowed for the whole call, retries included.
+        attempts (int): Attempts per call, first one included.
+        retry_on (tuple): Exception types worth retrying (and counted as breaker failures).
+        transient (Callable, optional): Narrows `retry_on`: errors it rejects are raised at once,
+            like any other exception (the dependency answered; not an outage).
+        enforce_deadline (bool): Run each attempt on a helper thread and stop waiting at the
+            deadline. For clients without a timeout of their own, or whose timeouts add up past
+            the deadline; the abandoned attempt finishes in the background.
+    """
+
+    _deadline_pool = None
+    _deadline_pool_lock = threading.Lock()
+
+    def __init__(self, name: str, deadline_seconds: float, attempts: int = RETRY_ATTEMPTS,
+                 retry_on: tuple = (Exception,), transient=None, enforce_deadline: bool = False):
+        self.name = name
+        self.deadline_seconds = deadline_seconds
+        self.attempts = max(1, attempts)
+        self.retry_on = retry_on
+        self.transient = transient
+        self.enforce_deadline = enforce_deadline
+        self.breaker = CircuitBreaker(name)
+        self.budget = RetryBudget()
+        DEPENDENCIES[name] = self
+
+    @classmethod
+    def _pool(cls) -> ThreadPoolExecutor:
+        if cls._deadline_pool is None:
+            with cls._deadline_pool_lock:
+                if cls._deadline_pool is None:
+                    cls._deadline_pool = ThreadPoolExecutor(max_workers=DEADLINE_POOL_SIZE,
+                                                            thread_name_prefix="deadline")
+        return cls._deadline_pool
+
+    def _attempt(self, func, args, kwargs, remaining: float):
+        if not self.enforce_deadline:
+            return func(*args, **kwargs)
+        context = contextvars.copy_context()
+        future = self._pool().submit(context.run, func, *args, **kwargs)
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            raise TimeoutError(f"{self.name} exceeded its {self.deadline_seconds:.1f}s deadline") from None
+
+    def call(self, func, *args, fallback=None, **kwargs):
+        """
+        Call `func(*args, **kwargs)` under this dependency's deadline, retry and breaker policy.
+        Args:
+            fallback (Callable, optional): Called with the error when the breaker is open or the
+                call fails; its result is returned instead of raising.
+        Returns:
+            Any: The function's (or the fallback's) return value.
+        Raises:
+            DependencyUnavailable: If the call cannot be made or fails and there is no fallback.
+        """
+        if not self.breaker.allow():
+            DEPENDENCY_CALLS.labels(self.name, "rejected").inc()
+            return self._fail(DependencyUnavailable(f"{self.name} is unavailable (circuit open)"), fallback)
+
+        self.budget.deposit()
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = self._attempt(func, args, kwargs, max(deadline - time.monotonic(), 0.001))
+            except self.retry_on as e:
+                if self.transient is not None and not self.transient(e):
+                    self.breaker.record_success()  # e.g. a bad request or a bug: retrying cannot help
+                    raise
+                backoff = random.uniform(0, RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))  # Full jitter
+                if (attempt < self.attempts and time.monotonic() + backoff < deadline
+                        and not isinstance(e, TimeoutError) and self.budget.withdraw()):
+                    DEPENDENCY_CALLS.labels(self.name, "retry").inc()
+                    logger.warning("[Resilience] %s attempt %d failed (%s); retrying in %.2fs",
+                                   self.name, attempt, e, backoff)
+                    time.sleep(backoff)
+                    continue
+                self.breaker.record_failure()
+                DEPENDENCY_CALLS.labels(self.name, "failure").inc()
+                logger.error("[Resilience] %s failed after %d attempt(s): %s", self.name, attempt, e)
+                error = DependencyUnavailable(f"{self.name} failed: {type(e).__name__}: {e}")
+                error.__cause__ = e
+                return self._fail(error, fallback)
+            except BaseException:
+                self.breaker.record_success()  # The dependency answered (e.g. a query error); not an outage
+                raise
+            self.breaker.record_success()
+            DEPENDENCY_CALLS.labels(self.name, "success").inc()
+            return result
+
+    def _fail(self, error: DependencyUnavailable, fallback):
+        if fallback is None:
+            raise error
+        DEPENDENCY_CALLS.labels(self.name, "fallback").inc()
+        return fallback(error)
+
+    def guard(self, func):
+        """Decorator form of `call` (no fallback)."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+
+        return wrapper
+
+    def stats(self) -> dict:
+        return {"state": self.breaker.state, "consecutive_failures": self.breaker.failures,
+                "retry_tokens": round(self.budget.tokens, 2)}
+
+
+# ---------------------- Dependencies ---------------------------------- #
+QDRANT_TRANSIENT_HTTP_STATUS = {502, 503, 504}
+
+
+def qdrant_transient(error: BaseException) -> bool:
+    """
+    Whether a RAG failure is a transport failure of the Qdrant client worth another attempt.
+    LLM errors are not: the Gemini client already retries them (LLM_MAX_RETRIES).
+    Args:
+        error (BaseException): Error raised by the retrieval + generation chain.
+    Returns:
+        bool: True for connection errors, timeouts, HTTP 502/503/504 and gRPC UNAVAILABLE /
+            DEADLINE_EXCEEDED.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    import httpx  # Imported here: the Qdrant client is loaded on first use, not with this module
+    from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+    if isinstance(error, (httpx.TransportError, ResponseHandlingException)):
+        return True
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in QDRANT_TRANSIENT_HTTP_STATUS
+    try:
+        import grpc
+    except ImportError:
+        return False
+    return isinstance(error, grpc.RpcError) and error.code() in (grpc.StatusCode.UNAVAILABLE,
+                                                                grpc.StatusCode.DEADLINE_EXCEEDED)
+
+
+mongo = Dependency("mongo", MONGO_DEADLINE_SECONDS, retry_on=(ConnectionFailure,))  # Not query errors
+# Qdrant retrieval + answer generation. The LLM timeout times its retries plus the Qdrant timeout
+# exceed RAG_DEADLINE_SECONDS, so the deadline is enforced here.
+rag = Dependency("rag", RAG_DEADLINE_SECONDS, attempts=2, transient=qdrant_transient, enforce_deadline=True)
+# Web search providers get one Dependency each (see web_search_tool.py)
+
+
+def stats() -> dict:
+    """Breaker state and retry budget of every dependency in this process."""
+    return {name: dependency.stats() for name, dependency in DEPENDENCIES.items()}
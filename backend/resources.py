@@ -0,0 +1,192 @@
+"""
+resources.py
+------------
+Process-wide registry for expensive shared resources: the FastEmbed embedding models (dense,
+sparse and the cross-encoder reranker) and the vector store client (Qdrant, or the memory-mapped
+local index when VECTOR_BACKEND=local). Each is created lazily on first use and then reused by every module (RAG tool,
+vectorstore loader, ingestion). `preload()` loads the model in a pre-fork server master so that
+forked workers share its memory pages copy-on-write instead of each loading their own copy.
+onnxruntime's intra-op thread pool does not survive fork(), so models created by `preload()` run
+single-threaded sessions (no pool to lose); workers get their parallelism from concurrent requests.
+"""
+
+import gc  # Freeze preloaded objects before fork
+import os  # For environment variable access / process id
+import threading  # Guards lazy initialization
+
+from backend.logger import logger  # Custom logger
+from backend.metrics import TimedEmbeddings  # embed_query latency histogram
+from backend.resilience import QDRANT_TIMEOUT_SECONDS  # Request timeout
+
+# ---------------------- Resource Configuration ------------------------ #
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "BAAI/bge-base-en-v1.5")
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")  # Or ':memory:' / a local path
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "nephrology_lc_fastembed")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant").lower()  # 'qdrant' or 'local' (backend/local_index.py)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense").lower()  # 'dense' or 'hybrid'
+HYBRID_COLLECTION_NAME = os.getenv("QDRANT_HYBRID_COLLECTION", f"{COLLECTION_NAME}_hybrid")
+SPARSE_MODEL_NAME = os.getenv("SPARSE_MODEL_NAME", "Qdrant/bm25")  # Or prithivida/Splade_PP_en_v1
+RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL_NAME", "Xenova/ms-marco-MiniLM-L-6-v2")
+# Query-time search settings (quantization is chosen at ingestion, see create_vectorstore.py)
+QDRANT_HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", "0"))  # Candidates explored per query; 0 = server default
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() == "true"  # Re-rank quantized hits with full vectors
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))  # Quantized candidates per result
+
+_lock = threading.Lock()
+_embeddings = None
+_sparse_embeddings = None
+_reranker = None
+_qdrant_client = None
+_qdrant_pid = None  # Process that created the client
+_local_index_client = None
+_model_threads = None  # ONNX threads per session; 1 once preload() runs (fork-safe), else onnxruntime's default
+
+
+def get_embeddings():
+    """
+    Return the shared FastEmbed embedding model, loading it on first use.
+    Returns:
+        TimedEmbeddings: LangChain FastEmbed embeddings (one ONNX session per process), timed per call.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                from langchain_community.embeddings.fastembed import FastEmbedEmbeddings  # Heavy import
+                logger.info("[Resources] Loading embedding model: %s", EMBEDDING_MODEL_NAME)
+                _embeddings = TimedEmbeddings(FastEmbedEmbeddings(model_name=EMBEDDING_MODEL_NAME,
+                                                                   threads=_model_threads))
+    return _embeddings
+
+
+def get_sparse_embeddings():
+    """
+    Return the shared FastEmbed sparse (BM25/SPLADE) model used for hybrid retrieval.
+    Returns:
+        SparseTextEmbedding: Produces sparse vectors for exact-term matching.
+    """
+    global _sparse_embeddings
+    if _sparse_embeddings is None:
+        with _lock:
+            if _sparse_embeddings is None:
+                from fastembed import SparseTextEmbedding  # Heavy import
+                logger.info("[Resources] Loading sparse model: %s", SPARSE_MODEL_NAME)
+                _sparse_embeddings = SparseTextEmbedding(model_name=SPARSE_MODEL_NAME, threads=_model_threads)
+    return _sparse_embeddings
+
+
+def get_reranker():
+    """
+    Return the shared CPU cross-encoder used to rerank hybrid candidates.
+    Returns:
+        TextCrossEncoder: Scores (query, passage) pairs.
+    """
+    global _reranker
+    if _reranker is None:
+        with _lock:
+            if _reranker is None:
+                from fastembed.rerank.cross_encoder import TextCrossEncoder  # Heavy import
+                logger.info("[Resources] Loading reranker: %s", RERANKER_MODEL_NAME)
+                _reranker = TextCrossEncoder(model_name=RERANKER_MODEL_NAME, threads=_model_threads)
+    return _reranker
+
+
+def get_qdrant_client():
+    """
+    Return the shared Qdrant client (gRPC when enabled), creating it on first use in this process.
+    gRPC channels and HTTP connection pools must not cross a fork, so a worker forked from a
+    preloaded master gets its own client.
+    Returns:
+        QdrantClient: Client with its own connection pool.
+    """
+    global _qdrant_client, _qdrant_pid
+    if _qdrant_client is None or _qdrant_pid != os.getpid():
+        with _lock:
+            if _qdrant_client is None or _qdrant_pid != os.getpid():
+                from qdrant_client import QdrantClient
+                if QDRANT_URL.startswith(("http://", "https://")):
+                    _qdrant_client = QdrantClient(url=QDRANT_URL, prefer_grpc=QDRANT_PREFER_GRPC,
+                                                  grpc_port=QDRANT_GRPC_PORT, timeout=QDRANT_TIMEOUT_SECONDS)
+                else:
+                    _qdrant_client = QdrantClient(location=QDRANT_URL) if QDRANT_URL == ":memory:" \
+                        else QdrantClient(path=QDRANT_URL)
+                _qdrant_pid = os.getpid()
+    return _qdrant_client
+
+
+def get_local_index_client():
+    """
+    Return the shared local index client (VECTOR_BACKEND=local), creating it on first use.
+    Its readers memory-map the index files, so every process shares the same page-cache pages.
+    Returns:
+        LocalIndexClient: Reader/writer for the collections under LOCAL_INDEX_DIR.
+    """
+    global _local_index_client
+    if _local_index_client is None:
+        with _lock:
+            if _local_index_client is None:
+                from backend.local_index import LocalIndexClient
+                _local_index_client = LocalIndexClient()
+    return _local_index_client
+
+
+def get_vector_client():
+    """Return the client of the configured vector backend (Qdrant or the local index)."""
+    return get_local_index_client() if VECTOR_BACKEND == "local" else get_qdrant_client()
+
+
+def check_vector_store():
+    """Warm-up check: ping Qdrant, or map the local index of the configured collection."""
+    if VECTOR_BACKEND == "local":
+        get_local_index_client().get_index(COLLECTION_NAME)
+    else:
+        get_qdrant_client().get_collections()
+
+
+def close_clients():
+    """Close this process's Qdrant client (on server shutdown); models need no cleanup."""
+    global _qdrant_client
+    with _lock:
+        if _qdrant_client is not None and _qdrant_pid == os.getpid():
+            _qdrant_client.close()
+        _qdrant_client = None
+
+
+def search_params():
+    """
+    Qdrant search parameters for dense queries: HNSW `ef` and quantization rescoring/oversampling.
+    The quantization settings are ignored by collections stored without quantization.
+    Returns:
+        models.SearchParams: Passed to every dense query.
+    """
+    from qdrant_client import models
+    return models.SearchParams(
+        hnsw_ef=QDRANT_HNSW_EF or None,
+        quantization=models.QuantizationSearchParams(rescore=QDRANT_RESCORE, oversampling=QDRANT_OVERSAMPLING),
+    )
+
+
+def warm_models():
+    """Load the embedding model (plus the sparse model and reranker in hybrid mode) and run one query through each."""
+    get_embeddings().embed_query("warmup")
+    if RETRIEVAL_MODE == "hybrid":
+        list(get_sparse_embeddings().query_embed("warmup"))
+        list(get_reranker().rerank("warmup", ["warmup"]))
+
+
+def preload():
+    """
+    Load and warm the models before worker processes are forked.
+    Call from a pre-fork master (see gunicorn.conf.py). The Qdrant client is deliberately not
+    created here; each worker opens its own connections. The ONNX sessions are created with one
+    thread: a session whose intra-op pool threads were started here would be left without them in
+    the workers and could hang on its first run (`bench_cold_start` embeds in forked workers with a
+    deadline to check this).
+    """
+    global _model_threads
+    _model_threads = 1
+    warm_models()
+    gc.freeze()  # Keep the collector from touching (and un-sharing) preloaded pages in workers
+    logger.info("[Resources] Preloaded embedding model for copy-on-write sharing")
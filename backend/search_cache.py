@@ -0,0 +1,121 @@
+"""
+search_cache.py
+---------------
+Disk cache for web search results.
+Results are keyed by the normalized query (case, punctuation and spacing folded), so repeated
+general-health searches are answered without a network round trip. Entries live in a SQLite file
+shared by all workers, expire after a TTL and are evicted least-recently-used beyond a size limit.
+"""
+
+import os  # For environment variable access
+import re  # Query normalization
+import sqlite3  # Persistent on-disk backend
+import threading  # Serializes use of the shared connection
+import time  # TTL / LRU timestamps
+
+# ---------------------- Cache Configuration --------------------------- #
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "cache/search_cache.sqlite3")
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(6 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    query TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access);
+"""
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a query: casefolded, punctuation removed and whitespace collapsed.
+    Args:
+        query (str): Query as the agent wrote it.
+    Returns:
+        str: e.g. 'latest research on sglt2 inhibitors' for 'Latest research on SGLT2 inhibitors?'
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", query.casefold()).split())
+
+
+class SearchCache:
+    """
+    Query-keyed search result cache with TTL, LRU eviction and hit/miss counters.
+    Attributes:
+        ttl_seconds (int): Age after which an entry is no longer served.
+        max_entries (int): Entries kept before LRU eviction.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl_seconds: int = SEARCH_CACHE_TTL_SECONDS,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Readers in other workers are not blocked by writes
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, query: str) -> str | None:
+        """
+        Return the cached result for a query, if present and not expired.
+        Args:
+            query (str): Search query (normalized here).
+        Returns:
+            str | None: Cached result on a hit, None on a miss.
+        """
+        key, now = normalize_query(query), time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT result, created_at FROM results WHERE query = ?", (key,)).fetchone()
+            if row is None or row[1] < now - self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE query = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, query: str, result: str, provider: str):
+        """
+        Cache a result, evicting expired and least recently used entries beyond max_entries.
+        Args:
+            query (str): Search query (normalized here).
+            result (str): Formatted results passed to the LLM.
+            provider (str): Provider that answered (kept for inspection).
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (query, result, provider, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (normalize_query(query), result, provider, now, now),
+            )
+            self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM results WHERE query IN (SELECT query FROM results ORDER BY last_access DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters for this process.
+        Returns:
+            dict: hits, misses, hit_ratio and current entry count.
+        """
+        total = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,247 @@
+"""
+semantic_cache.py
+-----------------
+Semantic response cache for the RAG tool.
+Answers are keyed by the query embedding: a lookup is a hit when a cached query is at least
+`SEMANTIC_CACHE_THRESHOLD` cosine-similar to the new one. Entries live in a SQLite file so they
+survive restarts, expire after a TTL and are evicted least-recently-used beyond a size limit.
+"""
+
+import os  # For environment variable access
+import sqlite3  # Persistent on-disk backend
+import threading  # Guards the in-memory index
+import time  # TTL / LRU timestamps
+
+import numpy as np  # Vectorized cosine similarity
+
+from backend.logger import logger  # Custom logger
+
+# ---------------------- Cache Configuration --------------------------- #
+CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "cache/semantic_cache.sqlite3")
+CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 3600)))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    query TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_namespace ON entries (namespace, last_access);
+CREATE TABLE IF NOT EXISTS generations (
+    namespace TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Open the cache database, creating the file and schema if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers in other workers are not blocked by writes
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _generation(conn: sqlite3.Connection, namespace: str) -> int:
+    row = conn.execute("SELECT generation FROM generations WHERE namespace = ?", (namespace,)).fetchone()
+    return row[0] if row else 0
+
+
+class SemanticCache:
+    """
+    Embedding-keyed response cache with TTL, LRU eviction and hit/miss counters.
+    Attributes:
+        namespace (str): Cache partition, normally the Qdrant collection name.
+        threshold (float): Minimum cosine similarity for a hit.
+        ttl_seconds (int): Age after which an entry is no longer served.
+        max_entries (int): Entries kept per namespace before LRU eviction.
+    """
+
+    def __init__(self, namespace: str, path: str = CACHE_PATH, threshold: float = SIMILARITY_THRESHOLD,
+                 ttl_seconds: int = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.namespace = namespace
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._generation = -1
+        self._max_id = 0  # Highest row id in the index; rows above it were written since the last sync
+        self._ids = []  # Row ids aligned with the rows of self._matrix
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._created = np.empty(0, dtype=np.float64)
+
+    # ---------------------- Index Maintenance ------------------------- #
+    def _reload_if_stale(self):
+        """
+        Sync the in-memory index with the namespace's rows, which every process sharing the file writes.
+        New rows (ids only grow) are appended; the index is rebuilt when the namespace was invalidated
+        or rows were deleted elsewhere (TTL / LRU eviction in another worker).
+        """
+        generation = _generation(self._conn, self.namespace)
+        max_id, count = self._conn.execute(
+            "SELECT COALESCE(MAX(id), 0), COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        if generation == self._generation and max_id <= self._max_id and count == len(self._ids):
+            return
+        if generation == self._generation and max_id > self._max_id:
+            self._append_rows(self._conn.execute(
+                "SELECT id, embedding, created_at FROM entries WHERE namespace = ? AND id > ? ORDER BY id",
+                (self.namespace, self._max_id),
+            ).fetchall())
+            if count == len(self._ids):
+                return
+        rows = self._conn.execute(
+            "SELECT id, embedding, created_at FROM entries WHERE namespace = ? ORDER BY id", (self.namespace,)
+        ).fetchall()
+        self._ids, self._max_id = [], 0
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._created = np.empty(0, dtype=np.float64)
+        self._append_rows(rows)
+        self._generation = generation
+
+    def _append_rows(self, rows):
+        """Add (id, embedding, created_at) rows, in id order, to the in-memory index."""
+        if not rows:
+            return
+        vectors = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        self._ids.extend(row[0] for row in rows)
+        self._matrix = np.vstack([self._matrix, vectors]) if self._matrix.size else vectors
+        self._created = np.append(self._created, [row[2] for row in rows])
+        self._max_id = max(self._max_id, rows[-1][0])
+
+    def _drop_rows(self, positions):
+        """Remove rows (by index position) from both SQLite and the in-memory index."""
+        if not positions:
+            return
+        ids = [self._ids[p] for p in positions]
+        self._conn.executemany("DELETE FROM entries WHERE id = ?", [(i,) for i in ids])
+        self._conn.commit()
+        keep = np.setdiff1d(np.arange(len(self._ids)), positions)
+        self._ids = [self._ids[p] for p in keep]
+        self._matrix = self._matrix[keep] if len(keep) else np.empty((0, 0), dtype=np.float32)
+        self._created = self._created[keep]
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # ---------------------- Public API -------------------------------- #
+    def lookup(self, embedding) -> str | None:
+        """
+        Return the cached response for the most similar query, if it clears the threshold.
+        Args:
+            embedding (list[float]): Query embedding.
+        Returns:
+            str | None: Cached response on a hit, None on a miss.
+        """
+        with self._lock:
+            self._reload_if_stale()
+            if len(self._ids):
+                expired = np.flatnonzero(self._created < time.time() - self.ttl_seconds).tolist()
+                self._drop_rows(expired)
+            if not len(self._ids):
+                self.misses += 1
+                return None
+            scores = self._matrix @ self._normalize(embedding)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            row_id = self._ids[best]
+            row = self._conn.execute("SELECT response FROM entries WHERE id = ?", (row_id,)).fetchone()
+            if row is None:  # Evicted by another worker since our last reload
+                self._drop_rows([best])
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE id = ?", (time.time(), row_id))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def store(self, query: str, embedding, response: str):
+        """
+        Cache a response, evicting the least recently used entries beyond max_entries.
+        Args:
+            query (str): Original query text (kept for inspection).
+            embedding (list[float]): Query embedding.
+            response (str): Response to serve on future hits.
+        """
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            self._reload_if_stale()
+            cursor = self._conn.execute(
+                "INSERT INTO entries (namespace, query, embedding, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, query, vector.tobytes(), response, now, now),
+            )
+            self._append_rows([(cursor.lastrowid, vector.tobytes(), now)])
+            overflow = len(self._ids) - self.max_entries
+            if overflow > 0:
+                stale = {row[0] for row in self._conn.execute(
+                    "SELECT id FROM entries WHERE namespace = ? ORDER BY last_access ASC LIMIT ?",
+                    (self.namespace, overflow),
+                )}
+                self._drop_rows([p for p, i in enumerate(self._ids) if i in stale])
+            self._conn.commit()
+
+    def invalidate(self):
+        """Drop every entry in this namespace (in all processes sharing the file)."""
+        with self._lock:
+            invalidate_namespace(self.namespace, conn=self._conn)
+            self._reload_if_stale()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters for this process.
+        Returns:
+            dict: hits, misses, hit_ratio and current entry count.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": len(self._ids),
+        }
+
+
+# ---------------------- Invalidation ---------------------------------- #
+def invalidate_namespace(namespace: str, path: str = CACHE_PATH, conn: sqlite3.Connection | None = None):
+    """
+    Delete all cached responses for a namespace and bump its generation so that
+    running processes reload their in-memory index on the next lookup.
+    Args:
+        namespace (str): Cache partition (Qdrant collection name).
+        path (str): SQLite cache file.
+        conn (sqlite3.Connection, optional): Existing connection to reuse.
+    """
+    own_conn = conn is None
+    conn = conn or _connect(path)
+    try:
+        conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+        conn.execute(
+            "INSERT INTO generations (namespace, generation) VALUES (?, 1) "
+            "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1",
+            (namespace,),
+        )
+        conn.commit()
+        logger.info("[SemanticCache] Invalidated namespace: %s", namespace)
+    finally:
+        if own_conn:
+            conn.close()
@@ -0,0 +1,81 @@
+"""
+warmup.py
+---------
+Deferred initialization with readiness tracking.
+Processes start without touching external services; the clients, models and chains are built by
+their factory functions on first use. `Warmup` runs those factories ahead of traffic, one named
+step at a time (e.g. Mongo indexes, embedding model, Qdrant, agent graph), recording each step's
+state and duration so the API can report liveness and readiness separately. Failed steps are
+retried on the next run. On shutdown `drain()` turns readiness off again, so a load balancer
+stops routing to the process while its in-flight requests finish.
+"""
+
+import os  # For environment variable access
+import threading  # Guards the step table
+import time  # Step durations
+
+from backend.logger import logger  # Custom logger
+
+# ---------------------- Warm-up Configuration ------------------------- #
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "10"))  # Between attempts at failed steps
+
+
+class Warmup:
+    """Ordered warm-up steps with per-step state: pending, running, ready or failed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = {}  # name -> callable
+        self._status = {}  # name -> {"state", "seconds", "error"}
+        self.started = time.time()
+        self.draining = False
+
+    def register(self, name: str, func):
+        """Add a step; `func` is called with no arguments and should be idempotent."""
+        with self._lock:
+            self._steps[name] = func
+            self._status[name] = {"state": "pending"}
+
+    def run(self) -> bool:
+        """
+        Run every step that is not ready yet, in registration order (blocking).
+        Returns:
+            bool: True when all steps are ready.
+        """
+        for name, func in list(self._steps.items()):
+            if self._status[name]["state"] == "ready":
+                continue
+            self._status[name] = {"state": "running"}
+            start = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                self._status[name] = {"state": "failed", "seconds": round(time.perf_counter() - start, 3),
+                                      "error": f"{type(e).__name__}: {e}"}
+                logger.error("[Warmup] %s failed: %s", name, e)
+                continue
+            self._status[name] = {"state": "ready", "seconds": round(time.perf_counter() - start, 3)}
+            logger.info("[Warmup] %s ready in %.2fs", name, self._status[name]["seconds"])
+        return self.ready()
+
+    def is_ready(self, name: str) -> bool:
+        """True when step `name` has completed."""
+        return self._status.get(name, {}).get("state") == "ready"
+
+    def ready(self) -> bool:
+        """True when every registered step has completed and the process is not shutting down."""
+        return not self.draining and all(status["state"] == "ready" for status in self._status.values())
+
+    def drain(self):
+        """Report not-ready from now on (the process is shutting down)."""
+        self.draining = True
+        logger.info("[Warmup] Draining: readiness off")
+
+    def report(self) -> dict:
+        """Readiness plus the state and duration of every step."""
+        return {"ready": self.ready(), "draining": self.draining, "uptime_s": round(time.time() - self.started, 1),
+                "steps": {name: dict(status) for name, status in self._status.items()}}
+
+
+warmup = Warmup()
@@ -0,0 +1,102 @@
+"""
+bench_answer_packs.py
+---------------------
+Latency of predictable follow-up questions with and without precomputed answer packs.
+Runs offline with the replay_sessions stand-ins (scripted LLM with a fixed latency, hash
+embeddings, in-memory Qdrant, mongomock patients from data/patient_reports.json):
+1. `precompute_answer_packs.precompute` builds the packs for every diagnosis cohort,
+2. each patient verifies (ID, then name) and asks their cohort's questions, a few questions no
+   pack covers and the patient side of NEGATIVE_QUESTION_PAIRS (dose changes, symptom reports),
+   through the real swarm graph with packs off and on; `unsafe_pack_hits` must stay 0,
+3. the collection version is bumped (as re-ingestion does) and the questions are asked again
+   to show stale packs are no longer served.
+Packs serve exact question matches unless ANSWER_PACK_SEMANTIC is on. Hash embeddings only match
+identical text, so the semantic path and its calibration need the real model to be measured.
+
+Usage:
+    python -m benchmarks.bench_answer_packs
+    python -m benchmarks.bench_answer_packs --patients 10 --llm-latency 0.5 --top-n 3
+"""
+
+import argparse  # CLI arguments
+import json  # Fixtures / results
+import os  # Scratch store path
+import tempfile  # Scratch store directory
+import time  # Turn latency
+
+os.environ.setdefault("ANSWER_PACKS_PATH", os.path.join(tempfile.mkdtemp(prefix="answer_packs_"), "packs.sqlite3"))
+
+from benchmarks.replay_sessions import install_stand_ins, percentile  # Configures the stand-ins on import
+from benchmarks.stubs import LLMCallCounter
+
+OFF_PACK_QUESTIONS = ["Is it normal to feel tired in the afternoon?", "Can I travel by plane next month?"]
+
+
+def patient_questions(patient: dict, top_n: int) -> list:
+    """The pack questions of the patient's own diagnosis and medications, then off-pack questions."""
+    from agents.precompute_answer_packs import cohorts, pack_questions
+    return [q["question"] for q in pack_questions(cohorts([patient]), top_n)] + OFF_PACK_QUESTIONS
+
+
+def unsafe_questions(patient: dict) -> list:
+    """Questions that must reach the clinical agent: the patient side of the negative pairs."""
+    from agents.precompute_answer_packs import cohorts, negative_pairs
+    return list(dict.fromkeys(question for question, _ in negative_pairs(cohorts([patient]))))
+
+
+def run(patients: list, top_n: int, enabled: bool, label: str) -> dict:
+    """Verify each patient, ask their questions and time every question turn."""
+    from agents import fast_path
+    from agents.graph_builder import get_app, make_config, new_thread_id
+
+    fast_path.ANSWER_PACKS_ENABLED = enabled
+    app, counter, hit_ms, miss_ms, unsafe_hits = get_app(), LLMCallCounter(), [], [], 0
+    for patient in patients:
+        config = make_config(new_thread_id())
+        config["callbacks"] = [*config["callbacks"], counter]
+        for message in (patient["patient_id"], patient["patient_name"]):
+            app.invoke({"messages": [{"role": "user", "content": message}]}, config)
+        for question in patient_questions(patient, top_n):
+            start = time.perf_counter()
+            result = app.invoke({"messages": [{"role": "user", "content": question}]}, config)
+            elapsed = (time.perf_counter() - start) * 1000
+            (hit_ms if result["messages"][-1].response_metadata.get("answer_pack") else miss_ms).append(elapsed)
+        for question in unsafe_questions(patient):
+            result = app.invoke({"messages": [{"role": "user", "content": question}]}, config)
+            unsafe_hits += bool(result["messages"][-1].response_metadata.get("answer_pack"))
+    turns = len(hit_ms) + len(miss_ms)
+    return {
+        "run": label, "question_turns": turns, "pack_hits": len(hit_ms),
+        "hit_share": round(len(hit_ms) / turns, 3), "llm_calls": counter.calls,
+        "hit_p50_ms": round(percentile(hit_ms, 50), 2) if hit_ms else None,
+        "other_p50_ms": round(percentile(miss_ms, 50), 2) if miss_ms else None,
+        "mean_ms": round((sum(hit_ms) + sum(miss_ms)) / turns, 2), "unsafe_pack_hits": unsafe_hits,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow-up latency with and without answer packs.")
+    parser.add_argument("--patients", type=int, default=5, help="Patients asking their cohort's questions")
+    parser.add_argument("--top-n", type=int, default=4, help="Questions per diagnosis and per medication")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Simulated seconds per LLM call")
+    parser.add_argument("--chunks", type=int, default=200, help="Synthetic reference chunks")
+    args = parser.parse_args()
+
+    with open("data/patient_reports.json", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    from backend.mongo_database import ensure_indexes, get_collection
+    get_collection().insert_many([dict(record) for record in fixtures])
+    ensure_indexes()
+    install_stand_ins(args.llm_latency, args.chunks)
+
+    from agents.precompute_answer_packs import precompute
+    from backend.answer_packs import get_answer_pack_store, record_collection_version
+    summary = precompute(fixtures, args.top_n)
+    print(json.dumps({"precompute": summary}))
+
+    patients = fixtures[:args.patients]
+    for enabled, label in ((False, "packs_off"), (True, "packs_on")):
+        print(json.dumps(run(patients, args.top_n, enabled, label)))
+    record_collection_version(summary["collection"], "reingested")  # What create_vectorstore.ingest does
+    print(json.dumps(run(patients, args.top_n, True, "after_reingest")))
+    print(json.dumps({"answer_packs": get_answer_pack_store().stats()}))
@@ -0,0 +1,115 @@
+"""
+bench_batch_answer.py
+---------------------
+Throughput of bulk follow-ups: the same (patient_id, question) pairs answered one at a time
+(record lookup, embed_query, vector search and LLM call per pair, as separate /chat requests do)
+versus `agents.batch_answer.answer_batch` (one `$in` query, one embed_documents call, one Qdrant
+batch request, bounded LLM concurrency).
+Runs offline with the replay_sessions stand-ins (mongomock, in-memory Qdrant, hash embeddings and
+a fake LLM with a fixed latency). Reports wall time, pairs/s and the number of Mongo, embedding and
+Qdrant calls per mode.
+
+Usage:
+    python -m benchmarks.bench_batch_answer
+    python -m benchmarks.bench_batch_answer --pairs 500 --questions 5 --llm-latency 0.5 --concurrency 16
+"""
+
+import argparse  # CLI arguments
+import asyncio  # Batch mode
+import json  # Fixtures / results
+import random  # Pair sampling
+import time  # Wall time
+
+from langchain_core.documents import Document
+
+from benchmarks.replay_sessions import install_stand_ins  # Configures the stand-ins on import
+from backend import resources  # Shared embeddings / Qdrant client
+from backend.metrics import STAGE_SECONDS, metrics_handler  # Call counts per stage
+
+QUESTIONS = [
+    "Is the swelling in my legs something to worry about?",
+    "Can I take ibuprofen for pain with my kidney condition?",
+    "How much fluid should I drink each day?",
+    "Which foods high in potassium should I avoid?",
+    "What blood pressure reading should make me call the clinic?",
+    "When should my creatinine be checked again?",
+]
+
+
+def stage_calls() -> dict:
+    """Observations so far of the stages the two modes differ in."""
+    counts = {}
+    for metric in STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count"):
+                key = f"{sample.labels['stage']}:{sample.labels['name']}"
+                counts[key] = counts.get(key, 0) + int(sample.value)
+    return counts
+
+
+def calls_since(before: dict) -> dict:
+    after = stage_calls()
+    return {key: after[key] - before.get(key, 0) for key in after if after[key] != before.get(key, 0)}
+
+
+def answer_serially(pairs: list) -> list:
+    """One pair at a time, with the per-request lookups a /chat turn makes."""
+    from agents.batch_answer import batch_prompt
+    from agents.clinical_agent.rag.context_builder import build_context
+    from agents.llm_model import get_llm
+    from agents.prompt_context import patient_context
+    from backend.metrics import stage_timer
+    from backend.patient_cache import patient_cache
+
+    answers = []
+    for pair in pairs:
+        patient = patient_cache.get_by_id(pair["patient_id"])
+        vector = resources.get_embeddings().embed_query(pair["question"])
+        with stage_timer("qdrant", "query"):
+            points = resources.get_qdrant_client().query_points(resources.COLLECTION_NAME, query=vector, limit=4,
+                                                                with_payload=True).points
+        docs = [Document(page_content=p.payload.get("page_content", ""), metadata=p.payload.get("metadata") or {})
+                for p in points]
+        prompt = batch_prompt.format(
+            patient=patient_context({"patient": patient, "patient_id": pair["patient_id"],
+                                     "patient_name": patient["patient_name"]}),
+            context=build_context(pair["question"], docs), question=pair["question"])
+        answers.append(get_llm().invoke(prompt, {"callbacks": [metrics_handler]}).content)
+    return answers
+
+
+async def answer_in_batch(pairs: list, concurrency: int) -> list:
+    from agents.batch_answer import answer_batch
+    return [result async for result in answer_batch(pairs, concurrency)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serial vs batched answering of follow-up questions.")
+    parser.add_argument("--pairs", type=int, default=200, help="(patient_id, question) pairs")
+    parser.add_argument("--questions", type=int, default=3, help="Distinct questions sent across patients")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Simulated seconds per LLM call")
+    parser.add_argument("--concurrency", type=int, default=8, help="Batch LLM concurrency")
+    parser.add_argument("--chunks", type=int, default=200, help="Synthetic reference chunks in Qdrant")
+    args = parser.parse_args()
+
+    with open("data/patient_reports.json", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    from backend.mongo_database import get_collection
+    from backend.patient_cache import patient_cache
+    get_collection().insert_many([dict(record) for record in fixtures])
+    install_stand_ins(args.llm_latency, args.chunks)
+    rng = random.Random(0)
+    pairs = [{"patient_id": rng.choice(fixtures)["patient_id"], "question": QUESTIONS[i % args.questions]}
+             for i in range(args.pairs)]
+
+    results = {}
+    for mode, run in (("serial", lambda: answer_serially(pairs)),
+                      ("batch", lambda: asyncio.run(answer_in_batch(pairs, args.concurrency)))):
+        patient_cache.clear()
+        before, start = stage_calls(), time.perf_counter()
+        answers = run()
+        elapsed = time.perf_counter() - start
+        results[mode] = {"mode": mode, "pairs": len(answers), "seconds": round(elapsed, 2),
+                         "pairs_per_s": round(len(answers) / elapsed, 2), "calls": calls_since(before)}
+        print(json.dumps(results[mode]))
+    print(f"Speed-up: {results['serial']['seconds'] / results['batch']['seconds']:.1f}x")
@@ -0,0 +1,212 @@
+"""
+bench_chunking.py
+-----------------
+Recursive per-page splitting versus the layout chunker (`create_vectorstore.py --chunker`):
+vector count, estimated index size, ingestion time and answer recall.
+
+By default a synthetic handbook is generated: chapters, sections and bold subsections in larger
+or bolder fonts, a running header and page numbers, a dose table per chapter, and body text that
+flows across page breaks. Sections are roughly 150-350 words, like a handbook's subsections. Every section states one drug's starting dose near its start and its
+maximum dose near its end, and is asked "What are the starting and maximum doses of <drug>?".
+Answer recall@k is the share of questions whose top-k chunks contain both numbers, so it shows
+whether the chunks keep a section's facts together. Retrieval is a term-overlap ranker by
+default (offline, no model), or the real embedding model with --live.
+
+Ingestion runs `create_vectorstore.ingest` into an in-memory Qdrant (hash embeddings unless
+--live). The index size estimate is dense vectors (4 bytes per dimension) plus payload JSON.
+
+Usage:
+    python -m benchmarks.bench_chunking
+    python -m benchmarks.bench_chunking --chapters 12 --sections 8 --k 1
+    python -m benchmarks.bench_chunking --data-dir data --live   (vector counts / size / time for real PDFs)
+"""
+
+import argparse  # CLI arguments
+import json  # Payload size / results
+import os  # File paths
+import random  # Synthetic text
+import re  # Term-overlap ranker
+import tempfile  # Scratch directory for the synthetic PDF
+
+import fitz  # PyMuPDF, to write the synthetic handbook
+from qdrant_client import QdrantClient  # In-memory Qdrant
+
+from agents.clinical_agent.rag.create_vectorstore import discover_pdfs, extract_and_chunk_pdf, ingest
+from benchmarks.stubs import HashEmbeddings  # Model-free embeddings
+
+WORDS = ("kidney renal creatinine dialysis nephron glomerular proteinuria hypertension sodium potassium "
+         "phosphate albumin transplant biopsy tubular electrolyte diuretic edema urine filtration clearance "
+         "anemia acidosis calcium vitamin fluid pressure medication patient treatment monitoring").split()
+CHUNKERS = ("recursive", "layout")
+
+
+# ---------------------- Synthetic Handbook ---------------------------- #
+class HandbookWriter:
+    """Writes flowing text onto pages with a running header and page numbers."""
+
+    MARGIN, WIDTH, HEIGHT = 50, 595, 842
+
+    def __init__(self):
+        self.doc = fitz.open()
+        self.page, self.y = None, 0
+        self.new_page()
+
+    def new_page(self):
+        self.page = self.doc.new_page(width=self.WIDTH, height=self.HEIGHT)
+        self.page.insert_text((self.MARGIN, 30), "Handbook of Nephrology Practice", fontsize=8)
+        self.page.insert_text((self.WIDTH / 2, self.HEIGHT - 25), str(len(self.doc)), fontsize=8)
+        self.y = 70
+
+    def write(self, text: str, fontsize: float = 9, bold: bool = False, gap: float = 5):
+        """Write a paragraph, continuing on the next page when the current one is full."""
+        font = "hebo" if bold else "helv"
+        width = self.WIDTH - 2 * self.MARGIN
+        line, lines = "", []
+        for word in text.split():
+            candidate = f"{line} {word}".strip()
+            if fitz.get_text_length(candidate, font, fontsize) > width and line:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+        for line in lines:
+            if self.y + fontsize * 1.3 > self.HEIGHT - 60:
+                self.new_page()
+            self.page.insert_text((self.MARGIN, self.y + fontsize), line, fontsize=fontsize, fontname=font)
+            self.y += fontsize * 1.3
+        self.y += gap
+
+    def table(self, rows: list):
+        """Draw a ruled table (header row first)."""
+        height = 16 * len(rows)
+        self.y += 12
+        if self.y + height > self.HEIGHT - 60:
+            self.new_page()
+        column = (self.WIDTH - 2 * self.MARGIN) / len(rows[0])
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row):
+                rect = fitz.Rect(self.MARGIN + c * column, self.y + r * 16, self.MARGIN + (c + 1) * column,
+                                 self.y + (r + 1) * 16)
+                self.page.draw_rect(rect, width=0.5)
+                self.page.insert_text((rect.x0 + 3, rect.y1 - 4), cell, fontsize=8,
+                                      fontname="hebo" if r == 0 else "helv")
+        self.y += height + 10
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 18))).capitalize() + "."
+
+
+def write_handbook(path: str, chapters: int, sections: int, seed: int = 0) -> list:
+    """Write the synthetic handbook; returns one {'question', 'answers'} case per section."""
+    rng = random.Random(seed)
+    writer, cases = HandbookWriter(), []
+    for chapter in range(1, chapters + 1):
+        writer.write(f"Chapter {chapter}: {rng.choice(WORDS).capitalize()} disorders", fontsize=18, bold=True, gap=10)
+        dose_rows = [["Drug", "Start (mg)", "Max (mg)"]]
+        for section in range(1, sections + 1):
+            drug = f"nephrazol{chapter}x{section}"
+            start, maximum = rng.randint(5, 95), rng.randint(100, 900)
+            dose_rows.append([drug, str(start), str(maximum)])
+            writer.write(f"{chapter}.{section} Management with {drug}", fontsize=14, bold=True)
+            writer.write(f"{drug.capitalize()} is started at {start} mg once daily. "
+                         + " ".join(_sentence(rng) for _ in range(3)))
+            for paragraph in range(rng.randint(1, 3)):
+                if paragraph == 1:
+                    writer.write("Monitoring", bold=True, gap=2)
+                writer.write(" ".join(_sentence(rng) for _ in range(rng.randint(2, 4))))
+            writer.write(" ".join(_sentence(rng) for _ in range(2))
+                         + f" The maximum dose of {drug} is {maximum} mg per day.")
+            cases.append({"question": f"What are the starting and maximum doses of {drug}?",
+                          "answers": [f"{start} mg", f"{maximum} mg"], "chapter": chapter})
+        writer.table(dose_rows)
+    writer.doc.save(path)
+    writer.doc.close()
+    return cases
+
+
+# ---------------------- Measurement ----------------------------------- #
+def term_ranker(chunks: list):
+    """`question -> chunks` ranked by occurrences of the question's words (stand-in for vector search)."""
+    lowered = [chunk["text"].lower() for chunk in chunks]
+
+    def search(question: str, k: int) -> list:
+        needles = [w for w in re.findall(r"\w+", question.lower()) if len(w) > 3]
+        scores = [sum(text.count(needle) for needle in needles) for text in lowered]
+        return [chunks[i] for i in sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)[:k]]
+
+    return search
+
+
+def vector_ranker(client: QdrantClient, collection: str, embeddings):
+    """`question -> chunks` from the ingested collection."""
+    def search(question: str, k: int) -> list:
+        points = client.query_points(collection, query=embeddings.embed_query(question), limit=k,
+                                     with_payload=True).points
+        return [{"text": point.payload["page_content"], "metadata": point.payload["metadata"]} for point in points]
+
+    return search
+
+
+def answer_recall(cases: list, search, k: int) -> float:
+    """Share of questions whose top-k chunks contain every expected answer string."""
+    hits = 0
+    for case in cases:
+        text = "\n".join(chunk["text"] for chunk in search(case["question"], k))
+        hits += all(answer in text for answer in case["answers"])
+    return round(hits / len(cases), 3)
+
+
+def run(data_dir: str, cases: list, k: int, live: bool) -> list:
+    """Chunk and ingest `data_dir` with each chunker; returns one result per chunker."""
+    from concurrent.futures import ProcessPoolExecutor
+    embeddings = HashEmbeddings()
+    if live:
+        from backend.resources import get_embeddings
+        embeddings = get_embeddings()
+    dimension = len(embeddings.embed_query("size"))
+    results = []
+    for chunker in CHUNKERS:
+        with ProcessPoolExecutor() as executor:
+            chunks = [chunk for path in discover_pdfs(data_dir)
+                      for chunk in extract_and_chunk_pdf(path, executor, os.path.basename(path), chunker)]
+        client = QdrantClient(":memory:")
+        stats = ingest(data_dir, client, embeddings, f"bench_{chunker}", chunker=chunker)
+        payload_bytes = sum(len(json.dumps({"page_content": c["text"], "metadata": c["metadata"]})) for c in chunks)
+        result = {
+            "chunker": chunker,
+            "vectors": stats["chunks"],
+            "mean_chunk_chars": round(sum(len(c["text"]) for c in chunks) / max(len(chunks), 1)),
+            "index_mb": round((stats["chunks"] * dimension * 4 + payload_bytes) / 1e6, 2),
+            "ingest_seconds": stats["total_seconds"],
+            "table_chunks": sum(c["metadata"].get("kind") == "table" for c in chunks),
+        }
+        if cases:
+            search = vector_ranker(client, f"bench_{chunker}", embeddings) if live else term_ranker(chunks)
+            result[f"answer_recall@{k}"] = answer_recall(cases, search, k)
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recursive vs layout-aware chunking.")
+    parser.add_argument("--data-dir", help="Existing PDFs to chunk instead of the synthetic handbook (no recall)")
+    parser.add_argument("--chapters", type=int, default=8, help="Synthetic chapters")
+    parser.add_argument("--sections", type=int, default=6, help="Sections per synthetic chapter")
+    parser.add_argument("--k", type=int, default=2, help="Chunks retrieved per question")
+    parser.add_argument("--live", action="store_true", help="Embed with the real model and search Qdrant")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        data_dir, cases = args.data_dir, []
+        if data_dir is None:
+            data_dir = scratch
+            cases = write_handbook(os.path.join(scratch, "handbook.pdf"), args.chapters, args.sections)
+        results = run(data_dir, cases, args.k, args.live)
+    for result in results:
+        print(json.dumps(result))
+    before, after = results
+    print(f"Vectors: {before['vectors']} -> {after['vectors']} "
+          f"({1 - after['vectors'] / max(before['vectors'], 1):.0%} fewer), "
+          f"index {before['index_mb']} -> {after['index_mb']} MB")
@@ -0,0 +1,101 @@
+"""
+bench_cold_start.py
+-------------------
+Measures worker cold-start time and per-worker memory for the embedding model, with and without
+preloading in a pre-fork master (Linux only: uses os.fork and /proc).
+
+- lazy:    each forked worker loads the model itself (the previous behaviour, one load per worker)
+- preload: the master calls backend.resources.preload() once; workers reuse the pages copy-on-write
+
+RSS counts shared pages in every worker; PSS splits shared pages between the processes sharing
+them, so the PSS total is the real memory cost of N workers.
+Each worker's first embedding runs under a deadline (`--timeout`): a worker that hangs on a model
+session inherited from the master (e.g. an onnxruntime thread pool lost across fork) fails the run.
+
+Usage:
+    python -m benchmarks.bench_cold_start --workers 4
+    EMBEDDING_MODEL_NAME=BAAI/bge-small-en-v1.5 python -m benchmarks.bench_cold_start --workers 2
+"""
+
+import argparse  # CLI arguments
+import json  # Child -> parent results
+import os  # fork / pipes
+import signal  # Worker deadline
+import time  # Timing
+
+from backend import resources  # Registry under test
+
+
+def memory_mb() -> tuple:
+    """(RSS, PSS) of this process in MB, from /proc/self/smaps_rollup."""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0]) / 1024
+    return values.get("Rss", 0.0), values.get("Pss", 0.0)
+
+
+def worker(write_fd: int, timeout_s: int):
+    """Child process: obtain the model, embed once (first request), report timings and memory."""
+    signal.alarm(timeout_s)  # A hung embed kills the worker; the parent sees no result
+    try:
+        start = time.perf_counter()
+        resources.get_embeddings().embed_query("What are the symptoms of kidney failure?")
+        ready_s = time.perf_counter() - start
+        signal.alarm(0)
+        time.sleep(1)  # Let siblings finish loading so PSS reflects the steady state
+        rss, pss = memory_mb()
+        result = {"ready_s": ready_s, "rss_mb": rss, "pss_mb": pss}
+    except Exception as e:
+        result = {"error": repr(e)}
+    os.write(write_fd, json.dumps(result).encode())
+    os._exit(0)  # Never fall through into the parent's code
+
+
+def run_mode(mode: str, workers: int, timeout_s: int) -> dict:
+    """Fork `workers` children (after preloading in this process when mode == 'preload')."""
+    master_start = time.perf_counter()
+    if mode == "preload":
+        resources.preload()
+    preload_s = time.perf_counter() - master_start
+
+    pipes = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        if os.fork() == 0:
+            os.close(read_fd)
+            worker(write_fd, timeout_s)
+        os.close(write_fd)
+        pipes.append(read_fd)
+
+    results = []
+    for read_fd in pipes:
+        with os.fdopen(read_fd) as f:
+            payload = f.read()
+        results.append(json.loads(payload) if payload else
+                       {"error": f"no result within {timeout_s}s (hung on its first embedding?)"})
+        os.wait()
+    errors = [r["error"] for r in results if "error" in r]
+    if errors:
+        raise RuntimeError(f"{len(errors)} worker(s) failed: {errors[0]}")
+    return {
+        "mode": mode,
+        "master_preload_s": round(preload_s, 2),
+        "worker_ready_s_avg": round(sum(r["ready_s"] for r in results) / workers, 3),
+        "worker_rss_mb_avg": round(sum(r["rss_mb"] for r in results) / workers, 1),
+        "worker_pss_mb_avg": round(sum(r["pss_mb"] for r in results) / workers, 1),
+        "workers_pss_mb_total": round(sum(r["pss_mb"] for r in results), 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start / per-worker memory benchmark for the embedding model.")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes to fork")
+    parser.add_argument("--mode", choices=["lazy", "preload", "both"], default="both")
+    parser.add_argument("--timeout", type=int, default=120, help="Seconds a worker may take to load and embed")
+    args = parser.parse_args()
+    modes = ["lazy", "preload"] if args.mode == "both" else [args.mode]
+    for mode in modes:  # 'lazy' first: preloading would leave the model in this process
+        print(json.dumps(run_mode(mode, args.workers, args.timeout)))
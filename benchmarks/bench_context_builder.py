@@ -0,0 +1,147 @@
+"""
+bench_context_builder.py
+------------------------
+Input tokens and latency of the RAG prompt with the previous "stuff" context (retrieved chunks
+joined as-is) versus `context_builder.build_context`, on the fixed question set in
+benchmarks/data/retrieval_eval.jsonl.
+
+Offline (default): a synthetic reference is built with one page per question that mentions the
+question's `relevant_terms`, plus distractor pages, chunked with the ingestion settings
+(2500 chars, 700 overlap) and searched with a simple term-overlap retriever. This shows the
+overlap structure of real retrievals without Qdrant or a model download.
+With --live, chunks come from the configured retriever (Qdrant + FastEmbed) and both prompts are
+sent to the LLM, recording its reported input tokens and latency.
+
+Reports per mode: mean / p50 prompt tokens, term recall (share of questions whose context still
+contains a relevant term), context build time and, live, LLM latency.
+
+Usage:
+    python -m benchmarks.bench_context_builder
+    python -m benchmarks.bench_context_builder --max-tokens 1000 --k 6
+    python -m benchmarks.bench_context_builder --live
+"""
+
+import argparse  # CLI arguments
+import json  # Eval set / results
+import random  # Synthetic reference text
+import re  # Term-overlap retriever
+import statistics  # Means / percentiles
+import time  # Latency
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter  # Same splitter as ingestion
+
+from agents.clinical_agent.rag.context_builder import build_context, estimate_tokens  # Under test
+from agents.clinical_agent.rag.create_vectorstore import Config  # Chunk size / overlap
+from benchmarks.eval_retrieval_recall import DEFAULT_EVAL_FILE, load_eval_set  # Fixed question set
+
+WORDS = ("kidney renal creatinine dialysis nephron glomerular proteinuria hypertension sodium potassium "
+         "phosphate albumin transplant biopsy tubular electrolyte diuretic edema urine filtration clearance "
+         "anemia acidosis calcium vitamin fluid pressure medication dose patient treatment").split()
+
+
+# ---------------------- Offline Reference ----------------------------- #
+def _sentence(rng: random.Random, extra: str = "") -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(10, 18))]
+    if extra:
+        words.insert(rng.randrange(len(words)), extra)
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_chunks(cases: list, distractor_pages: int, seed: int = 0) -> list[Document]:
+    """One ~6000-char page per question with its terms planted, plus distractor pages, chunked like ingestion."""
+    rng = random.Random(seed)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=Config.CHUNK_SIZE, chunk_overlap=Config.CHUNK_OVERLAP)
+    pages = []
+    for case in cases:
+        terms = case.get("relevant_terms", [])
+        pages.append(" ".join(_sentence(rng, rng.choice(terms) if terms and rng.random() < 0.15 else "")
+                              for _ in range(70)))
+    pages += [" ".join(_sentence(rng) for _ in range(70)) for _ in range(distractor_pages)]
+    return [Document(page_content=chunk, metadata={"source": "synthetic.pdf", "page": page})
+            for page, text in enumerate(pages) for chunk in splitter.split_text(text)]
+
+
+def term_retriever(chunks: list[Document], k: int):
+    """`question -> top-k chunks` by occurrences of the question's words (stand-in for vector search)."""
+    lowered = [chunk.page_content.lower() for chunk in chunks]
+
+    def search(question: str, terms: list) -> list[Document]:
+        needles = [w for w in re.findall(r"\w+", question.lower()) if len(w) > 3] + [t.lower() for t in terms]
+        scores = [sum(text.count(needle) for needle in needles) for text in lowered]
+        ranked = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)
+        return [chunks[i] for i in ranked[:k]]
+
+    return search
+
+
+# ---------------------- Measurement ----------------------------------- #
+def stuff_context(question: str, docs: list[Document]) -> str:
+    """The previous RetrievalQA 'stuff' context: chunk texts joined with blank lines."""
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def run(cases: list, retrieve, max_tokens: int, llm=None) -> dict:
+    """Build both contexts for every question (and call the LLM when given); returns per-mode results."""
+    from agents.clinical_agent.tools.rag_tool import prompt_template  # Production prompt
+
+    builders = {"stuff": stuff_context, "context_builder": lambda q, docs: build_context(q, docs, max_tokens)}
+    samples = {mode: {"tokens": [], "build_ms": [], "recall": 0, "llm_ms": [], "llm_input_tokens": []}
+               for mode in builders}
+    for case in cases:
+        question, terms = case["question"], case.get("relevant_terms", [])
+        docs = retrieve(question, terms)
+        for mode, builder in builders.items():
+            start = time.perf_counter()
+            context = builder(question, docs)
+            sample = samples[mode]
+            sample["build_ms"].append((time.perf_counter() - start) * 1000)
+            prompt = prompt_template.format(context=context, question=question)
+            sample["tokens"].append(estimate_tokens(prompt))
+            sample["recall"] += any(term.lower() in context.lower() for term in terms)
+            if llm is not None:
+                start = time.perf_counter()
+                message = llm.invoke(prompt)
+                sample["llm_ms"].append((time.perf_counter() - start) * 1000)
+                sample["llm_input_tokens"].append((message.usage_metadata or {}).get("input_tokens", 0))
+    results = {}
+    for mode, sample in samples.items():
+        results[mode] = {
+            "mean_prompt_tokens": round(statistics.fmean(sample["tokens"]), 1),
+            "p50_prompt_tokens": statistics.median(sample["tokens"]),
+            "term_recall": round(sample["recall"] / len(cases), 3),
+            "mean_build_ms": round(statistics.fmean(sample["build_ms"]), 3),
+        }
+        if sample["llm_ms"]:
+            results[mode]["mean_llm_input_tokens"] = round(statistics.fmean(sample["llm_input_tokens"]), 1)
+            results[mode]["p50_llm_ms"] = round(statistics.median(sample["llm_ms"]), 1)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG prompt size: stuffed chunks vs the context builder.")
+    parser.add_argument("--eval-file", default=DEFAULT_EVAL_FILE, help="Question set (JSONL)")
+    parser.add_argument("--k", type=int, default=4, help="Chunks retrieved per question (offline)")
+    parser.add_argument("--max-tokens", type=int, default=1500, help="Context builder token budget")
+    parser.add_argument("--distractors", type=int, default=40, help="Distractor pages (offline)")
+    parser.add_argument("--live", action="store_true", help="Use the configured retriever and call the LLM")
+    args = parser.parse_args()
+
+    cases = load_eval_set(args.eval_file)
+    if args.live:
+        from agents.clinical_agent.tools.rag_tool import get_retriever
+        from agents.llm_model import get_llm
+        retriever = get_retriever()
+        results = run(cases, lambda question, terms: retriever.invoke(question), args.max_tokens, llm=get_llm())
+    else:
+        retrieve = term_retriever(synthetic_chunks(cases, args.distractors), args.k)
+        results = run(cases, retrieve, args.max_tokens)
+
+    for mode, result in results.items():
+        print(json.dumps({"mode": mode, "questions": len(cases), **result}))
+    before, after = results["stuff"], results["context_builder"]
+    print(f"Prompt tokens: {before['mean_prompt_tokens']} -> {after['mean_prompt_tokens']} "
+          f"({1 - after['mean_prompt_tokens'] / before['mean_prompt_tokens']:.0%} fewer), "
+          f"term recall {before['term_recall']} -> {after['term_recall']}")
+    if "p50_llm_ms" in before:
+        print(f"LLM p50 latency: {before['p50_llm_ms']}ms -> {after['p50_llm_ms']}ms")
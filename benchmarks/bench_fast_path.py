@@ -0,0 +1,87 @@
+"""
+bench_fast_path.py
+------------------
+Replays scripted patient conversations through the swarm graph with the fast-path router on and
+off, using stub agents (simulated LLM latency) and mongomock patients from
+data/patient_reports.json. Reports LLM calls, turn latency, the share of turns that skipped the
+LLM and the latency saved.
+
+Usage:
+    python -m benchmarks.bench_fast_path
+    python -m benchmarks.bench_fast_path --llm-latency 0.8 --patients 5
+"""
+
+import argparse  # CLI arguments
+import json  # Patient fixtures / results
+import time  # Turn latency
+
+import mongomock  # In-memory MongoDB
+import pymongo
+
+pymongo.MongoClient = mongomock.MongoClient  # Before backend.mongo_database connects
+
+from langgraph.checkpoint.memory import InMemorySaver  # Per-run conversation state
+from langgraph.prebuilt import create_react_agent  # Stub agents
+from langgraph_swarm import create_handoff_tool  # Same handoff tools as production
+
+from agents import fast_path  # Router under test
+from backend.mongo_database import ensure_indexes, get_collection  # Mocked patient collection
+from benchmarks.stubs import FakeToolCallingLLM, LLMCallCounter, stub_lookup_tool  # Simulated LLM / tool
+
+SCRIPT = ["Hi, I was discharged last week", "{patient_id}", "{patient_name}",
+          "What medication dose should I take for the swelling?", "When is my follow-up appointment?"]
+
+
+def build_app(llm_latency: float):
+    """Swarm graph with stub receptionist and clinical agents."""
+    llm = FakeToolCallingLLM(latency_s=llm_latency)
+    receptionist = create_react_agent(
+        llm, [stub_lookup_tool, create_handoff_tool(agent_name=fast_path.CLINICAL)], name=fast_path.RECEPTIONIST)
+    clinical = create_react_agent(
+        llm, [stub_lookup_tool, create_handoff_tool(agent_name=fast_path.RECEPTIONIST)], name=fast_path.CLINICAL)
+    return fast_path.build_swarm_graph([receptionist, clinical]).compile(checkpointer=InMemorySaver())
+
+
+def run(patients: list, llm_latency: float, enabled: bool) -> dict:
+    """Replay the script for every patient; returns turn count, LLM calls and latency."""
+    fast_path.FAST_PATH_ENABLED = enabled
+    fast_path.fast_path_stats = stats = fast_path.FastPathStats()
+    app, counter, latencies = build_app(llm_latency), LLMCallCounter(), []
+    for patient in patients:
+        config = {"configurable": {"thread_id": f"{enabled}-{patient['patient_id']}"}, "callbacks": [counter]}
+        for template in SCRIPT:
+            message = template.format(**patient)
+            start = time.perf_counter()
+            result = app.invoke({"messages": [{"role": "user", "content": message}]}, config)
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            if not result["messages"][-1].response_metadata.get("fast_path"):
+                stats.record_llm_turn(elapsed)
+    return {
+        "fast_path": enabled,
+        "turns": len(latencies),
+        "llm_calls": counter.calls,
+        "turn_ms_avg": round(sum(latencies) * 1000 / len(latencies), 1),
+        "total_s": round(sum(latencies), 2),
+        **({"router": stats.stats()} if enabled else {}),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fast-path router benchmark with stub agents.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Simulated seconds per LLM call")
+    parser.add_argument("--patients", type=int, default=5, help="Scripted conversations to replay")
+    args = parser.parse_args()
+
+    with open("data/patient_reports.json", encoding="utf-8") as f:
+        fixtures = json.load(f)[:args.patients]
+    get_collection().insert_many([dict(record) for record in fixtures])
+    ensure_indexes()
+
+    baseline = run(fixtures, args.llm_latency, enabled=False)
+    routed = run(fixtures, args.llm_latency, enabled=True)
+    print(json.dumps(baseline))
+    print(json.dumps(routed))
+    print(f"Skipped LLM on {routed['router']['skipped_llm_share']:.0%} of turns; "
+          f"LLM calls {baseline['llm_calls']} -> {routed['llm_calls']}; "
+          f"total latency saved {baseline['total_s'] - routed['total_s']:.2f}s")
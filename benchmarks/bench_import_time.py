@@ -0,0 +1,79 @@
+"""
+bench_import_time.py
+--------------------
+Startup import cost. Imports each entry-point module in a fresh interpreter with
+`python -X importtime`, repeated, and reports the median cumulative import time plus the modules
+with the highest self time. Importing must not connect to MongoDB or Qdrant, load models, or build
+the agent graph (that happens in factories / warm-up), so the budget only covers Python imports.
+Exits non-zero when a module's median exceeds `--budget-ms`, so it can guard startup time in CI.
+
+Usage:
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --runs 5 --budget-ms 2500
+    python -m benchmarks.bench_import_time --module agents.graph_builder --top 25
+"""
+
+import argparse  # CLI arguments
+import json  # Results
+import re  # -X importtime lines
+import statistics  # Medians
+import subprocess  # Fresh interpreter per run
+import sys
+
+ENTRY_POINTS = ["agents.graph_builder", "app.main_api"]
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)")
+
+
+def import_profile(module: str) -> tuple[float, dict]:
+    """
+    Import `module` in a new interpreter.
+    Returns:
+        tuple[float, dict]: Cumulative import time of the module (ms) and self time per module (ms).
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    total, self_ms = 0.0, {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, name = match.groups()
+        self_ms[name] = int(self_us) / 1000
+        if name == module:
+            total = int(cumulative_us) / 1000
+    return total, self_ms
+
+
+def measure(module: str, runs: int, top: int) -> dict:
+    """Median cumulative import time of `module` over `runs` interpreters and its slowest imports."""
+    totals, self_times = [], {}
+    for _ in range(runs):
+        total, self_ms = import_profile(module)
+        totals.append(total)
+        for name, ms in self_ms.items():
+            self_times.setdefault(name, []).append(ms)
+    slowest = sorted(((statistics.median(v), k) for k, v in self_times.items()), reverse=True)[:top]
+    return {"module": module, "runs": runs, "median_ms": round(statistics.median(totals), 1),
+            "max_ms": round(max(totals), 1), "modules_imported": len(self_times),
+            "slowest_self_ms": {name: round(ms, 1) for ms, name in slowest}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure entry-point import time with -X importtime.")
+    parser.add_argument("--module", action="append", help="Module to import (repeatable; default: entry points)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules (self time) to list")
+    parser.add_argument("--budget-ms", type=float, default=2500, help="Maximum median import time per module")
+    args = parser.parse_args()
+
+    over = []
+    for module in args.module or ENTRY_POINTS:
+        result = measure(module, args.runs, args.top)
+        print(json.dumps(result))
+        if result["median_ms"] > args.budget_ms:
+            over.append(f"{module} {result['median_ms']}ms")
+    if over:
+        sys.exit(f"Over the {args.budget_ms:.0f}ms import budget: " + "; ".join(over))
+    print(f"All entry points import within {args.budget_ms:.0f}ms")
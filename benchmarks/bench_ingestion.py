@@ -0,0 +1,74 @@
+"""
+bench_ingestion.py
+------------------
+Chunks/second benchmark for the vectorstore ingestion pipeline.
+Generates synthetic PDFs (or uses a real directory), then runs three passes against an in-memory
+Qdrant: a full build, an unchanged re-run (nothing should be embedded), and a re-run after one
+PDF is rewritten (only its chunks should be embedded).
+
+Usage:
+    python -m benchmarks.bench_ingestion --pdfs 3 --pages 200
+    python -m benchmarks.bench_ingestion --data-dir data --fake-embeddings
+"""
+
+import argparse  # CLI arguments
+import os  # File paths
+import random  # Synthetic text
+import tempfile  # Scratch directory for synthetic PDFs
+
+import fitz  # PyMuPDF, to write synthetic PDFs
+from qdrant_client import QdrantClient  # In-memory Qdrant
+
+from agents.clinical_agent.rag.create_vectorstore import ingest  # Pipeline under test
+from backend.resources import get_embeddings  # Shared FastEmbed model
+from benchmarks.stubs import HashEmbeddings  # Model-free embeddings
+
+WORDS = ("kidney renal creatinine eGFR dialysis nephron glomerular proteinuria hypertension sodium "
+         "potassium phosphate albumin transplant biopsy tubular electrolyte diuretic edema urine").split()
+
+
+def write_pdf(path: str, pages: int, seed: int):
+    """Write a PDF with `pages` pages of pseudo-medical text."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        text = "\n".join(" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(45))
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def report(label: str, stats: dict):
+    print(f"{label:<22} chunks={stats['chunks']:6d} embedded={stats['embedded']:6d} "
+          f"deleted={stats['deleted']:5d} extract={stats['extract_seconds']:6.2f}s "
+          f"total={stats['total_seconds']:6.2f}s -> {stats['chunks_per_second']:8.1f} chunks/s")
+
+
+def run(data_dir: str | None, pdfs: int, pages: int, workers: int, fake_embeddings: bool):
+    """Run full, unchanged and one-file-changed passes."""
+    embeddings = HashEmbeddings() if fake_embeddings else get_embeddings()
+
+    client = QdrantClient(":memory:")
+    with tempfile.TemporaryDirectory() as scratch:
+        if data_dir is None:
+            data_dir = scratch
+            for n in range(pdfs):
+                write_pdf(os.path.join(data_dir, f"reference_{n}.pdf"), pages, seed=n)
+
+        report("full build", ingest(data_dir, client, embeddings, "bench", workers))
+        report("unchanged re-run", ingest(data_dir, client, embeddings, "bench", workers))
+        if data_dir == scratch:
+            write_pdf(os.path.join(data_dir, "reference_0.pdf"), pages, seed=1000)
+            report("one PDF changed", ingest(data_dir, client, embeddings, "bench", workers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vectorstore ingestion throughput.")
+    parser.add_argument("--data-dir", default=None, help="Directory of real PDFs (default: synthetic)")
+    parser.add_argument("--pdfs", type=int, default=3, help="Synthetic PDFs to generate")
+    parser.add_argument("--pages", type=int, default=200, help="Pages per synthetic PDF")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Extraction processes")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use hash embeddings instead of FastEmbed")
+    args = parser.parse_args()
+    run(args.data_dir, args.pdfs, args.pages, args.workers, args.fake_embeddings)
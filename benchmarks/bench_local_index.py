@@ -0,0 +1,176 @@
+"""
+bench_local_index.py
+--------------------
+Query latency, recall and memory of the memory-mapped local index (VECTOR_BACKEND=local) against
+Qdrant, on the same vectors:
+- qdrant: a Qdrant server (--qdrant-url), or Qdrant's local ':memory:' mode when no server is given
+- local_float16 / local_int8: brute force over the memory-mapped matrix
+- local_int8_ivf: int8 with an IVF partition, searching --nprobe lists per query
+Recall@k is measured against exact float32 search in NumPy. Latency is per single query from
+Python (including the payload read), so it is comparable with a /chat turn's vector search.
+
+The worker test starts --workers processes that each open the float16 index and run queries, then
+reads the index file mappings from /proc/self/smaps: every worker's RSS includes the whole
+matrix, while PSS (RSS divided among the processes sharing each page) shows the pages are shared.
+
+Usage:
+    python -m benchmarks.bench_local_index
+    python -m benchmarks.bench_local_index --points 200000 --dim 768 --qdrant-url http://localhost:6333
+"""
+
+import argparse  # CLI arguments
+import json  # Results
+import multiprocessing  # Worker processes sharing the index
+import os  # Index size / smaps
+import statistics  # Mean recall
+import tempfile  # Scratch index directory
+import time  # Latency / build time
+
+import numpy as np  # Ground truth
+from qdrant_client import QdrantClient, models
+
+from backend.local_index import LocalIndex, LocalIndexClient
+from benchmarks.bench_quantization import percentile, synthetic_vectors
+
+LOCAL_CONFIGS = {
+    "local_float16": {"dtype": "float16", "ivf": False},
+    "local_int8": {"dtype": "int8", "ivf": False},
+    "local_int8_ivf": {"dtype": "int8", "ivf": True},
+}
+BATCH = 512
+PAYLOAD_CHARS = 2500  # One chunk of text per point, like the real collection
+
+
+def points(vectors: np.ndarray, start: int) -> list:
+    payload = {"page_content": "x" * PAYLOAD_CHARS, "metadata": {"source": "bench.pdf"}}
+    return [models.PointStruct(id=start + i, vector=v.tolist(), payload=payload) for i, v in enumerate(vectors)]
+
+
+def dir_mb(path: str) -> float:
+    return round(sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1e6, 1)
+
+
+# ---------------------- Backends -------------------------------------- #
+def build_local(root: str, name: str, vectors: np.ndarray, dtype: str, ivf: bool) -> LocalIndex:
+    """Write the index through LocalIndexClient, as `create_vectorstore.py --backend local` does."""
+    client = LocalIndexClient(root=root, dtype=dtype, ivf_min_points=1 if ivf else len(vectors) + 1)
+    client.create_collection(name, models.VectorParams(size=vectors.shape[1], distance=models.Distance.COSINE))
+    for start in range(0, len(vectors), BATCH):
+        client.upsert(name, points(vectors[start:start + BATCH], start))
+    client.persist(name)
+    return client.get_index(name)
+
+
+def search_local(index: LocalIndex, queries: np.ndarray, k: int):
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([int(record["id"]) for _, record in hits])
+    return ids, latencies
+
+
+def build_qdrant(client: QdrantClient, name: str, vectors: np.ndarray):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(name, vectors_config=models.VectorParams(size=vectors.shape[1],
+                                                                      distance=models.Distance.COSINE))
+    for start in range(0, len(vectors), BATCH):
+        client.upsert(name, points(vectors[start:start + BATCH], start), wait=True)
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def search_qdrant(client: QdrantClient, name: str, queries: np.ndarray, k: int):
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = client.query_points(name, query=query.tolist(), limit=k, with_payload=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([point.id for point in response.points])
+    return ids, latencies
+
+
+# ---------------------- Shared Pages ---------------------------------- #
+def mapped_kb(path: str) -> dict:
+    """RSS and PSS (kB) of this process's mappings of files under `path`."""
+    totals, inside = {"rss_kb": 0, "pss_kb": 0}, False
+    with open("/proc/self/smaps", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if "-" in fields[0] and len(fields) >= 5:  # Mapping header: address perms offset dev inode [path]
+                inside = len(fields) >= 6 and fields[5].startswith(path)
+            elif inside and fields[0] in ("Rss:", "Pss:"):
+                totals[f"{fields[0][:-1].lower()}_kb"] += int(fields[1])
+    return totals
+
+
+def worker(path: str, queries: np.ndarray, k: int, barrier, results):
+    index = LocalIndex(path)
+    index.search_batch(queries, k)  # Touches every page of the matrix
+    barrier.wait()  # All workers have the index mapped
+    results.put(mapped_kb(os.path.dirname(path)))
+    barrier.wait()  # Keep the mappings alive until everyone has measured
+
+
+def shared_pages(path: str, queries: np.ndarray, k: int, workers: int) -> list:
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [context.Process(target=worker, args=(path, queries, k, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return measured
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory-mapped local index vs Qdrant.")
+    parser.add_argument("--qdrant-url", default=":memory:", help="Qdrant server URL (default: local mode)")
+    parser.add_argument("--points", type=int, default=50000, help="Synthetic vectors")
+    parser.add_argument("--dim", type=int, default=768, help="Vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per backend")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists searched per query")
+    parser.add_argument("--workers", type=int, default=4, help="Processes sharing the index (0 to skip)")
+    parser.add_argument("--skip-qdrant", action="store_true", help="Only benchmark the local index")
+    args = parser.parse_args()
+
+    vectors, queries = synthetic_vectors(args.points, args.queries, args.dim)
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k].tolist()  # Exact float32
+
+    def report(name: str, ids: list, latencies: list, **extra):
+        recall = statistics.fmean(len(set(found) & set(expected)) / args.k for found, expected in zip(ids, truth))
+        result = {"backend": name, "points": len(vectors), "dim": args.dim, f"recall@{args.k}": round(recall, 4),
+                  "p50_ms": round(percentile(latencies, 50), 2), "p95_ms": round(percentile(latencies, 95), 2),
+                  **extra}
+        print(json.dumps(result))
+
+    if not args.skip_qdrant:
+        client = QdrantClient(url=args.qdrant_url, timeout=60) if args.qdrant_url.startswith(("http://", "https://")) \
+            else QdrantClient(location=args.qdrant_url)
+        start = time.perf_counter()
+        build_qdrant(client, "bench_local_index", vectors)
+        build_s = time.perf_counter() - start
+        search_qdrant(client, "bench_local_index", queries[:10], args.k)
+        ids, latencies = search_qdrant(client, "bench_local_index", queries, args.k)
+        report(f"qdrant ({args.qdrant_url})", ids, latencies, build_s=round(build_s, 1))
+        client.delete_collection("bench_local_index")
+
+    with tempfile.TemporaryDirectory() as root:
+        for name, config in LOCAL_CONFIGS.items():
+            start = time.perf_counter()
+            index = build_local(root, name, vectors, **config)
+            build_s = time.perf_counter() - start
+            index.nprobe = args.nprobe
+            search_local(index, queries[:10], args.k)
+            ids, latencies = search_local(index, queries, args.k)
+            report(name, ids, latencies, build_s=round(build_s, 1), disk_mb=dir_mb(index.path),
+                   **({"lists": index.meta["lists"], "nprobe": args.nprobe} if config["ivf"] else {}))
+        if args.workers:
+            measured = shared_pages(os.path.join(root, "local_float16"), queries[:20], args.k, args.workers)
+            print(json.dumps({"workers": args.workers, "per_worker": measured,
+                              "total_rss_mb": round(sum(m["rss_kb"] for m in measured) / 1e3, 1),
+                              "total_pss_mb": round(sum(m["pss_kb"] for m in measured) / 1e3, 1)}))
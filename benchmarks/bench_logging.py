@@ -0,0 +1,171 @@
+"""
+bench_logging.py
+----------------
+Measures logging overhead per request under concurrent load. Each simulated request emits the
+same log lines as a RAG turn (user query, tool call, patient lookup, tool result, debug detail)
+from N threads, against:
+- sync: the previous setup, a FileHandler written inline with eagerly formatted f-strings
+- queued: backend.logger's pipeline (QueueHandler -> listener -> JSON lines + PHI redaction)
+  with lazy %-style arguments
+Reports the time the request thread spends in logging calls (p50/p99 per request, in µs), the
+wall time for the listener to drain, and dropped records. `--check-redaction` instead runs the
+project's own PHI-bearing log calls through the redacting file handler and fails on any leak.
+
+Usage:
+    python -m benchmarks.bench_logging
+    python -m benchmarks.bench_logging --check-redaction
+    python -m benchmarks.bench_logging --threads 32 --requests 2000
+"""
+
+import argparse  # CLI arguments
+import json  # Results
+import logging  # Baseline handler
+import os  # Temp log files
+import statistics  # Percentiles
+import tempfile  # Isolated log directory
+import threading  # Concurrent request threads
+import time  # Timing
+
+from backend import logger as log_pipeline  # Pipeline under test
+
+PATIENT = {"patient_id": "P042", "patient_name": "John Smith", "primary_diagnosis": "Chronic Kidney Disease Stage 3",
+           "medications": ["Lisinopril 10mg daily", "Furosemide 20mg twice daily"]}
+QUERY = "I have swelling in my legs, should I worry? My number is 555-123-4567"
+RESULT = "Leg swelling (edema) is common in CKD and can indicate fluid retention. " * 4
+
+
+def eager_request(log: logging.Logger):
+    """One request's log lines, formatted eagerly like the previous code."""
+    log.info(f"User query: {QUERY}")
+    log.info(f"[RAG] Called by: clinical_agent | Query: {QUERY}")
+    log.info(f"Patient found: {PATIENT}")
+    log.info(f"[RAG] Responded by: clinical_agent | Result: {str(RESULT)[:200]}")
+    log.debug(f"[RAG] Context: {RESULT * 4}")  # Disabled level, still formatted
+    log.info(f"[Stream] Time to first token: {123.4:.0f} ms")
+
+
+def lazy_request(log: logging.Logger):
+    """The same lines with lazy %-style arguments."""
+    log.info("User query: %s", QUERY)
+    log.info("[RAG] Called by: %s | Query: %s", "clinical_agent", QUERY)
+    log.info("Patient found: %s", PATIENT)
+    log.info("[RAG] Responded by: %s | Result: %s", "clinical_agent", str(RESULT)[:200])
+    log.debug("[RAG] Context: %s", RESULT * 4)
+    log.info("[Stream] Time to first token: %.0f ms", 123.4)
+
+
+def run(emit, log: logging.Logger, threads: int, requests: int) -> list:
+    """Call `emit` `requests` times per thread; returns per-request logging time in µs."""
+    samples, barrier = [], threading.Barrier(threads)
+
+    def worker():
+        local = []
+        barrier.wait()
+        for _ in range(requests):
+            start = time.perf_counter()
+            emit(log)
+            local.append((time.perf_counter() - start) * 1e6)
+        samples.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return samples
+
+
+def check_redaction() -> list:
+    """
+    Emit the project's PHI-bearing log lines (patient report tool, RAG tool, chat transcript,
+    retrieval and the Streamlit 'User query' line) through backend.logger's file handler with
+    redaction on. The RAG chain is replaced by a fixed answer.
+    Returns:
+        list: Written lines that still contain the patient's name, ID, phone or query text.
+    """
+    import mongomock
+    import pymongo
+    pymongo.MongoClient = mongomock.MongoClient  # Before backend.mongo_database connects
+
+    from langchain_core.runnables import RunnableLambda
+
+    from agents.clinical_agent.tools import rag_tool
+    from agents.graph_builder import log_interaction, log_retrieval_attempt
+    from agents.receptionist_agent.patient_report_tool import patient_report_tool
+    from backend.mongo_database import ensure_indexes, get_collection
+
+    get_collection().insert_one({**PATIENT, "dietary_restrictions": "Low sodium"})
+    ensure_indexes()
+    with tempfile.TemporaryDirectory() as log_dir:
+        path = os.path.join(log_dir, "assistant.log")
+        handler = log_pipeline.create_file_handler(path, redact=True)
+        listener = log_pipeline.start_queue_logging(log_pipeline.logger, [handler])
+        patient_report_tool(PATIENT["patient_name"])
+        patient_report_tool(PATIENT["patient_name"].lower())
+        patient_report_tool("Jane Unknown")
+        log_pipeline.logger.info("User query: %s", log_pipeline.phi(QUERY))  # app/main.py
+        log_interaction("User", f"{PATIENT['patient_id']} {PATIENT['patient_name']}")
+        log_retrieval_attempt("clinical_agent", QUERY, "ok")
+        rag_tool.CACHE_ENABLED = False
+        rag_tool.get_rag_chain = lambda: RunnableLambda(lambda question: "Keep your legs raised.")
+        rag_tool.rag_tool_function(QUERY)
+        log_pipeline.logger.info("Patient lookup", extra={"patient_name": log_pipeline.phi(PATIENT["patient_name"])})
+        listener.stop()
+        handler.close()
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    leaks = [PATIENT["patient_name"], PATIENT["patient_name"].lower(), "Jane Unknown", PATIENT["patient_id"],
+             "555-123-4567", "swelling in my legs"]
+    return [line for line in lines if any(leak in line for leak in leaks)] or ([] if lines else ["no lines written"])
+
+
+def summarize(name: str, samples: list, drain_s: float, path: str, **extra) -> dict:
+    cuts = statistics.quantiles(samples, n=100)
+    return {"mode": name, "requests": len(samples), "p50_us": round(cuts[49], 1), "p99_us": round(cuts[98], 1),
+            "mean_us": round(statistics.fmean(samples), 1), "drain_s": round(drain_s, 3),
+            "file_mb": round(sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6, 2),
+            **extra}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request logging overhead: sync vs queued pipeline.")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent request threads")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per thread")
+    parser.add_argument("--queue-size", type=int, default=log_pipeline.LOG_QUEUE_SIZE, help="Pipeline queue size")
+    parser.add_argument("--check-redaction", action="store_true",
+                        help="Only check that the project's log lines carry no PHI (exits non-zero on a leak)")
+    args = parser.parse_args()
+
+    if args.check_redaction:
+        leaked = check_redaction()
+        print(json.dumps({"redaction_leaks": leaked}))
+        raise SystemExit(1 if leaked else 0)
+
+    with tempfile.TemporaryDirectory() as sync_dir, tempfile.TemporaryDirectory() as queued_dir:
+        sync_log = logging.getLogger("bench_logging.sync")
+        sync_log.setLevel(logging.INFO)
+        sync_log.propagate = False
+        handler = logging.FileHandler(os.path.join(sync_dir, "session.log"), encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s — %(levelname)s — %(message)s"))
+        sync_log.addHandler(handler)
+        sync_samples = run(eager_request, sync_log, args.threads, args.requests)
+        handler.close()
+        sync_result = summarize("sync", sync_samples, 0.0, sync_dir)
+
+        queued_log = logging.getLogger("bench_logging.queued")
+        queued_log.setLevel(logging.INFO)
+        queued_log.propagate = False
+        file_handler = log_pipeline.create_file_handler(os.path.join(queued_dir, "assistant.log"))
+        listener = log_pipeline.start_queue_logging(queued_log, [file_handler], queue_size=args.queue_size)
+        dropped_before = log_pipeline.DroppingQueueHandler.dropped
+        queued_samples = run(lazy_request, queued_log, args.threads, args.requests)
+        start = time.perf_counter()
+        listener.stop()  # Wait for the listener to write everything still queued
+        file_handler.close()
+        queued_result = summarize("queued", queued_samples, time.perf_counter() - start, queued_dir,
+                                  dropped=log_pipeline.DroppingQueueHandler.dropped - dropped_before)
+
+    print(json.dumps(sync_result))
+    print(json.dumps(queued_result))
+    print(f"Logging time per request: p50 {sync_result['p50_us']}µs -> {queued_result['p50_us']}µs, "
+          f"p99 {sync_result['p99_us']}µs -> {queued_result['p99_us']}µs")
@@ -0,0 +1,100 @@
+"""
+bench_patient_lookup.py
+-----------------------
+Benchmarks patient lookups against a synthetic collection (1M patients by default) on a real
+MongoDB server: the previous case-insensitive `$regex` name query versus the indexed exact match
+on the normalized name, plus lookups by patient_id. Also prints the winning plan stage
+(COLLSCAN vs IXSCAN) for each query shape.
+
+Usage:
+    python -m benchmarks.bench_patient_lookup --patients 1000000 --queries 200
+"""
+
+import argparse  # CLI arguments
+import random  # Synthetic data and query sampling
+import statistics  # Latency summaries
+import time  # Timing
+
+from pymongo import MongoClient  # MongoDB client
+
+from backend import mongo_database  # Migration + lookup functions under test
+
+BENCH_DB_NAME = "patient_lookup_benchmark"
+FIRST_NAMES = ["John", "Emily", "Michael", "Sarah", "David", "Laura", "James", "Anna", "Robert", "Maria"]
+LAST_NAMES = ["Smith", "Johnson", "Brown", "Taylor", "Miller", "Davis", "Wilson", "Moore", "Clark", "Lewis"]
+
+
+def populate(collection, count: int, batch_size: int = 10000):
+    """Insert `count` synthetic patients with unique names and IDs (without the normalized field)."""
+    collection.drop()
+    start = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        collection.insert_many([
+            {
+                "patient_id": f"P{n:07d}",
+                "patient_name": f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)} {n}",
+                "primary_diagnosis": "Chronic Kidney Disease Stage 3",
+                "medications": ["Lisinopril 10mg daily"],
+                "dietary_restrictions": "Low sodium (2g/day)",
+                "discharge_instructions": "Monitor blood pressure daily",
+            }
+            for n in range(offset, min(offset + batch_size, count))
+        ], ordered=False)
+    print(f"Inserted {count} patients in {time.perf_counter() - start:.1f}s")
+
+
+def time_queries(label: str, func, args):
+    """Run `func` over `args`, printing mean / p50 / p95 latency in ms."""
+    latencies = []
+    for arg in args:
+        start = time.perf_counter()
+        func(arg)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print(f"{label:<28} mean={statistics.mean(latencies):9.2f} ms  p50={latencies[len(latencies) // 2]:9.2f} ms  "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:9.2f} ms")
+
+
+def plan_stage(cursor) -> str:
+    """Return the innermost stage of the winning plan (e.g. COLLSCAN, IXSCAN)."""
+    stage = cursor.explain()["queryPlanner"]["winningPlan"]
+    while "inputStage" in stage:
+        stage = stage["inputStage"]
+    return stage.get("stage", "?")
+
+
+def run(patients: int, queries: int):
+    """Populate, migrate and benchmark."""
+    client = MongoClient(mongo_database.MONGO_URI)
+    collection = client[BENCH_DB_NAME]["patients"]
+    populate(collection, patients)
+
+    # Point the module under test at the benchmark collection
+    mongo_database._collection = collection  # Lookups under test read the benchmark collection
+    sample = [collection.find_one({"patient_id": f"P{random.randrange(patients):07d}"}) for _ in range(queries)]
+    names = [doc["patient_name"].upper() for doc in sample]  # Exercise case-insensitivity
+    ids = [doc["patient_id"] for doc in sample]
+
+    def regex_lookup(name):
+        return list(collection.find({"patient_name": {"$regex": f"^{name}$", "$options": "i"}}))
+
+    time_queries("regex name (before)", regex_lookup, names[: max(1, queries // 10)])
+    print(f"  plan: {plan_stage(collection.find({'patient_name': {'$regex': f'^{names[0]}$', '$options': 'i'}}))}")
+
+    start = time.perf_counter()
+    mongo_database.ensure_indexes()
+    print(f"Migration (backfill + indexes) took {time.perf_counter() - start:.1f}s")
+
+    time_queries("indexed name (after)", mongo_database.get_patient_by_name, names)
+    normalized = mongo_database.normalize_name(names[0])
+    print(f"  plan: {plan_stage(collection.find({mongo_database.NORMALIZED_NAME_FIELD: normalized}, collation=mongo_database.NAME_COLLATION))}")
+    time_queries("patient_id (after)", mongo_database.get_patient_by_id, ids)
+    print(f"  plan: {plan_stage(collection.find({'patient_id': ids[0]}))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark patient lookups on a synthetic collection.")
+    parser.add_argument("--patients", type=int, default=1_000_000, help="Synthetic patients to insert")
+    parser.add_argument("--queries", type=int, default=200, help="Lookups per query shape")
+    args = parser.parse_args()
+    run(args.patients, args.queries)
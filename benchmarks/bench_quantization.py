@@ -0,0 +1,184 @@
+"""
+bench_quantization.py
+---------------------
+Memory footprint, query latency and recall of Qdrant storage options against the unquantized,
+in-RAM baseline. Each configuration gets its own collection holding the same vectors, built with
+`create_vectorstore.create_collection` (so the options are exactly those used at ingestion):
+- baseline: float32 vectors in RAM, HNSW m=16 / ef_construct=100
+- scalar / binary: int8 / 1-bit quantized copy in RAM, rescored with the full vectors
+- *_on_disk: the same, with full vectors and payloads memory-mapped on disk
+- hnsw_m32: baseline with m=32 / ef_construct=200
+Recall@k is measured against exact (brute-force) search on the baseline collection.
+RAM is estimated from the configuration (vectors in RAM + quantized copy + HNSW links) and, when
+the server's /metrics endpoint is reachable, also reported as the change in server resident memory.
+
+Vectors are copied from an ingested collection (--source-collection) or generated as clustered
+synthetic 768-d embeddings. Needs a Qdrant server: the local ':memory:'/path mode accepts but
+ignores quantization and HNSW settings.
+
+Usage:
+    python -m benchmarks.bench_quantization --qdrant-url http://localhost:6333
+    python -m benchmarks.bench_quantization --source-collection nephrology_lc_fastembed --k 4
+    python -m benchmarks.bench_quantization --points 100000 --configs baseline scalar binary_on_disk
+"""
+
+import argparse  # CLI arguments
+import json  # Results
+import re  # /metrics parsing
+import statistics  # Percentiles
+import sys  # Local-mode warning
+import time  # Latency / indexing wait
+import urllib.request  # Server memory from /metrics
+
+import numpy as np  # Synthetic vectors
+from qdrant_client import QdrantClient, models
+
+from agents.clinical_agent.rag.create_vectorstore import create_collection  # Same options as ingestion
+from backend import resources  # Default Qdrant URL
+
+CONFIGS = {
+    "baseline": {},
+    "scalar": {"quantization": "scalar"},
+    "scalar_on_disk": {"quantization": "scalar", "on_disk": True, "on_disk_payload": True},
+    "binary": {"quantization": "binary"},
+    "binary_on_disk": {"quantization": "binary", "on_disk": True, "on_disk_payload": True},
+    "hnsw_m32": {"hnsw_m": 32, "hnsw_ef_construct": 200},
+}
+BATCH = 512
+PAYLOAD_BYTES = 2500  # One chunk of text per point, like the real collection
+
+
+# ---------------------- Vectors --------------------------------------- #
+def synthetic_vectors(points: int, queries: int, dim: int = 768, clusters: int = 64, seed: int = 0):
+    """Unit vectors around random topic centres (closer to real embeddings than uniform noise)."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+
+    def sample(n):
+        vectors = centres[rng.integers(clusters, size=n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return sample(points), sample(queries)
+
+
+def collection_vectors(client: QdrantClient, collection: str, queries: int, seed: int = 0):
+    """Dense vectors of an ingested collection; queries are held-out points with a little noise."""
+    vectors, offset = [], None
+    while True:
+        records, offset = client.scroll(collection, limit=1000, offset=offset, with_vectors=True, with_payload=False)
+        for record in records:
+            vector = record.vector
+            vectors.append(vector.get("dense") if isinstance(vector, dict) else vector)
+        if offset is None:
+            break
+    data = np.asarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    held_out = rng.choice(len(data), size=min(queries, len(data)), replace=False)
+    query_vectors = data[held_out] + 0.05 * rng.standard_normal((len(held_out), data.shape[1])).astype(np.float32)
+    return data, query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+
+# ---------------------- Memory ---------------------------------------- #
+def estimated_ram_mb(points: int, dim: int, options: dict) -> float:
+    """Vectors kept in RAM (full and/or quantized) plus level-0 HNSW links (2*m u32 per point)."""
+    full = 0 if options.get("on_disk") else points * dim * 4
+    quantized = {"scalar": points * dim, "binary": points * dim / 8}.get(options.get("quantization"), 0)
+    links = points * 2 * options.get("hnsw_m", 16) * 4
+    payload = 0 if options.get("on_disk_payload") else points * PAYLOAD_BYTES
+    return round((full + quantized + links + payload) / 1e6, 1)
+
+
+def server_memory_bytes(url: str) -> float | None:
+    """Resident memory reported by the Qdrant server's /metrics, if reachable."""
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/metrics", timeout=5) as response:
+            text = response.read().decode()
+    except Exception:
+        return None
+    match = re.search(r"^memory_resident_bytes (\S+)", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+# ---------------------- Benchmark ------------------------------------- #
+def build(client: QdrantClient, name: str, vectors: np.ndarray, options: dict):
+    """Create the collection, upload the vectors and wait until indexing has finished."""
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    create_collection(client, name, vectors.shape[1], hybrid=False, **{"quantization": "none", **options})
+    payload = {"page_content": "x" * PAYLOAD_BYTES}
+    for start in range(0, len(vectors), BATCH):
+        batch = vectors[start:start + BATCH]
+        client.upsert(name, [models.PointStruct(id=start + i, vector=v.tolist(), payload=payload)
+                             for i, v in enumerate(batch)], wait=True)
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def search(client: QdrantClient, name: str, queries: np.ndarray, k: int, params: models.SearchParams):
+    """Top-k IDs and latency (ms) per query."""
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = client.query_points(name, query=query.tolist(), limit=k, search_params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([point.id for point in response.points])
+    return ids, latencies
+
+
+def percentile(values: list, pct: int) -> float:
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else values[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Qdrant quantization / on-disk / HNSW trade-offs.")
+    parser.add_argument("--qdrant-url", default=resources.QDRANT_URL, help="Qdrant server URL")
+    parser.add_argument("--source-collection", help="Copy vectors from this collection instead of synthetic ones")
+    parser.add_argument("--points", type=int, default=20000, help="Synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per configuration")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument("--oversampling", type=float, default=resources.QDRANT_OVERSAMPLING)
+    parser.add_argument("--hnsw-ef", type=int, default=resources.QDRANT_HNSW_EF or 128, help="Query-time ef")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections afterwards")
+    args = parser.parse_args()
+
+    if not args.qdrant_url.startswith(("http://", "https://")):
+        print("Warning: local Qdrant mode ignores quantization and HNSW settings; only the baseline is meaningful",
+              file=sys.stderr)
+        client = QdrantClient(location=args.qdrant_url) if args.qdrant_url == ":memory:" \
+            else QdrantClient(path=args.qdrant_url)
+    else:
+        client = QdrantClient(url=args.qdrant_url, timeout=60)
+    if args.source_collection:
+        vectors, queries = collection_vectors(client, args.source_collection, args.queries)
+    else:
+        vectors, queries = synthetic_vectors(args.points, args.queries)
+    configs = ["baseline"] + [name for name in args.configs if name != "baseline"]  # Ground truth first
+
+    truth, results = None, []
+    for name in configs:
+        collection = f"bench_quant_{name}"
+        memory_before = server_memory_bytes(args.qdrant_url)
+        start = time.perf_counter()
+        build(client, collection, vectors, CONFIGS[name])
+        build_s = time.perf_counter() - start
+        memory_after = server_memory_bytes(args.qdrant_url)
+        if truth is None:
+            truth, _ = search(client, collection, queries, args.k, models.SearchParams(exact=True))
+        params = models.SearchParams(hnsw_ef=args.hnsw_ef, quantization=models.QuantizationSearchParams(
+            rescore=True, oversampling=args.oversampling))
+        search(client, collection, queries[:10], args.k, params)  # Warm caches / mmap pages
+        ids, latencies = search(client, collection, queries, args.k, params)
+        recall = statistics.fmean(len(set(found) & set(expected)) / args.k for found, expected in zip(ids, truth))
+        result = {"config": name, "points": len(vectors), "k": args.k, f"recall@{args.k}": round(recall, 4),
+                  "p50_ms": round(percentile(latencies, 50), 2), "p95_ms": round(percentile(latencies, 95), 2),
+                  "estimated_ram_mb": estimated_ram_mb(len(vectors), vectors.shape[1], CONFIGS[name]),
+                  "build_s": round(build_s, 1)}
+        if memory_before is not None and memory_after is not None:
+            result["server_rss_delta_mb"] = round((memory_after - memory_before) / 1e6, 1)
+        print(json.dumps(result))
+        results.append(result)
+        if not args.keep and name != "baseline":
+            client.delete_collection(collection)
+    if not args.keep:
+        client.delete_collection("bench_quant_baseline")
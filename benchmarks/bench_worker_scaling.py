@@ -0,0 +1,151 @@
+"""
+bench_worker_scaling.py
+-----------------------
+Throughput of the API under gunicorn with 1 to N workers (see gunicorn.conf.py).
+For each worker count the real server is started with the replay_sessions stand-ins (scripted
+LLM with a fixed latency, hash embeddings, in-memory Qdrant, mongomock patients) and the SQLite
+checkpointer shared by all workers. Once /readyz returns 200, concurrent conversations are driven
+over HTTP: Patient ID, name, then follow-up questions, each turn a separate POST /chat that any
+worker may pick up. The name turn only verifies if that worker sees the state written by the
+worker that served the ID turn, so `verified` doubles as a check that conversation state is
+shared. Reports turns/s, p50/p95 turn latency and how many workers served each conversation.
+
+Scaling is bounded by the CPU cores available: on a single core the extra workers only add
+context switches, while with the scripted LLM latency standing in for Gemini each worker mostly
+waits, so throughput grows with workers until the cores are saturated.
+
+Usage:
+    python -m benchmarks.bench_worker_scaling
+    python -m benchmarks.bench_worker_scaling --workers 1 2 4 --conversations 40 --llm-latency 0.2
+"""
+
+import argparse  # CLI arguments
+import asyncio  # Concurrent conversations
+import json  # Fixtures / results
+import os  # Server environment
+import socket  # Free port
+import subprocess  # gunicorn
+import sys
+import tempfile  # Scratch checkpoint / log directory
+import time  # Turn latency
+
+import httpx  # HTTP client
+
+QUESTIONS = ["What medications am I taking?", "Is swelling in my legs a warning sign?",
+             "What should I eat with my kidney condition?"]
+
+
+def stub_app():
+    """gunicorn app factory: the production API with the offline stand-ins installed in each worker."""
+    from benchmarks.replay_sessions import install_stand_ins  # Configures the stand-ins on import
+    from agents.clinical_agent.tools import web_search_tool
+    from backend.mongo_database import ensure_indexes, get_collection
+    from benchmarks.stubs import StubSearch
+
+    with open("data/patient_reports.json", encoding="utf-8") as f:
+        get_collection().insert_many(json.load(f))  # Each worker has its own mongomock
+    ensure_indexes()
+    install_stand_ins(float(os.environ["BENCH_LLM_LATENCY"]), int(os.environ["BENCH_CHUNKS"]))
+    web_search_tool.DuckDuckGoSearchAPIWrapper = StubSearch
+
+    from app.main_api import fastapi_app
+
+    @fastapi_app.middleware("http")
+    async def worker_header(request, call_next):
+        response = await call_next(request)
+        response.headers["X-Worker-Pid"] = str(os.getpid())
+        return response
+
+    return fastapi_app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, scratch: str, llm_latency: float, chunks: int) -> subprocess.Popen:
+    """Start gunicorn with `workers` workers and wait until /readyz is 200."""
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers), "BIND": f"127.0.0.1:{port}", "PRELOAD_EMBEDDINGS": "false",
+        "CHECKPOINTER_BACKEND": "sqlite", "CHECKPOINTER_SQLITE_PATH": os.path.join(scratch, "checkpoints.sqlite3"),
+        "LOG_DIR": scratch, "LOG_FILE": os.path.join(scratch, "assistant-{pid}.log"),
+        "PROMETHEUS_MULTIPROC_DIR": os.path.join(scratch, "prom"), "ANSWER_PACKS_ENABLED": "false",
+        "BENCH_LLM_LATENCY": str(llm_latency), "BENCH_CHUNKS": str(chunks),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "benchmarks.bench_worker_scaling:stub_app()"],
+        env=env, stdout=subprocess.DEVNULL, stderr=open(os.path.join(scratch, "gunicorn.err"), "w"),
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {server.returncode}; see {scratch}/gunicorn.err")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/readyz", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError("Server did not become ready in time")
+
+
+async def conversation(client: httpx.AsyncClient, patient: dict, latencies: list) -> dict:
+    """One patient's session; returns whether the name turn verified and the workers that served it."""
+    thread_id, workers, verified = None, set(), False
+    for message in [patient["patient_id"], patient["patient_name"], *QUESTIONS]:
+        start = time.perf_counter()
+        response = await client.post("/chat", json={"message": message, "thread_id": thread_id})
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        body = response.json()
+        thread_id = body["thread_id"]
+        workers.add(response.headers.get("X-Worker-Pid"))
+        if message == patient["patient_name"]:
+            verified = "Thank you for verifying your identity" in body["response"]
+    return {"verified": verified, "workers": len(workers)}
+
+
+async def drive(port: int, patients: list, conversations: int) -> dict:
+    """Run all conversations concurrently; returns throughput and latency stats."""
+    from benchmarks.replay_sessions import percentile
+
+    latencies = []
+    limits = httpx.Limits(max_connections=conversations, max_keepalive_connections=0)  # Spread over workers
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(conversation(client, patients[n % len(patients)], latencies)
+                                         for n in range(conversations)))
+        elapsed = time.perf_counter() - start
+    return {
+        "turns": len(latencies),
+        "turns_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "verified": sum(r["verified"] for r in results),
+        "cross_worker_conversations": sum(r["workers"] > 1 for r in results),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API throughput under gunicorn with 1 to N workers.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--conversations", type=int, default=20, help="Concurrent patient conversations")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Simulated seconds per LLM call")
+    parser.add_argument("--chunks", type=int, default=200, help="Synthetic reference chunks per worker")
+    args = parser.parse_args()
+
+    with open("data/patient_reports.json", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    for workers in args.workers:
+        scratch, port = tempfile.mkdtemp(prefix="worker_scaling_"), free_port()
+        server = start_server(workers, port, scratch, args.llm_latency, args.chunks)
+        try:
+            result = asyncio.run(drive(port, fixtures, args.conversations))
+        finally:
+            server.terminate()  # SIGTERM: graceful drain
+            server.wait(timeout=60)
+        print(json.dumps({"workers": workers, "cpus": os.cpu_count(), **result}))
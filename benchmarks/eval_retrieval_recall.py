@@ -0,0 +1,87 @@
+"""
+eval_retrieval_recall.py
+------------------------
+Offline recall@k evaluation of the retrievers against a labelled question set.
+Compares dense-only retrieval (the default collection) with hybrid dense + sparse RRF fusion and
+with hybrid + cross-encoder reranking (the hybrid collection, built with
+`create_vectorstore.py --hybrid`). A retrieved chunk counts as relevant when it is on one of the
+question's `relevant_pages` or contains one of its `relevant_terms` (case-insensitive).
+
+Reports recall@k (share of questions with a relevant chunk in the top k), MRR@k and p50/p95
+retrieval latency per mode.
+
+Usage:
+    python -m benchmarks.eval_retrieval_recall --k 4
+    QDRANT_URL=qdrant_local python -m benchmarks.eval_retrieval_recall --modes dense hybrid --budget-ms 500
+"""
+
+import argparse  # CLI arguments
+import json  # Eval set / results
+import statistics  # Percentiles
+import time  # Latency
+
+from agents.clinical_agent.rag.hybrid_retriever import load_hybrid_retriever  # Hybrid retriever
+from agents.clinical_agent.rag.load_vectorstore import load_vectorstore  # Dense vectorstore
+from backend import resources  # Query-time search parameters
+
+DEFAULT_EVAL_FILE = "benchmarks/data/retrieval_eval.jsonl"
+MODES = ("dense", "hybrid", "hybrid_rerank")
+
+
+def load_eval_set(path: str) -> list:
+    """Read one {"question", "relevant_terms", "relevant_pages"} object per line."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_relevant(doc, case: dict) -> bool:
+    """True if the chunk is on a labelled page or mentions a labelled term."""
+    if doc.metadata.get("page") in case.get("relevant_pages", []):
+        return True
+    text = doc.page_content.lower()
+    return any(term.lower() in text for term in case.get("relevant_terms", []))
+
+
+def build_search(mode: str, k: int, budget_ms: float):
+    """Return a `query -> documents` callable for the given mode."""
+    if mode == "dense":
+        vectorstore = load_vectorstore()
+        params = resources.search_params()
+        return lambda query: vectorstore.similarity_search(query, k=k, search_params=params)
+    retriever = load_hybrid_retriever(rerank=(mode == "hybrid_rerank"), k=k, latency_budget_ms=budget_ms)
+    return retriever.invoke
+
+
+def evaluate(mode: str, cases: list, k: int, budget_ms: float) -> dict:
+    """Run every question through one mode and score it."""
+    search = build_search(mode, k, budget_ms)
+    search(cases[0]["question"])  # Warm models and connections outside the timings
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for case in cases:
+        start = time.perf_counter()
+        docs = search(case["question"])[:k]
+        latencies.append((time.perf_counter() - start) * 1000)
+        rank = next((i for i, doc in enumerate(docs, 1) if is_relevant(doc, case)), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    latencies.sort()
+    return {
+        "mode": mode,
+        "questions": len(cases),
+        f"recall@{k}": round(hits / len(cases), 3),
+        f"mrr@{k}": round(sum(reciprocal_ranks) / len(cases), 3),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline recall@k evaluation for dense vs hybrid retrieval.")
+    parser.add_argument("--eval-file", default=DEFAULT_EVAL_FILE, help="JSONL of labelled questions")
+    parser.add_argument("--k", type=int, default=4, help="Chunks retrieved per question")
+    parser.add_argument("--budget-ms", type=float, default=800, help="Hybrid retrieval latency budget")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+    eval_cases = load_eval_set(args.eval_file)
+    for eval_mode in args.modes:
+        print(json.dumps(evaluate(eval_mode, eval_cases, args.k, args.budget_ms)))
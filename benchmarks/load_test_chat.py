@@ -0,0 +1,98 @@
+"""
+load_test_chat.py
+-----------------
+Load test for POST /chat with stubbed LLM and tools.
+Simulates N concurrent patients, each sending several turns, against the FastAPI app in-process
+and reports p50/p99 latency, throughput and how many requests were rejected with 429.
+
+Usage:
+    python -m benchmarks.load_test_chat --patients 50 --turns 5
+"""
+
+import argparse  # CLI arguments
+import asyncio  # Concurrent simulated patients
+import os  # Disable warm-up for the stub graph
+import statistics  # Percentiles
+import sys
+import time  # Latency measurement
+import types  # Stub module for the agent graph
+import uuid  # Stub thread IDs
+from unittest import mock  # In-memory MongoDB stand-in
+
+import httpx  # In-process ASGI client
+import mongomock  # In-memory MongoDB
+from langgraph.prebuilt import create_react_agent  # Same agent type as production
+
+from backend.checkpointer import CompactingInMemorySaver  # Same compaction as production
+
+from benchmarks.stubs import FakeToolCallingLLM, stub_lookup_tool  # Deterministic stand-ins
+
+
+def install_stub_graph():
+    """
+    Register a stub `agents.graph_builder` so importing the API does not touch Gemini,
+    Qdrant or MongoDB. The stub agent has the same shape as production: LLM -> tool -> LLM.
+    MongoDB (used by the API's startup migration) is replaced with mongomock.
+    """
+    mock.patch("pymongo.MongoClient", mongomock.MongoClient).start()
+    os.environ.setdefault("WARMUP_ON_STARTUP", "false")  # Nothing real to warm up
+    stub = types.ModuleType("agents.graph_builder")
+    stub.app = create_react_agent(
+        FakeToolCallingLLM(), [stub_lookup_tool], checkpointer=CompactingInMemorySaver()
+    )
+    stub.get_app = lambda: stub.app
+    stub.new_thread_id = lambda: uuid.uuid4().hex
+    stub.make_config = lambda thread_id: {"configurable": {"thread_id": thread_id}}
+    sys.modules["agents.graph_builder"] = stub
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of floats."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def simulate_patient(client, patient_num, turns, latencies, statuses):
+    """Send `turns` sequential messages as one patient, recording latency and status codes."""
+    thread_id = None  # Assigned by the server on the first turn
+    for turn in range(turns):
+        start = time.perf_counter()
+        resp = await client.post(
+            "/chat", json={"message": f"P{patient_num:03d} question {turn}", "thread_id": thread_id}
+        )
+        latencies.append(time.perf_counter() - start)
+        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+        if resp.status_code == 200:
+            thread_id = resp.json()["thread_id"]
+
+
+async def run(patients: int, turns: int):
+    """Run the load test and print a summary."""
+    install_stub_graph()
+    from app.main_api import fastapi_app  # Imported after the stub is in place
+
+    latencies, statuses = [], {}
+    transport = httpx.ASGITransport(app=fastapi_app)
+    async with fastapi_app.router.lifespan_context(fastapi_app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                simulate_patient(client, n, turns, latencies, statuses) for n in range(patients)
+            ))
+            elapsed = time.perf_counter() - start
+
+    print(f"Patients: {patients} | Turns each: {turns} | Requests: {len(latencies)}")
+    print(f"Status codes: {statuses}")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} req/s over {elapsed:.2f}s")
+    print(f"Latency p50: {percentile(latencies, 50) * 1000:.1f} ms | "
+          f"p99: {percentile(latencies, 99) * 1000:.1f} ms | "
+          f"mean: {statistics.mean(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test POST /chat with stubbed LLM and tools.")
+    parser.add_argument("--patients", type=int, default=50, help="Concurrent simulated patients")
+    parser.add_argument("--turns", type=int, default=5, help="Messages sent by each patient")
+    args = parser.parse_args()
+    asyncio.run(run(args.patients, args.turns))
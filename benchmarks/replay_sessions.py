@@ -0,0 +1,205 @@
+"""
+replay_sessions.py
+------------------
+Offline end-to-end benchmark: replays the patient conversations recorded in `logs/` (the
+'User query:' lines, from the old text logs or the JSON-lines logs) through the real swarm from
+`agents.graph_builder.get_app()`, with every external service replaced by a local stand-in:
+- Gemini: ScriptedToolLLM, which calls the production tools and handoffs deterministically
+- Qdrant: QdrantClient(":memory:") seeded with synthetic reference chunks (hash embeddings)
+- MongoDB: mongomock loaded with data/patient_reports.json
+- DuckDuckGo: StubSearch
+Each recorded session is replayed once per patient, with the logged Patient ID and name swapped
+for that patient's. Reports turns/second, per-turn latency percentiles, LLM calls and peak RSS.
+`--save` writes the results and `--baseline` compares against a saved run, exiting non-zero on a
+regression, so it can run on a plain Linux box or in CI.
+
+Usage:
+    python -m benchmarks.replay_sessions
+    python -m benchmarks.replay_sessions --patients 10 --llm-latency 0.05
+    python -m benchmarks.replay_sessions --save bench.json
+    python -m benchmarks.replay_sessions --baseline bench.json --max-regression 0.2
+"""
+
+import argparse  # CLI arguments
+import glob  # Session log files
+import json  # Fixtures / results
+import os  # Environment for the stand-ins
+import random  # Synthetic reference text
+import resource  # Peak RSS
+import statistics  # Percentiles
+import sys
+import tempfile  # Scratch log directory
+import time  # Turn latency
+
+# Local stand-ins must be configured before any project module reads its settings
+os.environ.setdefault("QDRANT_URL", ":memory:")
+os.environ.setdefault("RETRIEVAL_MODE", "dense")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+os.environ.setdefault("SEARCH_CACHE_ENABLED", "false")
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="replay_logs_"))
+
+import mongomock  # In-memory MongoDB
+import pymongo
+
+pymongo.MongoClient = mongomock.MongoClient  # Before backend.mongo_database connects
+
+from agents import llm_model  # Shared LLM
+from backend import resources  # Shared embeddings / Qdrant client
+from backend.metrics import TimedEmbeddings  # Same wrapper as production
+from benchmarks.stubs import HashEmbeddings, LLMCallCounter, ScriptedToolLLM, StubSearch  # Stand-ins
+
+QUERY_MARKER = "User query: "
+ID_PLACEHOLDER, NAME_PLACEHOLDER = "{patient_id}", "{patient_name}"
+# How the scripted LLM drives the real tools: first pattern whose tool the agent has bound wins
+RULES = [
+    (r"(?i)\bP\d{3,}\b", "get_patient_report"),
+    (r"(?i)symptom|symtomp|kidney|swelling|medication|dose|pain|diet|fever|\brag\b|research|exercis|excercis",
+     "transfer_to_clinical_assistant"),
+    (r"(?i)latest|research|news", "web_search_tool"),
+    (r".", "rag_tool_function"),
+]
+WORDS = ("kidney renal creatinine eGFR dialysis nephron glomerular proteinuria hypertension sodium "
+         "potassium phosphate albumin transplant biopsy tubular electrolyte diuretic edema urine").split()
+
+
+# ---------------------- Session Scripts ------------------------------- #
+def load_sessions(pattern: str) -> list[list[str]]:
+    """
+    Read the user turns of every session log matching `pattern` (one script per file).
+    Patient IDs (including redacted 'P***') become a placeholder, and so does a name sent right
+    after an ID, so each script can be replayed for any patient.
+    """
+    from agents.fast_path import NAME_PATTERN, PATIENT_ID_PATTERN  # Same rules as the router
+    from backend.logger import REDACTED
+
+    sessions = []
+    for path in sorted(glob.glob(pattern)):
+        turns = []
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.lstrip().startswith("{"):
+                    try:
+                        line = json.loads(line).get("msg", "")
+                    except json.JSONDecodeError:
+                        continue
+                if QUERY_MARKER not in line:
+                    continue
+                text = line.split(QUERY_MARKER, 1)[1].strip().strip('"').strip()
+                if PATIENT_ID_PATTERN.match(text) or text.strip(" .!") == "P***":
+                    text = ID_PLACEHOLDER
+                elif turns and turns[-1] == ID_PLACEHOLDER and NAME_PATTERN.match(text):
+                    text = NAME_PLACEHOLDER
+                if text and text != REDACTED:  # Logged with LOG_REDACT_PHI on: nothing to replay
+                    turns.append(text)
+        if turns:
+            sessions.append(turns)
+    return sessions
+
+
+# ---------------------- Offline Stand-ins ----------------------------- #
+def install_stand_ins(llm_latency: float, chunks: int):
+    """Install the scripted LLM, hash embeddings and a seeded in-memory collection."""
+    llm_model._llm = ScriptedToolLLM(latency_s=llm_latency, rules=RULES)  # Instead of Gemini
+    resources._embeddings = TimedEmbeddings(HashEmbeddings())  # Skip the FastEmbed download
+
+    from agents.clinical_agent.rag.create_vectorstore import chunk_id, create_collection, create_embeddings_batch
+    client = resources.get_qdrant_client()
+    if not client.collection_exists(resources.COLLECTION_NAME):
+        create_collection(client, resources.COLLECTION_NAME, HashEmbeddings().size, hybrid=False)
+    rng = random.Random(0)
+    reference = [{"text": " ".join(rng.choice(WORDS) for _ in range(120)),
+                  "metadata": {"source": "synthetic.pdf", "page": n}} for n in range(chunks)]
+    for chunk in reference:
+        chunk["id"] = chunk_id(chunk)
+    client.upsert(resources.COLLECTION_NAME, create_embeddings_batch(reference, resources.get_embeddings()))
+
+
+def percentile(values: list, pct: int) -> float:
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else values[0]
+
+
+# ---------------------- Replay ---------------------------------------- #
+def replay(sessions: list, patients: list) -> dict:
+    """Replay every session once per patient on fresh threads; returns throughput and latency stats."""
+    from agents.clinical_agent.tools import web_search_tool
+    from agents.fast_path import fast_path_stats
+    from agents.graph_builder import get_app, make_config, new_thread_id
+    from backend.logger import thread_id_var
+    from backend.patient_cache import patient_cache
+
+    web_search_tool.DuckDuckGoSearchAPIWrapper = StubSearch
+    app = get_app()
+    counter, latencies = LLMCallCounter(), []
+    start = time.perf_counter()
+    for patient in patients:
+        for turns in sessions:
+            thread_id = new_thread_id()
+            thread_id_var.set(thread_id)  # Patient lookups are counted per conversation
+            config = make_config(thread_id)
+            config["callbacks"] = [*config["callbacks"], counter]
+            for text in turns:
+                message = text.replace(ID_PLACEHOLDER, patient["patient_id"]).replace(
+                    NAME_PLACEHOLDER, patient["patient_name"])
+                turn_start = time.perf_counter()
+                app.invoke({"messages": [{"role": "user", "content": message}]}, config)
+                latencies.append((time.perf_counter() - turn_start) * 1000)
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": len(sessions),
+        "patients": len(patients),
+        "turns": len(latencies),
+        "turns_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "llm_calls": counter.calls,
+        "skipped_llm_share": fast_path_stats.stats()["skipped_llm_share"],
+        "patient_db_round_trips_per_conversation": patient_cache.stats()["db_round_trips_per_conversation"],
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # KiB on Linux
+    }
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)."""
+    failed = []
+    if result["turns_per_s"] < baseline["turns_per_s"] * (1 - tolerance):
+        failed.append(f"turns_per_s {baseline['turns_per_s']} -> {result['turns_per_s']}")
+    for key in ("p50_ms", "p95_ms", "peak_rss_mb"):
+        if result[key] > baseline[key] * (1 + tolerance):
+            failed.append(f"{key} {baseline[key]} -> {result[key]}")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay logged sessions through the swarm offline.")
+    parser.add_argument("--logs", default="logs/*.log", help="Session log files to replay")
+    parser.add_argument("--patients", type=int, default=5, help="Patients each session is replayed for")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--chunks", type=int, default=200, help="Synthetic reference chunks in Qdrant")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed slowdown vs the baseline")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.logs)
+    if not sessions:
+        sys.exit(f"No 'User query:' lines found in {args.logs}")
+    with open("data/patient_reports.json", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    from backend.mongo_database import ensure_indexes, get_collection
+    get_collection().insert_many([dict(record) for record in fixtures])
+    ensure_indexes()
+    install_stand_ins(args.llm_latency, args.chunks)
+
+    result = replay(sessions, fixtures[:args.patients])
+    print(json.dumps(result))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failed = regressions(result, json.load(f), args.max_regression)
+        if failed:
+            sys.exit("Regression: " + "; ".join(failed))
+        print("No regression against", args.baseline)
@@ -0,0 +1,86 @@
+"""
+soak_checkpointer.py
+--------------------
+Soak test for the compacting checkpointer.
+Continuously opens new patient sessions (one thread each), plays a few turns per session through
+a small LangGraph message graph, and samples process RSS and stored checkpoint counts. With
+compaction and idle-thread eviction both should level off instead of growing with traffic.
+
+Usage:
+    python -m benchmarks.soak_checkpointer --backend memory --duration 86400
+    python -m benchmarks.soak_checkpointer --backend sqlite --duration 120 --idle-ttl 10
+"""
+
+import argparse  # CLI arguments
+import resource  # Peak RSS
+import time  # Soak clock
+import uuid  # Thread IDs
+
+from langchain_core.messages import AIMessage  # Simulated assistant replies
+from langgraph.graph import START, MessagesState, StateGraph  # Minimal message graph
+
+from backend.checkpointer import get_checkpointer  # Checkpointer under test
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (Linux /proc, falling back to peak RSS)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_graph(checkpointer):
+    """A one-node graph that appends a ~1 KB assistant reply, like a short agent turn."""
+    def reply(state: MessagesState):
+        return {"messages": [AIMessage(content="Stub reply. " * 85)]}
+
+    return StateGraph(MessagesState).add_node("reply", reply).add_edge(START, "reply").compile(
+        checkpointer=checkpointer
+    )
+
+
+def count_checkpoints(checkpointer) -> int:
+    """Total checkpoints stored across all threads."""
+    return sum(1 for _ in checkpointer.list(None))
+
+
+def run(backend: str, duration: float, turns: int, idle_ttl: int, sample_every: float):
+    """Drive sessions for `duration` seconds and print RSS / checkpoint samples."""
+    checkpointer = get_checkpointer(backend, idle_ttl=idle_ttl, sweep_interval=max(1, idle_ttl // 2))
+    graph = build_graph(checkpointer)
+    start = last_sample = time.time()
+    sessions = 0
+    samples = []
+    while time.time() - start < duration:
+        config = {"configurable": {"thread_id": uuid.uuid4().hex}}
+        for turn in range(turns):
+            graph.invoke({"messages": [{"role": "user", "content": f"turn {turn}"}]}, config)
+        sessions += 1
+        if time.time() - last_sample >= sample_every:
+            last_sample = time.time()
+            samples.append((last_sample - start, current_rss_mb(), count_checkpoints(checkpointer)))
+            elapsed, rss, stored = samples[-1]
+            print(f"t={elapsed:8.0f}s sessions={sessions:8d} rss={rss:8.1f} MB checkpoints={stored}")
+
+    if len(samples) >= 4:
+        quarter = len(samples) // 4
+        early = sum(s[1] for s in samples[quarter:2 * quarter]) / quarter
+        late = sum(s[1] for s in samples[-quarter:]) / quarter
+        print(f"RSS second-quarter avg: {early:.1f} MB | last-quarter avg: {late:.1f} MB | "
+              f"growth: {late - early:+.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soak test the compacting checkpointer.")
+    parser.add_argument("--backend", default="memory", choices=["memory", "sqlite", "mongo"])
+    parser.add_argument("--duration", type=float, default=24 * 3600, help="Seconds to run")
+    parser.add_argument("--turns", type=int, default=6, help="Turns per simulated session")
+    parser.add_argument("--idle-ttl", type=int, default=60, help="Idle-thread TTL in seconds")
+    parser.add_argument("--sample-every", type=float, default=60, help="Seconds between samples")
+    args = parser.parse_args()
+    run(args.backend, args.duration, args.turns, args.idle_ttl, args.sample_every)
@@ -0,0 +1,221 @@
+"""
+stubs.py
+--------
+Deterministic stand-ins for the LLM, embeddings and tools, used by the benchmark scripts so they
+can run without Gemini, FastEmbed, Qdrant, MongoDB or DuckDuckGo. Latencies are simulated: the
+LLM awaits (non-blocking, like a real HTTP client) and the tools sleep (blocking, like
+pymongo/Qdrant).
+"""
+
+import asyncio  # Non-blocking simulated LLM latency
+import hashlib  # Deterministic fake embeddings
+import json  # Tool call chunk arguments
+import re  # Scripted tool selection
+import time  # Blocking simulated tool latency
+import uuid  # Tool call ids
+
+import numpy as np  # Fake embedding vectors
+from langchain_core.callbacks import BaseCallbackHandler  # Counts LLM calls
+from langchain_core.embeddings import Embeddings  # Base class for the fake embedder
+from langchain_core.language_models.chat_models import BaseChatModel  # Base class for the fake LLM
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage  # Message types
+from langchain_core.messages.utils import count_tokens_approximately  # Fake token usage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # LLM result containers
+from langchain_core.utils.function_calling import convert_to_openai_tool  # Bound tools' argument names
+
+# ---------------------- Simulated Latencies --------------------------- #
+LLM_LATENCY_S = 0.05  # One Gemini round trip
+TOOL_LATENCY_S = 0.02  # One blocking tool call (Mongo / Qdrant / search)
+
+
+class FakeToolCallingLLM(BaseChatModel):
+    """
+    Fake chat model that calls the first bound tool once per turn, then answers.
+    Attributes:
+        latency_s (float): Simulated round-trip latency per call.
+    """
+
+    latency_s: float = LLM_LATENCY_S
+    tool_names: list[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tool-calling"
+
+    def bind_tools(self, tools, **kwargs):
+        names = [getattr(t, "name", None) or getattr(t, "__name__", str(t)) for t in tools]
+        return self.model_copy(update={"tool_names": names})
+
+    def _respond(self, messages) -> ChatResult:
+        last = messages[-1]
+        if isinstance(last, ToolMessage) or not self.tool_names:
+            message = AIMessage(content=f"Stub answer: {str(last.content)[:80]}")
+        else:
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": self.tool_names[0], "args": {"query": str(last.content)},
+                             "id": uuid.uuid4().hex, "type": "tool_call"}],
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_s)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_s)
+        return self._respond(messages)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        """Stream the answer word by word; the latency is paid before the first token."""
+        await asyncio.sleep(self.latency_s)
+        message = self._respond(messages).generations[0].message
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0,
+            }]))
+            return
+        for word in message.content.split(" "):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class ScriptedToolLLM(BaseChatModel):
+    """
+    Fake chat model for the production agents. It matches the latest user message against `rules`
+    (regex, tool name) and calls the first matching tool that is bound, filling the tool's required
+    arguments from the message. Once a tool has returned, it answers. Handoffs (transfer_to_*) are
+    tools like any other; the receiving agent acts on the same user message.
+    Attributes:
+        latency_s (float): Simulated round-trip latency per call.
+        rules (list[tuple[str, str]]): Ordered (pattern, tool name) pairs.
+    """
+
+    latency_s: float = LLM_LATENCY_S
+    rules: list[tuple[str, str]] = []
+    tool_args: dict[str, list[str]] = {}  # Bound tool -> required argument names
+    preamble: str = ""  # Streamed before a tool call, like a model narrating its next step
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-tool-calling"
+
+    def bind_tools(self, tools, **kwargs):
+        tool_args = {}
+        for t in tools:
+            spec = convert_to_openai_tool(t)["function"]
+            tool_args[spec["name"]] = spec.get("parameters", {}).get("required", [])
+        return self.model_copy(update={"tool_args": tool_args})
+
+    def _tool_call(self, text: str) -> dict | None:
+        for pattern, name in self.rules:
+            if name in self.tool_args and re.search(pattern, text):
+                patient_id = re.search(r"P\d{3,}", text, re.IGNORECASE)
+                args = {arg: patient_id.group(0).upper() if "patient_id" in arg and patient_id else text
+                        for arg in self.tool_args[name]}
+                return {"name": name, "args": args, "id": uuid.uuid4().hex, "type": "tool_call"}
+        return None
+
+    def _respond(self, messages) -> ChatResult:
+        last = messages[-1]
+        human = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+        handed_off = isinstance(last, ToolMessage) and (last.name or "").startswith("transfer_to_")
+        call = None
+        if human is not None and (not isinstance(last, ToolMessage) or handed_off):
+            call = self._tool_call(human.text())
+        usage = {"input_tokens": count_tokens_approximately(messages)}
+        if call is not None:
+            message = AIMessage(content="", tool_calls=[call])
+        else:
+            message = AIMessage(content=f"Stub answer: {str(last.content)[:80]}")
+        usage["output_tokens"] = count_tokens_approximately([message])
+        message.usage_metadata = {**usage, "total_tokens": usage["input_tokens"] + usage["output_tokens"]}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_s)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_s)
+        return self._respond(messages)
+
+    def _chunks(self, messages) -> list:
+        """The response as stream chunks: words of an answer, or the preamble and a tool call chunk."""
+        message = self._respond(messages).generations[0].message
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            chunks = [AIMessageChunk(content=self.preamble)] if self.preamble else []
+            chunks.append(AIMessageChunk(content="", tool_call_chunks=[{
+                "name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0,
+            }]))
+        else:
+            chunks = [AIMessageChunk(content=word) for word in re.findall(r"\S+\s*", message.content)]
+        chunks[-1].usage_metadata = message.usage_metadata
+        return [ChatGenerationChunk(message=chunk) for chunk in chunks]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        """Stream the response; the latency is paid before the first chunk."""
+        time.sleep(self.latency_s)
+        for chunk in self._chunks(messages):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency_s)
+        for chunk in self._chunks(messages):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    """Counts chat model invocations."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def on_chat_model_start(self, *args, **kwargs):
+        self.calls += 1
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic, model-free embeddings (same text, same vector)."""
+
+    def __init__(self, size: int = 768):
+        self.size = size
+
+    def _embed(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.size).astype(np.float32).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class StubSearch:
+    """Stand-in for DuckDuckGoSearchAPIWrapper: blocking, canned results."""
+
+    def results(self, query: str, max_results: int) -> list[dict]:
+        time.sleep(TOOL_LATENCY_S)
+        return [{"title": f"Result {n}", "link": f"https://example.org/{n}", "snippet": f"Stub result {n} for: {query}"}
+                for n in range(max_results)]
+
+
+def stub_lookup_tool(query: str) -> str:
+    """
+    Blocking stand-in for a Mongo/Qdrant/DuckDuckGo tool call.
+    Args:
+        query (str): The query string.
+    Returns:
+        str: A canned result.
+    """
+    time.sleep(TOOL_LATENCY_S)
+    return f"Stub result for: {query}"
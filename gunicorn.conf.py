@@ -0,0 +1,68 @@
+"""
+gunicorn.conf.py
+----------------
+Pre-fork server configuration for the FastAPI app.
+The master loads the embedding model once before forking, so every worker shares its pages
+copy-on-write instead of loading its own copy (uvicorn --workers spawns fresh interpreters and
+cannot share them). Preloaded ONNX sessions are created single-threaded: onnxruntime's thread
+pool does not survive fork, and a worker inheriting one could hang on its first embedding.
+Any worker may serve any turn of a conversation, so conversation state must live outside the
+workers: the SQLite checkpointer (one host) or MongoDB (several hosts). The in-memory
+checkpointer is refused with more than one worker. Each worker warms up on its own and reports
+through /readyz; on SIGTERM workers stop accepting connections, finish in-flight requests for up
+to `graceful_timeout` seconds, then close their connection pools.
+With several workers, set LOG_FILE with '{pid}' (one rotating file per worker) and
+PROMETHEUS_MULTIPROC_DIR (emptied here at startup) so /metrics aggregates all workers.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app.main_api:fastapi_app
+    WEB_CONCURRENCY=4 CHECKPOINTER_BACKEND=mongo LOG_FILE='logs/assistant-{pid}.log' \
+        PROMETHEUS_MULTIPROC_DIR=/tmp/prom gunicorn -c gunicorn.conf.py app.main_api:fastapi_app
+"""
+
+import os
+import shutil
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))  # Drain time for in-flight turns and streams
+keepalive = int(os.getenv("KEEPALIVE_SECONDS", "5"))
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None  # Heartbeat files off slow container disks
+PRELOAD_EMBEDDINGS = os.getenv("PRELOAD_EMBEDDINGS", "true").lower() == "true"
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")  # Shared metric files of all workers
+
+
+def on_starting(server):
+    """Runs once in the master before any worker is forked."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Must exist, and hold no files of a previous run, before any metric is created
+        shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(PROMETHEUS_MULTIPROC_DIR)
+    from backend.checkpointer import CHECKPOINTER_BACKEND
+    from backend.logger import LOG_FILE
+    if workers > 1 and CHECKPOINTER_BACKEND == "memory":
+        raise RuntimeError("CHECKPOINTER_BACKEND=memory keeps conversations inside one worker; "
+                           "use sqlite (one host) or mongo with WEB_CONCURRENCY > 1")
+    if workers > 1 and "{pid}" not in LOG_FILE:
+        server.log.warning("LOG_FILE has no '{pid}': %s workers will rotate the same file", workers)
+    if workers > 1 and not PROMETHEUS_MULTIPROC_DIR:
+        server.log.warning("PROMETHEUS_MULTIPROC_DIR is not set: /metrics only reports the worker that answers")
+    server.log.info("Starting %s workers (checkpointer: %s)", workers, CHECKPOINTER_BACKEND)
+    if PRELOAD_EMBEDDINGS:
+        from backend.resources import preload
+        preload()
+
+
+def post_fork(server, worker):
+    """Each worker starts its own log writer thread (threads do not survive fork)."""
+    from backend.logger import restart_logging_after_fork
+    restart_logging_after_fork()
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the aggregated /metrics (its counters are kept)."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)